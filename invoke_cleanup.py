@@ -7,6 +7,8 @@ PYTHON PACKAGE DEPENDENCIES:
 
 * path (python >= 3.5) or path.py >= 11.5.0 (as path-object abstraction)
 * pathlib (for ant-like wildcard patterns; since: python > 3.5)
+* scandir (python < 3.5: backport of :func:`os.scandir()` for tree walker)
+* futures (python < 3.2: backport of :mod:`concurrent.futures`)
 * pycmd (required-by: clean_python())
 
 
@@ -28,6 +30,79 @@ configuration data:
         extra_files:
             - **/*.log
             - **/*.bak
+            # -- ALTERNATIVES: {a,b} and NEGATION: !pattern (keeps matches)
+            - **/*.{orig,rej}
+            - "!**/testdata/*.log"
+            # -- PREDICATES: older_than, min_size, owner (from cached stat data)
+            - pattern: "**/*.log"
+              older_than: 7d
+            - pattern: "**/*.core"
+              min_size: 100MB
+              owner: ci
+        # scan_jobs: Number of threads that scan directories (default: 1).
+        # HINT: Use more threads on network filesystems (NFS, ...).
+        scan_jobs: 8
+        # index_dir: Directory of the tree index (for incremental rescans).
+        index_dir: .cache/invoke-cleanup
+        # watch_file: Journal of the "cleanup.watch" task (Linux only).
+        # HINT: A running watcher tracks the artifacts while they are created.
+        #       Then, the cleanup tasks need no walk of the directory tree.
+        watch_file: .cache/invoke-cleanup/watch.json
+        # gitignored: Remove paths that git ignores, too (default: false).
+        # HINT: Uses .gitignore files (without git), like: git clean -X -d
+        #       Tracked files are always kept (implies: keep_tracked).
+        gitignored: true
+        # keep_tracked: Never remove files that git tracks (default: false).
+        keep_tracked: true
+        # follow_symlinks: Enter symlinked directories (default: false).
+        # HINT: Each directory is walked only once (symlink loops, bind mounts).
+        follow_symlinks: false
+        # max_depth: Select paths up to this depth (default: unlimited).
+        # HINT: Paths in the workdir have depth 1, like: "build", "foo.log"
+        max_depth: 6
+        # one_file_system: Never cross into other filesystems (default: false).
+        # HINT: Mount points (bind mounts, ...) are neither removed nor entered.
+        one_file_system: true
+        # jobs: Number of directories (or file batches) that are removed
+        #       concurrently (default: 1). Files are batched per directory.
+        jobs: 4
+        # queue_size: Maximum number of pending removals (default: 4 * jobs).
+        # HINT: Removals start while the tree is walked. The walk waits if full.
+        queue_size: 64
+        # rmtree_jobs: Number of threads that remove one directory tree (default: 1).
+        # HINT: Splits huge trees (like: .tox/) across threads (python >= 3.7, POSIX).
+        rmtree_jobs: 8
+        # trash_dir: Fast removal mode (default: off). Directories are renamed
+        #   into this directory and removed by a background process.
+        # HINT: Directories on other filesystems are removed as usual.
+        trash_dir: .cleanup-trash
+        # unlinks_per_second: Maximum number of removed files (and directories)
+        #   per second (default: unlimited).
+        # scans_per_second: Maximum number of listed directories per second
+        #   (default: unlimited).
+        # ionice: Lower the I/O priority to the idle class (default: false).
+        # HINT: Throttles the cleanup on shared build hosts (other builds first).
+        # HINT: The I/O priority stays lowered for the rest of the invoke run.
+        unlinks_per_second: 2000
+        scans_per_second: 500
+        ionice: true
+        # reclaim_target: Free-space target of the reclaim task, like:
+        #   "10GB" (at least 10 GB free) or "80%" (disk usage below 80%).
+        reclaim_target: 10GB
+
+
+cleanup.reclaim task: Remove Candidates until Enough Disk Space is Free
+-------------------------------------------------------------------------------
+
+The reclaim task removes the candidates of the cleanup task first and
+the candidates of the cleanup_all task afterwards. It stops as soon as
+the free-space target is reached (warm caches are kept if possible).
+The candidates are removed one after another (the jobs option is ignored).
+
+.. code-block:: sh
+
+    $ invoke cleanup.reclaim --target=10GB    # -- At least 10 GB free.
+    $ invoke cleanup.reclaim --target=80%     # -- Disk usage below 80%.
 
 
 Registration of Cleanup Tasks
@@ -60,8 +135,24 @@ EXAMPLE::
 """
 
 from __future__ import absolute_import, print_function
+import binascii
+import collections
+import contextlib
+import errno
+import fnmatch
+import hashlib
+import io
+import itertools
+import json
 import os
+import re
+import stat
+import struct
+import subprocess
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from invoke import task, Collection
 from invoke.executor import Executor
 from invoke.exceptions import Exit, Failure, UnexpectedExit
@@ -76,11 +167,19 @@ if python_version < python35:   # noqa
 else:
     import pathlib              # noqa
 
+try:
+    from os import scandir
+except ImportError:     # pragma: no cover
+    # -- BACKPORT: python < 3.5
+    from scandir import scandir
+
 
 # -----------------------------------------------------------------------------
 # CONSTANTS:
 # -----------------------------------------------------------------------------
 VERSION = "0.3.7"
+REMOVE_BATCH_SIZE = 256     # -- Files per batch of a concurrent removal.
+REMOVAL_QUEUE_SIZE_PER_JOB = 4  # -- Pending removals per removal thread.
 
 
 # -----------------------------------------------------------------------------
@@ -109,6 +208,77 @@ def execute_cleanup_tasks(ctx, cleanup_tasks, workdir=".", verbose=False):
         print("CLEANUP TASKS: %d failure(s) occured" % failure_count)
 
 
+class HandledPaths(object):
+    """Paths that a cleanup has already acted on (removed or skipped).
+    Paths below a handled directory are also handled.
+    Overlapping patterns and cleanup tasks act on each path only once.
+    Cleanups that share the handled paths also share their lock
+    (checks of concurrent cleanups are serialized, see: :class:`PathCleaner`).
+    """
+
+    def __init__(self):
+        self.directories = set()
+        self.files = set()
+        self.lock = threading.RLock()
+
+    def add_directory(self, abs_path):
+        self.directories.add(_normcase_path(abs_path))
+
+    def add_file(self, abs_path):
+        self.files.add(_normcase_path(abs_path))
+
+    def contains(self, abs_path, below=True):
+        """Check if a path or one of its parent directories was handled.
+
+        :param abs_path:  Absolute path to check (as string).
+        :param below:     Check the parent directories, too (as bool).
+            Not needed for paths of a tree walk that prunes the handled
+            directories (see: :func:`path_select_records()`).
+        :return: True, if this path needs no further action.
+        """
+        normcased_path = _normcase_path(abs_path)
+        if normcased_path in self.files or normcased_path in self.directories:
+            return True
+        return (below and bool(self.directories) and
+                is_path_below(abs_path, self.directories))
+
+
+_CLEANUP_SESSIONS = []
+
+
+@contextlib.contextmanager
+def cleanup_session():
+    """Share the handled paths between all cleanups in this context
+    (cleanup functions, registered cleanup tasks, nested sessions).
+
+    .. code-block:: python
+
+        with cleanup_session():
+            cleanup_dirs(["**/__pycache__"])
+            cleanup_files(["**/*.pyc"])     # -- SKIPS: Removed __pycache__ dirs.
+
+    :return: Handled paths of this session (as :class:`HandledPaths`).
+    """
+    if _CLEANUP_SESSIONS:
+        # -- NESTED SESSION: Uses the handled paths of the outer session.
+        yield _CLEANUP_SESSIONS[-1]
+        return
+
+    handled_paths = HandledPaths()
+    _CLEANUP_SESSIONS.append(handled_paths)
+    try:
+        yield handled_paths
+    finally:
+        _CLEANUP_SESSIONS.pop()
+
+
+def make_handled_paths():
+    """Handled paths of the current cleanup session (or new ones)."""
+    if _CLEANUP_SESSIONS:
+        return _CLEANUP_SESSIONS[-1]
+    return HandledPaths()
+
+
 def make_excluded(excluded, config_dir=None, workdir=None):
     workdir = workdir or Path.getcwd()
     config_dir = config_dir or workdir
@@ -133,136 +303,2944 @@ def make_excluded(excluded, config_dir=None, workdir=None):
 
 
 def is_directory_excluded(directory, excluded):
+    """Check if a directory is excluded or lies below an excluded directory.
+
+    :param directory:   Directory to check (as Path, string).
+    :param excluded:    Excluded directories (as set of Path).
+    :return: True, if directory is excluded. False, otherwise.
+    """
+    if not excluded:
+        return False
     directory = Path(directory).normpath()
     directory2 = directory.abspath()
-    if (directory in excluded) or (directory2 in excluded):
-        return True
+    for candidate in (directory, directory2):
+        while candidate:
+            if candidate in excluded:
+                return True
+            parent = candidate.parent
+            if parent == candidate:
+                break
+            candidate = parent
     # -- OTHERWISE:
     return False
 
 
+class PathCleaner(object):
+    """Removes selected directories and files (and reports what it does).
+    Protects the python virtual environment that is currently in use.
+
+    :param excluded:    Excluded directories (as set of Path).
+    :param dry_run:     Dry-run mode indicator (as bool).
+    :param tracked_files:  Guard that keeps tracked files (as :class:`GitTrackedFiles`).
+    :param handled_paths:  Paths that were already handled (as :class:`HandledPaths`).
+        Uses the handled paths of the current :func:`cleanup_session()` by default.
+    :param rmtree_jobs:  Number of threads that remove one directory tree
+        (as int, see: :func:`rmtree_parallel()`).
+    :param trash_dir:   Staging directory for the fast removal mode (optional).
+        Directories are renamed into it and removed by a background process
+        (see: :meth:`start_trash_removal()`).
+    :param unlink_limiter:  Limits the unlinks (and rmdirs) per second
+        (as :class:`RateLimiter`, optional).
+
+    The path cleaner may be used by many threads: Its checks, counters and
+    handled paths are guarded by the lock of the handled paths
+    (the removals run concurrently).
+    """
+
+    def __init__(self, excluded=None, dry_run=False, verbose=False,
+                 show_skipped=False, tracked_files=None, handled_paths=None,
+                 rmtree_jobs=1, trash_dir=None, unlink_limiter=None):
+        excluded = excluded or []
+        self.excluded = set([Path(p) for p in excluded])
+        self.trash_dir = None
+        if trash_dir:
+            self.trash_dir = os.path.abspath(str(trash_dir))
+            self.excluded.add(Path(self.trash_dir))
+        self.trash_counter = itertools.count()
+        self.trashed_count = 0
+        self.dry_run = dry_run
+        self.show_skipped = show_skipped or verbose
+        self.python_basedir = Path(Path(sys.executable).dirname()).joinpath("..").abspath()
+        self.tracked_files = tracked_files
+        self.handled_paths = handled_paths or make_handled_paths()
+        self.rmtree_jobs = int(rmtree_jobs or 1)
+        self.unlink_limiter = unlink_limiter
+        self.warn2_counter = 0
+        self.removed_count = 0
+        self.error_count = 0
+        self.error_message = None
+        self.lock = self.handled_paths.lock
+
+    @property
+    def pruned_directories(self):
+        """Directories that the tree walker should not enter:
+        excluded directories and the current virtual environment.
+        """
+        return list(self.excluded) + [self.python_basedir]
+
+    def selects_directory(self, directory):
+        """Indicates if :meth:`remove_directory()` removes this directory
+        as a whole (if it is not excluded or protected).
+        """
+        directory = Path(directory)
+        if is_directory_excluded(directory, self.excluded):
+            return False
+        directory2 = directory.abspath()
+        if self.tracked_files is not None:
+            with self.lock:
+                if self.tracked_files.contains_tracked(directory2):
+                    return False
+        return not (sys.executable.startswith(directory2) or
+                    directory2.startswith(self.python_basedir))
+
+    def remove_directory(self, directory, pipeline=None):
+        """Remove a directory (and its contents) recursively.
+
+        :param directory:  Directory to remove (as Path, :class:`PathRecord`).
+        :param pipeline:   Removes it concurrently (as :class:`RemovalPipeline`).
+        """
+        with self.lock:
+            directory = self._prepare_remove_directory(directory)
+        if directory is None:
+            return
+        elif pipeline is not None:
+            pipeline.remove_directory(directory)
+            return
+        try:
+            self._rmtree(directory)
+        except OSError as e:
+            print("RMTREE-FAILED: %s (for: %s)" % (e, directory))
+
+    def remove_directories(self, directories, jobs=1, queue_size=None):
+        """Remove many directories (and their contents) recursively.
+        With jobs > 1, the directories are removed concurrently by a thread pool
+        (while the directories are still selected, see: :class:`RemovalPipeline`).
+        Checks and messages are performed in the calling thread
+        (and in the same order as :meth:`remove_directory()`).
+
+        :param directories:  Directories to remove (as iterable of Path, :class:`PathRecord`).
+        :param jobs:    Number of concurrent removals (as int).
+        :param queue_size:  Maximum number of pending removals (as int).
+        """
+        with removal_pipeline(self, jobs, queue_size) as pipeline:
+            for directory in directories:
+                self.remove_directory(directory, pipeline)
+
+    def _rmtree(self, directory):
+        if self.trash_dir and self._move_to_trash(directory):
+            return
+        if self.rmtree_jobs > 1 or self.unlink_limiter is not None:
+            rmtree_parallel(directory, jobs=self.rmtree_jobs,
+                            limiter=self.unlink_limiter)
+        else:
+            Path(directory).rmtree_p()
+
+    def _move_to_trash(self, directory):
+        """Rename a directory into the trash directory (same filesystem only).
+
+        :return: True, if directory was moved (False: use a normal removal).
+        """
+        if os.path.islink(str(directory)):
+            # -- SAME AS NORMAL REMOVAL: A symlinked directory is never removed
+            # (rmtree refuses it). Renaming would remove the symlink instead.
+            return False
+        name = "%s.%d.%d" % (os.path.basename(os.path.normpath(str(directory))),
+                             os.getpid(), next(self.trash_counter))
+        try:
+            if not os.path.isdir(self.trash_dir):
+                os.makedirs(self.trash_dir)
+        except OSError:
+            # -- RACE-CONDITION: Created by another cleanup (or not creatable).
+            pass
+        if self.unlink_limiter is not None:
+            self.unlink_limiter.acquire()
+        try:
+            os.rename(str(directory), os.path.join(self.trash_dir, name))
+        except OSError:
+            # -- EXDEV, ...: Other filesystem (mount point) or other problem.
+            return False
+        with self.lock:
+            self.trashed_count += 1
+        return True
+
+    def start_trash_removal(self):
+        """Remove the trash directory in a detached background process
+        (if any directory was moved into it).
+
+        :return: Process id of the background process (or None).
+        """
+        if not self.trashed_count:
+            return None
+        self.trashed_count = 0
+        pid = start_background_removal(self.trash_dir)
+        print("RMTREE-BACKGROUND: %s (process: %s)" % (self.trash_dir, pid))
+        return pid
+
+    def _prepare_remove_directory(self, directory):
+        """Check if a directory is removed (and report it).
+
+        :return: Directory path to remove (or None, if nothing needs to be done).
+        """
+        record = as_path_record(directory)
+        directory = record.path
+        directory2 = record.abs_path
+        if self.handled_paths.contains(directory2, below=not record.walked):
+            # -- DUPLICATE: Another pattern or cleanup task selected it, too.
+            return
+        if is_directory_excluded(directory, self.excluded):
+            # -- HINT: Excluded directories are not handled (per cleanup only).
+            # Other cleanups in this session may clean inside them.
+            print("SKIP-DIR: %s (excluded)" % directory)
+            return
+        if sys.executable.startswith(directory2):
+            # -- PROTECT VIRTUAL ENVIRONMENT (currently in use):
+            # pylint: disable=line-too-long
+            print("SKIP-SUICIDE: '%s' contains current python executable" % directory)
+            return
+        elif directory2.startswith(self.python_basedir):
+            # -- PROTECT VIRTUAL ENVIRONMENT (currently in use):
+            # HINT: Limit noise in DIAGNOSTIC OUTPUT to X messages.
+            if self.warn2_counter <= 4:  # noqa
+                print("SKIP-SUICIDE: '%s'" % directory)
+            self.warn2_counter += 1
+            return
+        elif (self.tracked_files is not None and
+              self.tracked_files.contains_tracked(directory2)):
+            print("SKIP-TRACKED: %s (contains files that git tracks)" % directory)
+            return
+
+        if not record.is_dir():
+            if self.show_skipped:
+                print("RMTREE: %s (SKIPPED: Not a directory)" % directory)
+            return
+
+        self.handled_paths.add_directory(directory2)
+        if self.dry_run:
+            print("RMTREE: %s (dry-run)" % directory)
+            return
+        # -- MAYBE: directory.rmtree(ignore_errors=True)
+        print("RMTREE: %s" % directory)
+        return directory
+
+    def remove_file(self, file_, pipeline=None):
+        """Remove a file (if it still exists).
+
+        :param file_:  File to remove (as Path, :class:`PathRecord`).
+        :param pipeline:   Removes it concurrently (as :class:`RemovalPipeline`).
+        """
+        with self.lock:
+            record = self._prepare_remove_file(file_)
+        if record is None:
+            return
+        elif pipeline is not None:
+            pipeline.remove_file(record)
+            return
+        if self.unlink_limiter is not None:
+            self.unlink_limiter.acquire()
+        try:
+            Path(record.path).remove_p()
+            with self.lock:
+                self.removed_count += 1
+        except os.error as e:
+            self._report_remove_file_error(e)
+
+    def remove_files(self, files, jobs=1, queue_size=None,
+                     batch_size=REMOVE_BATCH_SIZE):
+        """Remove many files (if they still exist).
+        With jobs > 1, the files are grouped per parent directory and each batch
+        is removed by a thread pool (see: :class:`RemovalPipeline`).
+        Checks and messages are performed in the calling thread
+        (and in the same order as :meth:`remove_file()`).
+
+        :param files:   Files to remove (as iterable of Path, :class:`PathRecord`).
+        :param jobs:    Number of concurrent batches (as int).
+        :param queue_size:  Maximum number of pending batches (as int).
+        :param batch_size:  Maximum number of files per batch (as int).
+        """
+        with removal_pipeline(self, jobs, queue_size, batch_size) as pipeline:
+            for file_ in files:
+                self.remove_file(file_, pipeline)
+
+    def _report_removed_file_batch(self, removed_count, errors):
+        with self.lock:
+            self.removed_count += removed_count
+            for e in errors:
+                self._report_remove_file_error(e)
+
+    def _report_remove_file_error(self, e):
+        message = "%s: %s" % (e.__class__.__name__, e)
+        with self.lock:
+            print(message + " basedir: "+ self.python_basedir)
+            self.error_count += 1
+            if not self.error_message:
+                self.error_message = message
+
+    def _prepare_remove_file(self, file_):
+        """Check if a file is removed (and report it).
+
+        :return: Path record to remove (or None, if nothing needs to be done).
+        """
+        record = as_path_record(file_)
+        file_ = record.path
+        if record.abs_path.startswith(self.python_basedir):
+            # -- PROTECT VIRTUAL ENVIRONMENT (currently in use):
+            return
+        if self.handled_paths.contains(record.abs_path, below=not record.walked):
+            # -- DUPLICATE: Another pattern or cleanup task selected it, too.
+            return
+        if not record.is_file():
+            if self.show_skipped:
+                print("REMOVE: %s (SKIPPED: Not a file)" % file_)
+            return
+        self.handled_paths.add_file(record.abs_path)
+        if (self.tracked_files is not None and
+                self.tracked_files.is_tracked(record.abs_path)):
+            print("SKIP-TRACKED: %s" % file_)
+            return
+
+        if self.dry_run:
+            print("REMOVE: %s (dry-run)" % file_)
+            return
+        print("REMOVE: %s" % file_)
+        return record
+
+
+class RemovalPipeline(object):
+    """Bounded queue between the tree walk (producer) and the removal threads.
+    Directories are removed one per task, files in batches per directory.
+    If queue_size removals are pending, the walk waits (backpressure).
+    Therefore, the walk and the removals overlap with constant memory.
+    Results are reported in the calling thread (by the path cleaner).
+
+    :param cleaner:     Path cleaner that reports the results.
+    :param jobs:        Number of removal threads (as int).
+    :param queue_size:  Maximum number of pending removals (as int).
+    :param batch_size:  Maximum number of files per batch (as int).
+    """
+
+    def __init__(self, cleaner, jobs=4, queue_size=None,
+                 batch_size=REMOVE_BATCH_SIZE):
+        self.cleaner = cleaner
+        self.jobs = int(jobs)
+        self.queue_size = int(queue_size or REMOVAL_QUEUE_SIZE_PER_JOB*self.jobs)
+        self.batch_size = batch_size
+        self.executor = ThreadPoolExecutor(max_workers=self.jobs)
+        self.pending = {}
+        self.batch_directory = None
+        self.batch = []
+
+    def remove_directory(self, directory):
+        def report_removed(future):
+            try:
+                future.result()
+            except OSError as e:
+                print("RMTREE-FAILED: %s (for: %s)" % (e, directory))
+        self._submit(report_removed, self.cleaner._rmtree, directory)
+
+    def remove_file(self, record):
+        directory, name = os.path.split(record.abs_path)
+        if self.batch and (directory != self.batch_directory or
+                           len(self.batch) >= self.batch_size):
+            self.flush()
+        self.batch_directory = directory
+        self.batch.append(name)
+
+    def flush(self):
+        """Submit the current batch of files (if any)."""
+        if not self.batch:
+            return
+        def report_removed(future):
+            self.cleaner._report_removed_file_batch(*future.result())
+        self._submit(report_removed, remove_file_batch,
+                     self.batch_directory, self.batch,
+                     self.cleaner.unlink_limiter)
+        self.batch = []
+
+    def close(self):
+        """Wait until all removals are done (and report them)."""
+        try:
+            self.flush()
+            while self.pending:
+                done, _ = wait(self.pending, return_when=FIRST_COMPLETED)
+                self._report(done)
+        finally:
+            self.executor.shutdown(wait=True)
+
+    def _submit(self, report, func, *args):
+        while len(self.pending) >= self.queue_size:
+            # -- BACKPRESSURE: Walk waits until a removal is done.
+            done, _ = wait(self.pending, return_when=FIRST_COMPLETED)
+            self._report(done)
+        self.pending[self.executor.submit(func, *args)] = report
+        self._report([future for future in self.pending if future.done()])
+
+    def _report(self, done):
+        for future in done:
+            report = self.pending.pop(future)
+            report(future)
+
+
+@contextlib.contextmanager
+def removal_pipeline(cleaner, jobs=1, queue_size=None,
+                     batch_size=REMOVE_BATCH_SIZE):
+    """Provide a removal pipeline for jobs > 1 (otherwise: None).
+    Waits for the pending removals on exit.
+
+    :return: Removal pipeline (as :class:`RemovalPipeline` or None).
+    """
+    if int(jobs or 1) <= 1:
+        yield None
+        return
+
+    pipeline = RemovalPipeline(cleaner, jobs=jobs, queue_size=queue_size,
+                               batch_size=batch_size)
+    try:
+        yield pipeline
+    finally:
+        pipeline.close()
+
+
+_TRASH_REMOVAL_SCRIPT = """
+import os, shutil, sys
+try:
+    os.nice(19)
+except (AttributeError, OSError):
+    pass
+trash_dir = sys.argv[1]
+for name in os.listdir(trash_dir):
+    shutil.rmtree(os.path.join(trash_dir, name), ignore_errors=True)
+try:
+    os.rmdir(trash_dir)
+except OSError:
+    pass
+"""
+
+
+def start_background_removal(trash_dir):
+    """Start a detached process (with low priority) that removes
+    the contents of a trash directory (and the trash directory, if possible).
+    The process outlives the current process (and its terminal session).
+
+    :param trash_dir:  Trash directory to remove (as string).
+    :return: Process id of the background process.
+    """
+    kwargs = {}
+    if os.name == "posix":
+        kwargs["preexec_fn"] = os.setsid
+    else:
+        kwargs["creationflags"] = (getattr(subprocess, "DETACHED_PROCESS", 0x08) |
+                                   getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0x200))
+    with open(os.devnull, "r+b") as devnull:
+        process = subprocess.Popen([sys.executable, "-c", _TRASH_REMOVAL_SCRIPT,
+                                    str(trash_dir)],
+                                   stdin=devnull, stdout=devnull, stderr=devnull,
+                                   close_fds=True, **kwargs)
+    return process.pid
+
+
+def remove_file_batch(directory, names, limiter=None):
+    """Remove files of one directory (missing files are ignored).
+    Uses unlink() relative to the opened directory (if supported),
+    therefore the directory path is resolved only once per batch.
+
+    :param directory:  Parent directory of the files (as string).
+    :param names:      File names in this directory (as list of string).
+    :param limiter:    Limits the unlinks per second (as :class:`RateLimiter`).
+    :return: Tuple (removed_count, errors) with errors as list of OSError.
+    """
+    removed_count = 0
+    errors = []
+    directory_fd = None
+    if os.unlink in getattr(os, "supports_dir_fd", set()):
+        try:
+            directory_fd = os.open(directory, _DIRECTORY_OPEN_FLAGS)
+        except OSError:
+            # -- FALLBACK: Use paths (reports the errors per file).
+            directory_fd = None
+    try:
+        for name in names:
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                if directory_fd is None:
+                    os.unlink(os.path.join(directory, name))
+                else:
+                    os.unlink(name, dir_fd=directory_fd)
+                removed_count += 1
+            except OSError as e:
+                if e.errno == errno.ENOENT:
+                    # -- LIKE: remove_p() (file was already removed).
+                    continue
+                if e.filename == name:
+                    e.filename = os.path.join(directory, name)
+                errors.append(e)
+    finally:
+        if directory_fd is not None:
+            os.close(directory_fd)
+    return removed_count, errors
+
+
+# -----------------------------------------------------------------------------
+# THROTTLING: Share the disk with other processes (shared build hosts)
+# -----------------------------------------------------------------------------
+class RateLimiter(object):
+    """Limits the rate of operations, like unlinks per second (thread-safe).
+    Uses a token bucket: A short burst passes without delay, afterwards
+    each caller sleeps until its operation fits into the rate.
+
+    :param rate:   Maximum number of operations per second (as number).
+    :param burst:  Number of operations that pass without delay
+        (default: rate/10, at least 1).
+    """
+
+    def __init__(self, rate, burst=None, clock=None, sleep=None):
+        self.rate = float(rate)
+        if self.rate <= 0:
+            raise ValueError("rate=%r (expected: > 0)" % rate)
+        self.burst = float(burst or max(1.0, self.rate / 10))
+        self.clock = clock or getattr(time, "monotonic", time.time)
+        self.sleep = sleep or time.sleep
+        self.tokens = self.burst
+        self.timestamp = self.clock()
+        self.lock = threading.Lock()
+
+    def acquire(self, count=1):
+        """Wait until count operations may be performed."""
+        with self.lock:
+            now = self.clock()
+            elapsed = max(0.0, now - self.timestamp)
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.timestamp = now
+            # -- RESERVE: Tokens may become negative (next caller waits longer).
+            self.tokens -= count
+            delay = -self.tokens / self.rate
+        if delay > 0:
+            self.sleep(delay)
+
+
+def make_rate_limiter(rate):
+    """Create a rate limiter if a rate is provided.
+
+    :param rate:  Maximum number of operations per second (or None: unlimited).
+    :return: Rate limiter (as :class:`RateLimiter` or None).
+    """
+    if not rate:
+        return None
+    return RateLimiter(float(rate))
+
+
+_IO_PRIORITY_LOWERED = {}
+
+
+def lower_io_priority():
+    """Lower the I/O priority of the current process to the idle class
+    (requires: Linux with the ``ionice`` command of util-linux).
+    Processes that are started afterwards inherit the I/O priority,
+    like the background removal of the fast removal mode.
+
+    The I/O priority is lowered only once per process and is NOT restored:
+    It applies to the rest of the process (like: later invoke tasks), too.
+
+    :return: True, if the I/O priority was lowered.
+    """
+    pid = os.getpid()
+    lowered = _IO_PRIORITY_LOWERED.get(pid)
+    if lowered is None:
+        lowered = _IO_PRIORITY_LOWERED[pid] = _run_ionice_idle(pid)
+    return lowered
+
+
+def _run_ionice_idle(pid):
+    """Move a process into the idle I/O scheduling class (with ``ionice``).
+
+    :return: True, on success.
+    """
+    if not sys.platform.startswith("linux"):
+        return False
+    command = ["ionice", "-c", "3", "-p", str(pid)]
+    try:
+        with open(os.devnull, "r+b") as devnull:
+            returncode = subprocess.call(command, stdin=devnull,
+                                         stdout=devnull, stderr=devnull)
+    except OSError:
+        # -- NOT INSTALLED: ionice command is missing.
+        return False
+    return returncode == 0
+
+
+def _throttle_cleanup(ionice=False, unlinks_per_second=None):
+    """Apply the throttling options of a cleanup.
+
+    :return: Unlink limiter (as :class:`RateLimiter` or None).
+    """
+    if ionice and not lower_io_priority():
+        print("IONICE: Cannot lower the I/O priority (SKIPPED)")
+    return make_rate_limiter(unlinks_per_second)
+
+
 def cleanup_dirs(patterns, workdir=".", excluded=None,
-                 dry_run=False, verbose=False, show_skipped=False):
+                 dry_run=False, verbose=False, show_skipped=False, **options):
     """Remove directories (and their contents) recursively.
     Skips removal if directories does not exist.
 
     :param patterns:    Directory name patterns, like "**/tmp*" (as list).
     :param workdir:     Current work directory (default=".")
+    :param excluded:    Excluded directories (as set of Path).
     :param dry_run:     Dry-run mode indicator (as bool).
+    :param options:     Cleanup options, like: jobs=4
+        (see: :func:`make_cleanup_options()`).
     """
-    excluded = excluded or []
-    excluded = set([Path(p) for p in excluded])
-    show_skipped = show_skipped or verbose
-    current_dir = Path(workdir)
-    python_basedir = Path(Path(sys.executable).dirname()).joinpath("..").abspath()
-    warn2_counter = 0
-    for dir_pattern in patterns:
-        for directory in path_glob(dir_pattern, current_dir):
-            if is_directory_excluded(directory, excluded):
-                print("SKIP-DIR: %s (excluded)" % directory)
-                continue
-            directory2 = directory.abspath()
-            if sys.executable.startswith(directory2):
-                # -- PROTECT VIRTUAL ENVIRONMENT (currently in use):
-                # pylint: disable=line-too-long
-                print("SKIP-SUICIDE: '%s' contains current python executable" % directory)
-                continue
-            elif directory2.startswith(python_basedir):
-                # -- PROTECT VIRTUAL ENVIRONMENT (currently in use):
-                # HINT: Limit noise in DIAGNOSTIC OUTPUT to X messages.
-                if warn2_counter <= 4:  # noqa
-                    print("SKIP-SUICIDE: '%s'" % directory)
-                warn2_counter += 1
-                continue
-
-            if not directory.isdir():
-                if show_skipped:
-                    print("RMTREE: %s (SKIPPED: Not a directory)" % directory)
-                continue
-
-            if dry_run:
-                print("RMTREE: %s (dry-run)" % directory)
-            else:
-                try:
-                    # -- MAYBE: directory.rmtree(ignore_errors=True)
-                    print("RMTREE: %s" % directory)
-                    directory.rmtree_p()
-                except OSError as e:
-                    print("RMTREE-FAILED: %s (for: %s)" % (e, directory))
-
-
-def cleanup_files(patterns, workdir=".", dry_run=False, verbose=False, show_skipped=False):
+    options = _resolve_cleanup_options(options, workdir)
+    cleaner = _make_path_cleaner(options, excluded, dry_run=dry_run,
+                                 verbose=verbose, show_skipped=show_skipped)
+    def prune_selected(directory, tags):
+        # -- DIRECTORY IS REMOVED: Needs not be entered.
+        return cleaner.selects_directory(directory)
+
+    directories = path_select_records({"directory": patterns}, workdir,
+                                      prune_match=prune_selected,
+                                      **_make_walk_options(options, cleaner))
+    cleaner.remove_directories(directories, jobs=options["jobs"],
+                               queue_size=options["queue_size"])
+    cleaner.start_trash_removal()
+
+
+def cleanup_files(patterns, workdir=".", dry_run=False, verbose=False, show_skipped=False,
+                  excluded=None, **options):
     """Remove files or files selected by file patterns.
     Skips removal if file does not exist.
 
     :param patterns:    File patterns, like "**/*.pyc" (as list).
     :param workdir:     Current work directory (default=".")
     :param dry_run:     Dry-run mode indicator (as bool).
+    :param excluded:    Excluded directories (as set of Path).
+    :param options:     Cleanup options, like: jobs=4
+        (see: :func:`make_cleanup_options()`).
     """
-    show_skipped = show_skipped or verbose
-    current_dir = Path(workdir)
-    python_basedir = Path(Path(sys.executable).dirname()).joinpath("..").abspath()
-    error_message = None
-    error_count = 0
-    for file_pattern in patterns:
-        for file_ in path_glob(file_pattern, current_dir):
-            if file_.abspath().startswith(python_basedir):
-                # -- PROTECT VIRTUAL ENVIRONMENT (currently in use):
-                continue
-            if not file_.isfile():
-                if show_skipped:
-                    print("REMOVE: %s (SKIPPED: Not a file)" % file_)
-                continue
-
-            if dry_run:
-                print("REMOVE: %s (dry-run)" % file_)
-            else:
-                print("REMOVE: %s" % file_)
-                try:
-                    file_.remove_p()
-                except os.error as e:
-                    message = "%s: %s" % (e.__class__.__name__, e)
-                    print(message + " basedir: "+ python_basedir)
-                    error_count += 1
-                    if not error_message:
-                        error_message = message
-    if False and error_message: # noqa
+    options = _resolve_cleanup_options(options, workdir)
+    cleaner = _make_path_cleaner(options, excluded, dry_run=dry_run,
+                                 verbose=verbose, show_skipped=show_skipped)
+    files = path_select_records({"file": patterns}, workdir,
+                                **_make_walk_options(options, cleaner))
+    cleaner.remove_files(files, jobs=options["jobs"],
+                         queue_size=options["queue_size"])
+    if False and cleaner.error_message: # noqa
         class CleanupError(RuntimeError):
             pass
-        raise CleanupError(error_message)
+        raise CleanupError(cleaner.error_message)
+
+
+def cleanup_dirs_and_files(directories, files, workdir=".", excluded=None,
+                           dry_run=False, verbose=False, show_skipped=False,
+                           until=None, **options):
+    """Remove directories and files that are selected by patterns.
+    Walks the directory tree only once for all patterns.
+    Each selected path is removed while the walk continues
+    (like: :func:`cleanup_dirs()` and :func:`cleanup_files()`).
+    Directories that are selected for removal are not entered and
+    any candidate below them is dropped.
+
+    :param directories: Directory name patterns, like "**/tmp*" (as list).
+    :param files:       File patterns, like "**/*.pyc" (as list).
+    :param workdir:     Current work directory (default=".")
+    :param excluded:    Excluded directories (as set of Path).
+    :param dry_run:     Dry-run mode indicator (as bool).
+    :param until:       Predicate ``until()`` that stops the cleanup
+        (checked before each removal, see: :class:`DiskSpaceTarget`).
+        Paths are removed one after another then (jobs option is ignored).
+    :param options:     Cleanup options, like: jobs=4
+        (see: :func:`make_cleanup_options()`).
+    """
+    options = _resolve_cleanup_options(options, workdir)
+    if options["gitignored"]:
+        # -- LIKE: git clean -X -d (never removes tracked files).
+        options["keep_tracked"] = True
+    cleaner = _make_path_cleaner(options, excluded, dry_run=dry_run,
+                                 verbose=verbose, show_skipped=show_skipped)
+    removed_dirs = set()
+    def prune_selected(directory, tags):
+        # -- DIRECTORY IS REMOVED: Needs not be entered.
+        # HINT: Only watch journal paths need the removed_dirs check.
+        if "directory" in tags and cleaner.selects_directory(directory):
+            removed_dirs.add(_normcase_path(os.path.abspath(directory)))
+            return True
+        return False
+
+    pattern_groups = {"directory": directories, "file": files}
+    selected = None
+    gitignore = None
+    if options["gitignored"]:
+        gitignore = GitIgnore(directory_tag="directory", file_tag="file")
+    elif options["watch_file"] and not (options["follow_symlinks"] or
+                                        options["max_depth"] or
+                                        options["one_file_system"] or
+                                        options["keep_tracked"] or
+                                        has_pattern_predicates(pattern_groups)):
+        # -- WATCH JOURNAL: Tracks paths without walk limits (and predicates).
+        # HINT: The watcher never follows symlinks (misses changes below them).
+        # HINT: The watcher has no tracked-file guard (prunes other directories).
+        selected = load_watched_paths(options["watch_file"], pattern_groups, workdir)
+    if selected is None:
+        selected = path_select_records(pattern_groups, workdir,
+                                       prune_match=prune_selected,
+                                       gitignore=gitignore,
+                                       **_make_walk_options(options, cleaner))
+    else:
+        selected = _select_watched_paths(selected, cleaner, prune_selected,
+                                         removed_dirs)
+
+    jobs = options["jobs"]
+    if until is not None:
+        # -- SERIAL REMOVAL: until() must see each removal before the next one.
+        # HINT: Directory trees are still removed with rmtree_jobs threads.
+        jobs = 1
+
+    # -- STREAMING: Removals start while the directory tree is walked.
+    with removal_pipeline(cleaner, jobs, options["queue_size"]) as pipeline:
+        for record in selected:
+            if until is not None and until():
+                # -- STOP: Walk is not completed (tree index is not saved).
+                selected.close()
+                break
+            if "directory" in record.tags:
+                cleaner.remove_directory(record, pipeline)
+            if "file" in record.tags:
+                cleaner.remove_file(record, pipeline)
+    cleaner.start_trash_removal()
+
+
+def _resolve_cleanup_options(options, workdir="."):
+    """Check the cleanup options and add the defaults of missing options.
+    Relative paths of the options are relative to the workdir.
+
+    :param options:  Cleanup options (as dict, see: :func:`make_cleanup_options()`).
+    :return: All cleanup options (as dict).
+    :raises TypeError: If an option is unknown.
+    """
+    unknown = sorted(set(options) - set(CLEANUP_OPTION_DEFAULTS))
+    if unknown:
+        raise TypeError("Unknown cleanup option(s): %s" % ", ".join(unknown))
+    options2 = dict(CLEANUP_OPTION_DEFAULTS)
+    options2.update(options)
+    for name in ("index_dir", "trash_dir", "watch_file"):
+        if options2[name]:
+            options2[name] = os.path.join(str(workdir), str(options2[name]))
+    return options2
+
+
+def _make_path_cleaner(options, excluded=None, dry_run=False, verbose=False,
+                       show_skipped=False):
+    """Create the path cleaner of a cleanup (and apply the throttling options).
+
+    :param options:  All cleanup options (see: :func:`_resolve_cleanup_options()`).
+    :return: Path cleaner (as :class:`PathCleaner`).
+    """
+    unlink_limiter = _throttle_cleanup(options["ionice"],
+                                       options["unlinks_per_second"])
+    tracked_files = None
+    if options["keep_tracked"]:
+        tracked_files = GitTrackedFiles()
+    return PathCleaner(excluded, dry_run=dry_run, verbose=verbose,
+                       show_skipped=show_skipped, tracked_files=tracked_files,
+                       rmtree_jobs=options["rmtree_jobs"],
+                       trash_dir=options["trash_dir"],
+                       unlink_limiter=unlink_limiter)
+
+
+def _make_walk_options(options, cleaner):
+    """Keyword arguments of :func:`path_select_records()` for a cleanup."""
+    return dict(excluded=cleaner.pruned_directories,
+                handled_directories=cleaner.handled_paths.directories,
+                scan_jobs=options["scan_jobs"],
+                index_dir=options["index_dir"],
+                follow_symlinks=options["follow_symlinks"],
+                max_depth=options["max_depth"],
+                one_file_system=options["one_file_system"],
+                scans_per_second=options["scans_per_second"])
+
+
+def _select_watched_paths(watched_paths, cleaner, prune_selected, removed_dirs):
+    """Apply the rules of the tree walk to the paths of a watch journal.
+    Parent directories are selected before their contents.
+    Paths below removed directories are dropped (like: not entered).
+    """
+    for path, tags in sorted(watched_paths):
+        if is_directory_excluded(path, cleaner.excluded):
+            continue
+        abs_path = os.path.abspath(str(path))
+        if removed_dirs and is_path_below(abs_path, removed_dirs):
+            continue
+        record = PathRecord(str(path), abs_path, tags)
+        if "directory" in tags and record.is_dir():
+            prune_selected(record.path, tags)
+        yield record
+
+
+# -----------------------------------------------------------------------------
+# DISK SPACE: Reclaim disk space until a free-space target is reached
+# -----------------------------------------------------------------------------
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+_SIZE_SCHEMA = re.compile(r"^\s*(\d+(?:\.\d*)?)\s*([KMGT]?)(?:I?B)?\s*$", re.I)
+
+
+def parse_size(text):
+    """Parse a size with an optional binary unit, like: "100MB", "1.5G", "512".
 
+    :param text:  Size (as string or number).
+    :return: Size in bytes (as int).
+    :raises ValueError: If the size cannot be parsed.
+    """
+    if isinstance(text, (int, float)):
+        return int(text)
+    match = _SIZE_SCHEMA.match(str(text))
+    if not match:
+        raise ValueError("size=%r (expected: <number>[K|M|G|T][B])" % text)
+    number, unit = match.groups()
+    return int(float(number) * _SIZE_UNITS[unit.upper()])
+
+
+def format_size(size):
+    """Format a size in bytes with a binary unit, like: "1.5 GB"."""
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024:
+            break
+        size /= 1024.0
+    else:
+        unit = "TB"
+    if unit == "B":
+        return "%d %s" % (size, unit)
+    return "%.1f %s" % (size, unit)
+
+
+def disk_usage(path):
+    """Provide the disk usage of the filesystem that contains path.
+
+    :param path:  Path on the filesystem (as string).
+    :return: Tuple (total, used, free) in bytes (free: for unprivileged users).
+    """
+    if hasattr(os, "statvfs"):
+        st = os.statvfs(str(path))
+        total = st.f_blocks * st.f_frsize
+        return total, (st.f_blocks - st.f_bfree) * st.f_frsize, st.f_bavail * st.f_frsize
+    import shutil
+    return tuple(shutil.disk_usage(str(path)))
 
-def path_glob(pattern, current_dir=None):
-    """Use pathlib for ant-like patterns, like: "**/*.py"
+
+class DiskSpaceTarget(object):
+    """Free-space target of the reclaim task: minimum free bytes or
+    maximum disk usage (in percent, like: ``df``).
+
+    :param path:        Path on the filesystem to check (as string).
+    :param free_bytes:  Minimum number of free bytes (as int, optional).
+    :param max_usage:   Maximum disk usage in percent (as number, optional).
+    """
+
+    def __init__(self, path=".", free_bytes=None, max_usage=None):
+        if free_bytes is None and max_usage is None:
+            raise ValueError("DiskSpaceTarget: Needs free_bytes or max_usage")
+        self.path = str(path)
+        self.free_bytes = free_bytes
+        self.max_usage = max_usage
+
+    @classmethod
+    def from_string(cls, text, path="."):
+        """Parse a target, like: "10GB" (free bytes) or "80%" (max. usage).
+
+        :raises ValueError: If the target cannot be parsed.
+        """
+        text = str(text).strip()
+        if text.endswith("%"):
+            max_usage = float(text[:-1])
+            if not 0 <= max_usage <= 100:
+                raise ValueError("max_usage=%s (expected: 0..100%%)" % text)
+            return cls(path, max_usage=max_usage)
+        return cls(path, free_bytes=parse_size(text))
+
+    def usage(self):
+        """Current disk usage (as tuple: free bytes, usage in percent)."""
+        _, used, free = disk_usage(self.path)
+        usage = 100.0 * used / max(1, used + free)
+        return free, usage
+
+    def is_reached(self):
+        free, usage = self.usage()
+        if self.free_bytes is not None and free < self.free_bytes:
+            return False
+        if self.max_usage is not None and usage > self.max_usage:
+            return False
+        return True
+
+    __call__ = is_reached
+
+    def __str__(self):
+        if self.max_usage is not None:
+            return "usage <= %g%%" % self.max_usage
+        return "free >= %s" % format_size(self.free_bytes)
+
+
+def path_glob(pattern, current_dir=None, follow_symlinks=False,
+              max_depth=None, one_file_system=False):
+    """Select paths with ant-like patterns, like: "**/*.py"
+    Uses the same pattern syntax as :meth:`pathlib.Path.glob()`.
 
     :param pattern:      File/directory pattern to use (as string).
     :param current_dir:  Current working directory (as Path, pathlib.Path, str)
+    :param follow_symlinks:  Enter symlinked directories (as bool).
+    :param max_depth:    Selects paths up to this depth (as int, 1: in current_dir).
+    :param one_file_system:  Never cross into other filesystems (as bool).
     :return Resolved Path (as path.Path).
     """
+    for path, _ in path_select({None: [pattern]}, current_dir,
+                               follow_symlinks=follow_symlinks,
+                               max_depth=max_depth,
+                               one_file_system=one_file_system):
+        yield path
+
+
+def path_select(pattern_groups, current_dir=None, **kwargs):
+    """Select paths by many patterns with only one walk of the directory tree.
+    Excluded directories are not entered (but reported if they match).
+    Accepts the same options as :func:`path_select_records()`.
+
+    :param pattern_groups:  Patterns per tag (as dict: tag -> list of patterns).
+    :param current_dir:  Current working directory (as Path, pathlib.Path, str)
+    :return: Iterator of (path, tags) tuples (as path.Path, set of tags).
+    """
+    for record in path_select_records(pattern_groups, current_dir, **kwargs):
+        yield Path(record.path), record.tags
+
+
+def path_select_records(pattern_groups, current_dir=None, excluded=None,
+                        prune_match=None, scan_jobs=1, index_dir=None,
+                        gitignore=None, follow_symlinks=False, max_depth=None,
+                        one_file_system=False, scans_per_second=None,
+                        handled_directories=None):
+    """Select path records by many patterns (see: :func:`path_select()`).
+    Each record keeps the file type of its directory entry.
+
+    :param pattern_groups:  Patterns per tag (as dict: tag -> list of patterns).
+        A pattern may have predicates (see: :func:`parse_pattern_spec()`).
+    :param current_dir:  Current working directory (as Path, pathlib.Path, str)
+    :param excluded:     Excluded directories (as list of Path, str).
+    :param prune_match:  Predicate ``prune_match(directory, tags)`` that
+        indicates if a matched directory should not be entered.
+        Pruned directories are not walked by later walks either
+        (literal base directories, absolute patterns).
+    :param handled_directories:  Directories that are already handled, like
+        removed by an earlier cleanup (as set of normcased absolute paths).
+        They are not entered (like excluded directories).
+    :param scan_jobs:    Number of threads that list directories (as int).
+        Use more threads for network filesystems (where listings are slow).
+    :param index_dir:    Directory of the tree index (optional).
+        Unchanged directories are not listed again (see: :class:`TreeIndex`).
+    :param gitignore:    Selects the paths that git ignores (as :class:`GitIgnore`).
+    :param follow_symlinks:  Enter symlinked directories (as bool).
+        Each directory is walked only once (even with symlink loops).
+    :param max_depth:    Selects paths up to this depth (as int, 1: in workdir).
+        Absolute patterns are not limited by max_depth.
+    :param one_file_system:  Never cross into other filesystems (as bool).
+        Mount points (with another st_dev) are neither selected nor entered.
+    :param scans_per_second:  Maximum number of listed directories per second
+        (as number, default: unlimited).
+    :return: Iterator of path records (as :class:`PathRecord`).
+
+    Absolute patterns, like "/tmp/pytest-of-*/**", are walked from their
+    literal root directory. Absolute patterns with a common root directory
+    share one walk (see: :func:`group_absolute_patterns()`).
+    """
     if not current_dir: # noqa
         current_dir = pathlib.Path.cwd()
     elif not isinstance(current_dir, pathlib.Path):
         # -- CASE: string, path.Path (string-like)
         current_dir = pathlib.Path(str(current_dir))
 
-    pattern_path = Path(pattern)
-    if pattern_path.isabs():
-        # -- SPECIAL CASE: Path.glob() only supports relative-path(s) / pattern(s).
-        if pattern_path.isdir():
-            yield pattern_path
+    matcher = PathMatcher()
+    absolute_patterns = []
+    for tag, patterns in pattern_groups.items():
+        for pattern in patterns:
+            pattern, pattern_tag = parse_pattern_spec(pattern, tag)
+            if os.path.isabs(pattern.lstrip("!")):
+                absolute_patterns.extend((alternative, pattern_tag)
+                                         for alternative in expand_braces(pattern))
+                continue
+            matcher.add_pattern(pattern, pattern_tag)
+    if gitignore is not None:
+        gitignore.prepare(matcher)
+        # -- NO TREE INDEX: Rules may change without any directory change.
+        index_dir = None
+
+    top = str(current_dir)
+    if top == os.curdir:
+        top = ""
+    pruned = set()
+    for directory in (excluded or []):
+        pruned.add(_normcase_path(os.path.abspath(str(directory))))
+    # -- TREE INDEX KEY: Uses only the excluded directories (stable per run).
+    index_pruned = frozenset(pruned)
+    pruned.update(handled_directories or [])
+    if prune_match is not None:
+        outer_prune_match = prune_match
+        def prune_match(directory, tags):
+            # -- REMEMBER: Later walks do not enter a pruned directory either.
+            if outer_prune_match(directory, tags):
+                pruned.add(_normcase_path(os.path.abspath(directory)))
+                return True
+            return False
+
+    walk_options = dict(pruned=pruned, prune_match=prune_match,
+                        jobs=int(scan_jobs or 1),
+                        follow_symlinks=follow_symlinks,
+                        one_file_system=one_file_system,
+                        scan_limiter=make_rate_limiter(scans_per_second),
+                        index_pruned=index_pruned)
+    if matcher.patterns:
+        for record in _walk_with_index(matcher, top, index_dir,
+                                       gitignore=gitignore,
+                                       max_depth=max_depth and int(max_depth) or None,
+                                       **walk_options):
+            yield record
+    for root, patterns in group_absolute_patterns(absolute_patterns):
+        # -- ABSOLUTE PATTERNS: One walk per common root directory.
+        if _normcase_path(root) in pruned or is_path_below(root, pruned):
+            continue
+        matcher = PathMatcher()
+        for pattern, tag in patterns:
+            matcher.add_pattern(pattern, tag)
+        for record in _walk_with_index(matcher, root, index_dir, **walk_options):
+            yield record
+
+
+def split_absolute_pattern(pattern):
+    """Split an absolute pattern into its literal root directory and
+    a pattern that is relative to the root directory.
+
+    EXAMPLE::
+
+        split_absolute_pattern("/tmp/pytest-of-*/**")
+        # => ("/tmp", "pytest-of-*/**")
+
+    :param pattern:  Absolute file/directory pattern (as string).
+        A negated pattern, like "!/tmp/keep", stays negated.
+    :return: Tuple (root, relative_pattern).
+    """
+    pattern = str(pattern)
+    negated = pattern.startswith("!")
+    drive, pattern = os.path.splitdrive(pattern.lstrip("!"))
+    components, dir_only = split_pattern(pattern)
+    base = []
+    while (len(components) > 1 and components[0] != RECURSIVE_WILDCARD and
+           not _WILDCARD_CHARS.search(components[0])):
+        base.append(components.pop(0))
+    root = os.path.join(drive + os.sep, *base)
+    relative_pattern = "/".join(components)
+    if dir_only and components and components[-1] != RECURSIVE_WILDCARD:
+        relative_pattern += "/"
+    if negated:
+        relative_pattern = "!" + relative_pattern
+    return root, relative_pattern
+
+
+def group_absolute_patterns(patterns):
+    """Group absolute patterns by their common root directory.
+    Patterns with a root below another root are walked from the outer root.
+    The walk starts at the literal base directories of the patterns anyway
+    (see: :class:`PathMatcher`), therefore an outer root costs no extra walk.
+
+    :param patterns:  Absolute patterns with their tags (as list of (pattern, tag)).
+    :return: List of (root, patterns) tuples where patterns are relative to root.
+    """
+    roots = {}
+    for pattern, tag in patterns:
+        root, relative_pattern = split_absolute_pattern(pattern)
+        roots.setdefault(root, []).append((relative_pattern, tag))
+
+    groups = []
+    for root in sorted(roots, key=lambda root: (_path_depth(root), root)):
+        for outer_root, outer_patterns in groups:
+            if is_path_below(root, [_normcase_path(outer_root)]):
+                prefix = os.path.relpath(root, outer_root).replace(os.sep, "/")
+                for pattern, tag in roots[root]:
+                    negation = "!" if pattern.startswith("!") else ""
+                    outer_patterns.append(("%s%s/%s" % (negation, prefix,
+                                                         pattern.lstrip("!")), tag))
+                break
+        else:
+            groups.append((root, list(roots[root])))
+    return groups
+
+
+def _walk_with_index(matcher, top, index_dir=None, index_pruned=None, **kwargs):
+    """Walk a directory tree (with the tree index, if index_dir is provided).
+
+    :param index_pruned:  Pruned directories for the index key (default: pruned).
+    :return: Iterator of path records (as :class:`PathRecord`).
+    """
+    index = None
+    if index_pruned is None:
+        index_pruned = kwargs.get("pruned") or []
+    if index_dir:
+        key_data = repr((os.path.abspath(top or os.curdir),
+                         sorted(matcher.patterns, key=repr),
+                         sorted(index_pruned),
+                         bool(kwargs.get("follow_symlinks"))))
+        index = TreeIndex.from_index_dir(index_dir, key_data)
+    for record in matcher.walk(top, index=index, **kwargs):
+        yield record
+    if index is not None:
+        try:
+            index.save()
+        except (IOError, OSError) as e:
+            print("TREE-INDEX: Cannot save %s (%s)" % (index.filename, e))
+
+
+def is_path_below(path, directories):
+    """Check if a path lies below one of the directories.
+
+    :param path:         Path to check (as Path, string).
+    :param directories:  Directories (as set of normcased absolute paths).
+    :return: True, if path is below one of these directories.
+    """
+    path = _normcase_path(os.path.abspath(str(path)))
+    parent = os.path.dirname(path)
+    while parent != path:
+        if parent in directories:
+            return True
+        path = parent
+        parent = os.path.dirname(path)
+    return False
+
+
+# -----------------------------------------------------------------------------
+# PARALLEL RMTREE: Remove one directory tree with many threads
+# -----------------------------------------------------------------------------
+_DIRECTORY_OPEN_FLAGS = (os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) |
+                         getattr(os, "O_CLOEXEC", 0))
+_RMTREE_OPEN_FLAGS = _DIRECTORY_OPEN_FLAGS | getattr(os, "O_NOFOLLOW", 0)
+
+
+def supports_rmtree_parallel():
+    """Check if the platform supports :func:`rmtree_parallel()`.
+    Needs directory file descriptors (python >= 3.7 on POSIX platforms).
+    """
+    supports_dir_fd = getattr(os, "supports_dir_fd", set())
+    supports_fd = getattr(os, "supports_fd", set())
+    return (os.unlink in supports_dir_fd and os.rmdir in supports_dir_fd and
+            getattr(os, "scandir", None) in supports_fd)
+
+
+def rmtree_parallel(directory, jobs=4, limiter=None):
+    """Remove a directory tree with many threads (like: ``rmtree_p()``).
+    Falls back to ``rmtree_p()`` if the platform lacks directory file
+    descriptors (see: :func:`supports_rmtree_parallel()`).
+
+    :param directory:  Directory to remove (as Path, string).
+    :param jobs:       Number of threads that remove the tree (as int).
+    :param limiter:    Limits the unlinks (and rmdirs) per second
+        (as :class:`RateLimiter`, optional).
+    :raises OSError: First error that occurred (after removing the rest).
+    """
+    if not supports_rmtree_parallel():
+        if limiter is not None:
+            _rmtree_throttled(str(directory), limiter)
+            return
+        Path(str(directory)).rmtree_p()
         return
+    elif int(jobs or 1) <= 1 and limiter is None:
+        Path(str(directory)).rmtree_p()
+        return
+    _ParallelRmtree(jobs, limiter).remove(str(directory))
 
-    # -- HINT: OSError is no longer raised in pathlib2 or python35.pathlib
-    # try:
-    for p in current_dir.glob(pattern):
-        yield Path(str(p))
-    # except OSError as e:
-    #     # -- CORNER-CASE 1: x.glob(pattern) may fail with:
-    #     # OSError: [Errno 13] Permission denied: <filename>
-    #     # HINT: Directory lacks excutable permissions for traversal.
-    #     # -- CORNER-CASE 2: symlinked endless loop
-    #     # OSError: [Errno 62] Too many levels of symbolic links: <filename>
-    #     print("{0}: {1}".format(e.__class__.__name__, e))
+
+def _rmtree_throttled(directory, limiter):
+    """Remove a directory tree bottom-up with one thread (and a rate limiter).
+    Fallback of :func:`rmtree_parallel()` (without directory file descriptors).
+    """
+    if not os.path.lexists(directory):
+        return
+    for dirpath, dirnames, filenames in os.walk(directory, topdown=False):
+        # -- SYMLINKED DIRECTORIES: Are not entered, only removed.
+        names = filenames + [name for name in dirnames
+                             if os.path.islink(os.path.join(dirpath, name))]
+        for name in names:
+            limiter.acquire()
+            os.unlink(os.path.join(dirpath, name))
+        limiter.acquire()
+        os.rmdir(dirpath)
+
+
+class _RemovalDirectory(object):
+    """Directory of :class:`_ParallelRmtree` (open until its children are removed)."""
+    __slots__ = ("parent", "name", "path", "fd", "pending")
+
+    def __init__(self, parent, name, path):
+        self.parent = parent
+        self.name = name
+        self.path = path
+        self.fd = None
+        self.pending = 0
+
+
+class _ParallelRmtree(object):
+    """Removes one directory tree with a pool of threads.
+
+    Each directory is opened once. Its entries are removed with unlink()
+    and rmdir() relative to the directory file descriptor (paths are never
+    resolved again, symlinks are never followed). A directory is removed
+    as soon as its last subdirectory is removed (bottom-up).
+    The threads take the most recently found directory first (depth-first),
+    which keeps the number of open directory file descriptors small.
+    """
+
+    def __init__(self, jobs=4, limiter=None):
+        self.jobs = max(1, int(jobs or 1))
+        self.limiter = limiter
+        self.condition = threading.Condition()
+        self.stack = []
+        self.active = 0
+        self.errors = []
+
+    def remove(self, directory):
+        if not os.path.lexists(directory):
+            return
+        self.stack.append(_RemovalDirectory(None, directory, directory))
+        threads = [threading.Thread(target=self._run) for _ in range(self.jobs)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self.errors:
+            raise self.errors[0]
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.stack and self.active:
+                    self.condition.wait()
+                if not self.stack:
+                    # -- DONE: No directory is left (and none will be found).
+                    self.condition.notify_all()
+                    return
+                directory = self.stack.pop()
+                self.active += 1
+            try:
+                self._remove_contents(directory)
+            finally:
+                with self.condition:
+                    self.active -= 1
+                    self.condition.notify_all()
+
+    def _remove_contents(self, directory):
+        try:
+            if directory.parent is None:
+                directory.fd = os.open(directory.path, _RMTREE_OPEN_FLAGS)
+            else:
+                directory.fd = os.open(directory.name, _RMTREE_OPEN_FLAGS,
+                                       dir_fd=directory.parent.fd)
+        except OSError as e:
+            self.errors.append(e)
+            self._remove_directory(directory, failed=True)
+            return
+
+        subdirs = []
+        try:
+            for entry in os.scandir(directory.fd):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                        continue
+                    if self.limiter is not None:
+                        self.limiter.acquire()
+                    os.unlink(entry.name, dir_fd=directory.fd)
+                except OSError as e:
+                    self.errors.append(e)
+        except OSError as e:
+            self.errors.append(e)
+
+        if not subdirs:
+            self._remove_directory(directory)
+            return
+        directory.pending = len(subdirs)
+        with self.condition:
+            for name in subdirs:
+                path = os.path.join(directory.path, name)
+                self.stack.append(_RemovalDirectory(directory, name, path))
+            self.condition.notify_all()
+
+    def _remove_directory(self, directory, failed=False):
+        """Remove an emptied directory (and its parents that became empty)."""
+        while directory is not None:
+            if directory.fd is not None:
+                os.close(directory.fd)
+                directory.fd = None
+            if not failed:
+                if self.limiter is not None:
+                    self.limiter.acquire()
+                try:
+                    if directory.parent is None:
+                        os.rmdir(directory.path)
+                    else:
+                        os.rmdir(directory.name, dir_fd=directory.parent.fd)
+                except OSError as e:
+                    self.errors.append(e)
+            failed = False
+
+            parent = directory.parent
+            if parent is None:
+                return
+            with self.condition:
+                parent.pending -= 1
+                if parent.pending:
+                    return
+            directory = parent
+
+
+# -----------------------------------------------------------------------------
+# PATH MATCHER and TREE WALKER:
+# -----------------------------------------------------------------------------
+RECURSIVE_WILDCARD = "**"
+STATE_LITERAL = 1
+STATE_WILDCARD = 2
+STATE_RECURSIVE = 3
+STATE_ACCEPT = 4
+STATE_SUFFIX = 5
+CASE_SENSITIVE = (os.path.normcase("Aa") == "Aa")
+_WILDCARD_CHARS = re.compile(r"[*?\[]")
+
+
+def split_pattern(pattern):
+    """Split a path pattern into its path components.
+
+    :param pattern:  File/directory pattern, like "**/*.py" (as string).
+    :return: Tuple (components, dir_only) where dir_only indicates that
+        the pattern only selects directories (trailing slash or "**").
+    """
+    pattern = str(pattern)
+    if os.sep != "/":
+        pattern = pattern.replace(os.sep, "/")
+    components = []
+    for component in pattern.split("/"):
+        if not component or component == ".":
+            continue
+        elif (component == RECURSIVE_WILDCARD and components and
+              components[-1] == RECURSIVE_WILDCARD):
+            # -- NORMALIZE: "**/**" => "**"
+            continue
+        components.append(component)
+    dir_only = pattern.endswith("/") or \
+        bool(components and components[-1] == RECURSIVE_WILDCARD)
+    return components, dir_only
+
+
+def expand_braces(pattern):
+    """Expand the alternatives of a pattern, like "*.{pyc,pyo}" (nestable).
+    Braces without a comma (or without a closing brace) are kept as is.
+
+    EXAMPLE::
+
+        expand_braces("{build,dist}/**/*.{o,so}")
+        # => ["build/**/*.o", "build/**/*.so", "dist/**/*.o", "dist/**/*.so"]
+
+    :param pattern:  File/directory pattern (as string).
+    :return: Expanded patterns (as list of string, without duplicates).
+    """
+    depth = 0
+    start = None
+    commas = []
+    for index, char in enumerate(pattern):
+        if char == "{":
+            if depth == 0:
+                start = index
+                commas = []
+            depth += 1
+        elif char == "," and depth == 1:
+            commas.append(index)
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0 and commas:
+                prefix = pattern[:start]
+                suffix = pattern[index+1:]
+                bounds = [start] + commas + [index]
+                patterns = []
+                for begin, end in zip(bounds, bounds[1:]):
+                    alternative = prefix + pattern[begin+1:end] + suffix
+                    for expanded in expand_braces(alternative):
+                        if expanded not in patterns:
+                            patterns.append(expanded)
+                return patterns
+    return [pattern]
+
+
+def list_directory(directory):
+    """List the entries of a directory (and cache their file type).
+
+    :param directory:  Directory to list (as string, "" for cwd).
+    :return: List of directory entries (or None, if directory is not accessible).
+    """
+    try:
+        entries = list(scandir(directory or os.curdir))
+    except OSError:
+        # -- CORNER-CASE: Directory is not accessible (permissions).
+        # HINT: Directory lacks executable permissions for traversal.
+        return None
+    for entry in entries:
+        # -- PREFETCH: File type (may need a stat() call on some filesystems).
+        entry.is_dir(follow_symlinks=False)
+    return entries
+
+
+# -----------------------------------------------------------------------------
+# PATTERN PREDICATES: Conditions of a pattern (age, size, owner)
+# -----------------------------------------------------------------------------
+_DURATION_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7*86400}
+_DURATION_SCHEMA = re.compile(r"^\s*(\d+(?:\.\d*)?)\s*([smhdw]?)\s*$", re.I)
+PATH_PREDICATE_NAMES = ("older_than", "min_size", "owner")
+
+
+def parse_duration(text):
+    """Parse a duration with an optional unit, like: "7d", "12h", "90".
+    Units: s (seconds, default), m (minutes), h (hours), d (days), w (weeks).
+
+    :param text:  Duration (as string or number).
+    :return: Duration in seconds (as float).
+    :raises ValueError: If the duration cannot be parsed.
+    """
+    if isinstance(text, (int, float)):
+        return float(text)
+    match = _DURATION_SCHEMA.match(str(text))
+    if not match:
+        raise ValueError("duration=%r (expected: <number>[s|m|h|d|w])" % text)
+    number, unit = match.groups()
+    return float(number) * _DURATION_UNITS[unit.lower()]
+
+
+def parse_owner(owner):
+    """Convert a user name (or user id) into a user id.
+
+    :raises ValueError: If the user is unknown (or not supported).
+    """
+    if isinstance(owner, int) or str(owner).isdigit():
+        return int(owner)
+    try:
+        import pwd
+    except ImportError:
+        raise ValueError("owner=%s (user names need: POSIX)" % owner)
+    try:
+        return pwd.getpwnam(str(owner)).pw_uid
+    except KeyError:
+        raise ValueError("owner=%s (unknown user)" % owner)
+
+
+class PathPredicate(object):
+    """Condition of a pattern that is evaluated with the stat result of
+    a matched path (from its directory entry, no extra stat pass).
+    Used as pattern tag: The path gets the tag only if the condition holds
+    (see: :func:`resolve_predicate_tags()`).
+
+    :param tag:         Tag of the pattern (like: "file", "directory").
+    :param older_than:  Minimum age of the last modification (like: "7d").
+    :param min_size:    Minimum size (like: "100MB"). HINT: For directories,
+        the size of the directory entry (not of its contents) is used.
+    :param owner:       User name (or user id) of the owner (like: "ci").
+    """
+
+    def __init__(self, tag, older_than=None, min_size=None, owner=None, now=None):
+        self.tag = tag
+        self.max_mtime = None
+        self.min_size = None
+        self.owner_uid = None
+        self.options = []
+        if older_than is not None:
+            now = time.time() if now is None else now
+            self.max_mtime = now - parse_duration(older_than)
+            self.options.append("older_than=%s" % older_than)
+        if min_size is not None:
+            self.min_size = parse_size(min_size)
+            self.options.append("min_size=%s" % min_size)
+        if owner is not None:
+            self.owner_uid = parse_owner(owner)
+            self.options.append("owner=%s" % owner)
+
+    def matches(self, stat_result):
+        if self.max_mtime is not None and stat_result.st_mtime > self.max_mtime:
+            return False
+        if self.min_size is not None and stat_result.st_size < self.min_size:
+            return False
+        if self.owner_uid is not None and stat_result.st_uid != self.owner_uid:
+            return False
+        return True
+
+    def __repr__(self):
+        # -- STABLE: Is part of the tree index key (see: :func:`_walk_with_index()`).
+        return "<PathPredicate: %s %s>" % (self.tag, ", ".join(self.options))
+
+
+def parse_pattern_spec(pattern, tag=None):
+    """Parse a pattern that may have predicates (as mapping), like::
+
+        {"pattern": "**/*.log", "older_than": "7d", "min_size": "100MB"}
+
+    :param pattern:  Pattern (as string or mapping with "pattern" key).
+    :param tag:      Tag of the pattern.
+    :return: Tuple (pattern, tag) with tag as :class:`PathPredicate` (if any).
+    :raises ValueError: If the pattern specification is invalid.
+    """
+    if not hasattr(pattern, "keys"):
+        return str(pattern), tag
+    options = dict((str(name), pattern[name]) for name in pattern.keys())
+    text = options.pop("pattern", None)
+    if not text:
+        raise ValueError("pattern=%r (needs: pattern)" % (pattern,))
+    unknown = sorted(set(options) - set(PATH_PREDICATE_NAMES))
+    if unknown:
+        raise ValueError("pattern=%s: Unknown predicates: %s (expected: %s)" % \
+                         (text, ", ".join(unknown), ", ".join(PATH_PREDICATE_NAMES)))
+    text = str(text)
+    options = dict((name, value) for name, value in options.items()
+                   if value is not None)
+    if not options:
+        return text, tag
+    elif text.startswith("!"):
+        raise ValueError("pattern=%s: Negated patterns have no predicates" % text)
+    return text, PathPredicate(tag, **options)
+
+
+def has_pattern_predicates(pattern_groups):
+    """Check if any pattern of the pattern groups has predicates."""
+    return any(hasattr(pattern, "keys")
+               for patterns in pattern_groups.values() for pattern in patterns)
+
+
+def resolve_predicate_tags(tags, stat_func):
+    """Replace the predicate tags by their tags (if their condition holds).
+    The stat result is only requested if a predicate decides a tag.
+
+    :param tags:       Tags of a matched path (as frozenset).
+    :param stat_func:  Provides the stat result of the path (as callable).
+    :return: Tags of the path (as frozenset).
+    """
+    plain_tags = set(tag for tag in tags if not isinstance(tag, PathPredicate))
+    if len(plain_tags) == len(tags):
+        return tags
+    stat_result = None
+    for tag in tags:
+        if not isinstance(tag, PathPredicate) or tag.tag in plain_tags:
+            continue
+        if stat_result is None:
+            try:
+                stat_result = stat_func()
+            except OSError:
+                # -- VANISHED: Path was removed (in the meantime).
+                break
+        if tag.matches(stat_result):
+            plain_tags.add(tag.tag)
+    return frozenset(plain_tags)
+
+
+def _entry_stat(entry, path):
+    """Stat result of a directory entry (cached) without following symlinks."""
+    entry_stat = getattr(entry, "stat", None)
+    if entry_stat is not None:
+        return entry_stat(follow_symlinks=False)
+    # -- TREE INDEX: Restored entries have no stat result.
+    return os.lstat(path)
+
+
+class PathRecord(object):
+    """Path that the tree walker has selected (a lightweight match record).
+    Keeps the directory entry with its file type (and its cached stat result),
+    so that consumers need no extra stat() calls and no path objects.
+    Unpacks like a (path, tags) tuple.
+
+    Records of a tree walk are marked as ``walked``: They never lie below
+    a pruned directory (no further parent checks are needed).
+    """
+    __slots__ = ("path", "abs_path", "tags", "entry", "walked", "_is_dir", "_stat")
+
+    def __init__(self, path, abs_path, tags, entry=None, is_dir=None, walked=False):
+        self.path = path
+        self.abs_path = abs_path
+        self.tags = tags
+        self.entry = entry
+        self.walked = walked
+        self._is_dir = is_dir
+        self._stat = None
+
+    def is_dir(self, follow_symlinks=True):
+        if self.entry is not None:
+            return self.entry.is_dir(follow_symlinks=follow_symlinks)
+        elif self._is_dir is None:
+            self._is_dir = os.path.isdir(self.path)
+        if not follow_symlinks and self._is_dir:
+            return not os.path.islink(self.path)
+        return self._is_dir
+
+    def is_file(self):
+        is_file = getattr(self.entry, "is_file", None)
+        if is_file is not None:
+            return is_file()
+        return os.path.isfile(self.path)
+
+    def stat(self):
+        """Stat result of the path (without following symlinks, cached)."""
+        entry_stat = getattr(self.entry, "stat", None)
+        if entry_stat is not None:
+            return entry_stat(follow_symlinks=False)
+        elif self._stat is None:
+            self._stat = os.lstat(self.path)
+        return self._stat
+
+    def __iter__(self):
+        return iter((self.path, self.tags))
+
+    def __str__(self):
+        return self.path
+
+    def __fspath__(self):
+        return self.path
+
+    def __repr__(self):
+        return "<PathRecord: %s>" % self.path
+
+
+def as_path_record(path):
+    """Convert a path into a path record (if it is none already).
+
+    :param path:  Path (as :class:`PathRecord`, Path, string).
+    :return: Path record (as :class:`PathRecord`).
+    """
+    if isinstance(path, PathRecord):
+        return path
+    path = str(path)
+    return PathRecord(path, os.path.abspath(path), frozenset())
+
+
+def _normcase_name(name):
+    if CASE_SENSITIVE:
+        return name
+    return name.lower()
+
+
+def _normcase_path(path):
+    if CASE_SENSITIVE:
+        return path
+    return os.path.normcase(path)
+
+
+class _MatcherNode(object):
+    """Node of the pattern automaton (a set of pattern positions).
+
+    * literals:   Maps a (normcased) name to the next states.
+    * suffixes:   Maps a (normcased) suffix of "*<suffix>" to the next states.
+    * suffix_lengths: Lengths of these suffixes (one lookup per length).
+    * wildcards:  List of (match_func, next_states) pairs.
+    * recursive:  Next states if a directory is consumed by "**".
+    * accepts:    Tags of patterns that match a file here.
+    * accepts_dir: Tags of patterns that match a directory here.
+    * alive:      Indicates if any (non-negated) pattern may match below this node.
+    """
+    __slots__ = ("states", "literals", "suffixes", "suffix_lengths", "wildcards",
+                 "recursive", "accepts", "accepts_dir", "alive")
+
+    def __init__(self, states):
+        self.states = states
+        self.literals = {}
+        self.suffixes = {}
+        self.suffix_lengths = ()
+        self.wildcards = []
+        self.recursive = None
+        self.accepts = frozenset()
+        self.accepts_dir = frozenset()
+        self.alive = False
+
+
+class PathMatcher(object):
+    """Matches many path patterns at once while walking a directory tree.
+
+    Each pattern is a sequence of path components (literal names, wildcards
+    or the recursive wildcard "**"). All patterns are compiled into one
+    automaton whose nodes are sets of pattern positions. Nodes are built
+    lazily and cached, therefore the matching costs per directory entry
+    do not depend on the number of visited directories.
+
+    Literal names and suffix patterns, like "**/*.pyc", are matched with
+    one hash lookup (per suffix length). Only the other wildcards need
+    a regular expression match per directory entry.
+
+    Each pattern is anchored at its literal base directory,
+    like "build" for "build/**/*.o". A walk starts at the base directories
+    (instead of the top directory) if no other pattern needs to walk there.
+
+    Alternatives, like "**/*.{pyc,pyo}", are expanded into many patterns
+    (see: :func:`expand_braces()`). A negated pattern, like "!**/keep.log",
+    drops its tag from the paths that it matches (in any order).
+    Negated patterns are evaluated by the same automaton, but they never
+    cause a walk into a directory.
+
+    A pattern with predicates, like ``{"pattern": "**/*.log", "older_than": "7d"}``,
+    uses a :class:`PathPredicate` as tag. The walk checks the predicates
+    of a matched path with the stat result of its directory entry.
+
+    EXAMPLE::
+
+        matcher = PathMatcher()
+        matcher.add_pattern("**/*.{pyc,pyo}", "file")
+        matcher.add_pattern("!**/keep/*.pyc", "file")
+        matcher.add_pattern("build/", "directory")
+        for path, tags in matcher.walk("."):
+            print("%s (%s)" % (path, ", ".join(tags)))
+    """
+
+    def __init__(self):
+        self.patterns = []
+        self.has_predicates = False
+        self._states = []
+        self._start_states = []
+        self._negated_start_states = []
+        self._negated = set()
+        self._nodes = {}
+        self._start = None
+        self._start_seeds = None
+
+    def add_pattern(self, pattern, tag=None):
+        """Add a pattern to this matcher.
+
+        :param pattern:  File/directory pattern, like "**/*.py" (as string).
+            Supports alternatives "{a,b}" and negation "!pattern".
+            Patterns with predicates are mappings (see: :func:`parse_pattern_spec()`).
+        :param tag:      Tag that is reported if this pattern matches.
+        """
+        pattern, tag = parse_pattern_spec(pattern, tag)
+        if isinstance(tag, PathPredicate):
+            self.has_predicates = True
+        negated = pattern.startswith("!")
+        for alternative in expand_braces(pattern[1:] if negated else pattern):
+            if negated:
+                start_state = self._compile_pattern("!" + alternative, tag)
+                self._negated.add(self._states[start_state][2])
+                self._negated_start_states.append(start_state)
+            else:
+                self._start_states.append(self._compile_pattern(alternative, tag))
+        # -- INVALIDATE: Start nodes (other nodes depend only on their states).
+        self._start = None
+        self._start_seeds = None
+
+    def extend_node(self, node, patterns, drop_tag=None):
+        """Add patterns that are anchored at the directory of a node.
+        These patterns only apply below this directory.
+
+        :param node:      Node of the directory (or None).
+        :param patterns:  Patterns with their tags (as list of (pattern, tag)).
+        :param drop_tag:  Predicate ``drop_tag(tag)`` for patterns of the node
+            that no longer apply below this directory (optional).
+        :return: Node with the states of the added patterns.
+        """
+        states = set()
+        if node is not None:
+            states.update(node.states)
+        if drop_tag:
+            states = set(state for state in states
+                         if not drop_tag(self._tag_of_state(state)))
+        for pattern, tag in patterns:
+            states.update(self._closure(self._compile_pattern(pattern, tag)))
+        return self._make_node(frozenset(states))
+
+    @property
+    def start(self):
+        """Start node of the automaton (for the top directory)."""
+        if self._start is None:
+            states = set()
+            for state in self._start_states + self._negated_start_states:
+                states.update(self._closure(state))
+            self._start = self._make_node(frozenset(states))
+        return self._start
+
+    def step(self, node, name, is_dir=False):
+        """Advance the automaton by one path component.
+
+        :param node:    Current node (of the parent directory).
+        :param name:    Name of the directory entry.
+        :param is_dir:  Indicates if the entry is a directory (as bool).
+        :return: Next node (or None, if no pattern can match).
+        """
+        next_states = set()
+        if node.literals or node.suffix_lengths:
+            normcased_name = _normcase_name(name)
+            states = node.literals.get(normcased_name)
+            if states:
+                next_states.update(states)
+            for length in node.suffix_lengths:
+                # -- FAST PATH: "*.pyc" is a hash lookup of the name suffix.
+                states = node.suffixes.get(normcased_name[len(normcased_name)-length:])
+                if states:
+                    next_states.update(states)
+        for match, states in node.wildcards:
+            if match(name):
+                next_states.update(states)
+        if is_dir and node.recursive:
+            next_states.update(node.recursive)
+        if not next_states:
+            return None
+        return self._make_node(frozenset(next_states))
+
+    def walk(self, top, pruned=None, prune_match=None, jobs=1, index=None,
+             gitignore=None, follow_symlinks=False, max_depth=None,
+             one_file_system=False, scan_limiter=None):
+        """Walk the directory tree below top and yield the matched entries.
+        Directories are only entered if a pattern may match below them.
+        Pruned directories are not entered. Symlinked directories are only
+        entered if symlinks are followed. No directory is walked twice.
+
+        :param top:     Top directory of the walk (as string, "" for cwd).
+        :param pruned:  Directories to skip (as set of normcased absolute paths).
+        :param prune_match:  Predicate ``prune_match(directory, tags)`` that
+            indicates if a matched directory should not be entered.
+        :param jobs:    Number of threads that list directories (as int).
+        :param index:   Tree index to reuse unchanged directories (optional).
+        :param gitignore:  Selects the paths that git ignores (optional).
+        :param follow_symlinks:  Enter symlinked directories (as bool).
+        :param max_depth:  Selects paths up to this depth below top (as int).
+        :param one_file_system:  Stay on the filesystem of top (as bool).
+        :param scan_limiter:  Limits the listed directories per second
+            (as :class:`RateLimiter`, optional).
+        :return: Iterator of path records (as :class:`PathRecord`).
+        """
+        tree_walk = _TreeWalk(self, top, pruned=pruned, prune_match=prune_match,
+                              index=index, gitignore=gitignore,
+                              follow_symlinks=follow_symlinks,
+                              max_depth=max_depth,
+                              one_file_system=one_file_system,
+                              scan_limiter=scan_limiter)
+        return tree_walk.run(jobs)
+
+    # -- IMPLEMENTATION DETAILS:
+    def _compile_pattern(self, pattern, tag):
+        """Append the states of a pattern (states are never changed later).
+
+        :return: First state of the pattern (as int).
+        """
+        components, dir_only = split_pattern(pattern.lstrip("!"))
+        pattern_index = len(self.patterns)
+        self.patterns.append((pattern, tag, dir_only))
+        start_state = len(self._states)
+        for component in components:
+            if component == RECURSIVE_WILDCARD:
+                state = (STATE_RECURSIVE, None)
+            elif (component.startswith("*") and len(component) > 1 and
+                  not _WILDCARD_CHARS.search(component, 1)):
+                # -- SUFFIX PATTERN: "*.pyc" needs no regular expression.
+                state = (STATE_SUFFIX, _normcase_name(component[1:]))
+            elif _WILDCARD_CHARS.search(component):
+                state = (STATE_WILDCARD, fnmatch.translate(component))
+            else:
+                state = (STATE_LITERAL, _normcase_name(component))
+            self._states.append(state + (pattern_index,))
+        self._states.append((STATE_ACCEPT, None, pattern_index))
+        return start_state
+
+    def _tag_of_state(self, state):
+        pattern_index = self._states[state][2]
+        return self.patterns[pattern_index][1]
+
+    @property
+    def _seeds(self):
+        """Splits each pattern into its literal base and its wildcard tail.
+        Patterns with the same base are grouped together.
+        Negated patterns have no base: Their states are carried to each base.
+
+        :return: Start states per base (as dict: tuple of names -> frozenset).
+        """
+        if self._start_seeds is None:
+            seeds = {}
+            for state in self._start_states:
+                base = []
+                while self._states[state][0] == STATE_LITERAL:
+                    base.append(self._states[state][1])
+                    state += 1
+                seeds.setdefault(tuple(base), set()).update(self._closure(state))
+            if self._negated_start_states:
+                negated_states = set()
+                for state in self._negated_start_states:
+                    negated_states.update(self._closure(state))
+                negated_node = self._make_node(frozenset(negated_states))
+                for base, states in seeds.items():
+                    node = negated_node
+                    for name in base:
+                        node = self.step(node, name, is_dir=True)
+                        if node is None:
+                            break
+                    if node is not None:
+                        states.update(node.states)
+            self._start_seeds = dict((base, frozenset(states))
+                                     for base, states in seeds.items())
+        return self._start_seeds
+
+    def _plan_walk(self, top):
+        """Determine where the walks start.
+        A base is injected into the walk of an outer base if that walk
+        reaches it anyway. Otherwise, the base starts its own walk.
+
+        :return: Tuple (root_bases, injected_states_by_path).
+        """
+        root_bases = []
+        injected = {}
+        reached = {}
+        for base in sorted(self._seeds):
+            states = self._seeds[base]
+            node = None
+            if os.pardir not in base:
+                node = self._reach_from_outer_base(base, reached)
+            if node is None:
+                root_bases.append(base)
+                reached[base] = self._make_node(states)
+            else:
+                path = _normcase_path(os.path.join(top, *base))
+                injected[path] = states
+                reached[base] = self._make_node(node.states | states)
+        return root_bases, injected
+
+    def _reach_from_outer_base(self, base, reached):
+        for size in range(len(base)-1, -1, -1):
+            node = reached.get(base[:size])
+            if node is None:
+                continue
+            for name in base[size:]:
+                if not node.alive:
+                    return None
+                node = self.step(node, name, is_dir=True)
+                if node is None:
+                    return None
+            return node
+        return None
+
+    def _closure(self, state):
+        # -- RECURSIVE WILDCARD: "**" may also match zero directories.
+        states = [state]
+        while self._states[state][0] == STATE_RECURSIVE:
+            state += 1
+            states.append(state)
+        return states
+
+    def _make_node(self, states):
+        node = self._nodes.get(states)
+        if node is not None:
+            return node
+
+        node = _MatcherNode(states)
+        suffixes = {}
+        wildcards = {}
+        recursive = set()
+        accepts = set()
+        accepts_dir = set()
+        rejects = set()
+        rejects_dir = set()
+        for state in states:
+            kind, value, pattern_index = self._states[state]
+            negated = pattern_index in self._negated
+            if kind == STATE_ACCEPT:
+                _, tag, dir_only = self.patterns[pattern_index]
+                if negated:
+                    (rejects_dir if dir_only else rejects).add(tag)
+                elif dir_only:
+                    accepts_dir.add(tag)
+                else:
+                    accepts.add(tag)
+                continue
+
+            if not negated:
+                node.alive = True
+            if kind == STATE_RECURSIVE:
+                recursive.update(self._closure(state))
+            elif kind == STATE_LITERAL:
+                node.literals.setdefault(value, set()).update(self._closure(state+1))
+            elif kind == STATE_SUFFIX:
+                suffixes.setdefault(value, set()).update(self._closure(state+1))
+            elif kind == STATE_WILDCARD:
+                wildcards.setdefault(value, set()).update(self._closure(state+1))
+
+        flags = 0 if CASE_SENSITIVE else re.IGNORECASE
+        node.wildcards = [(re.compile(regex, flags).match, frozenset(next_states))
+                          for regex, next_states in wildcards.items()]
+        node.suffixes = dict((suffix, frozenset(next_states))
+                             for suffix, next_states in suffixes.items())
+        node.suffix_lengths = tuple(sorted(set(len(suffix) for suffix in suffixes)))
+        node.recursive = frozenset(recursive)
+        node.accepts = _drop_rejected_tags(accepts, rejects)
+        node.accepts_dir = _drop_rejected_tags(accepts | accepts_dir,
+                                               rejects | rejects_dir)
+        self._nodes[states] = node
+        return node
+
+
+def _drop_rejected_tags(tags, rejects):
+    """Drop the rejected tags (and predicate tags with a rejected tag)."""
+    return frozenset(tag for tag in tags
+                     if tag not in rejects and
+                     getattr(tag, "tag", tag) not in rejects)
+
+
+def _path_depth(abs_path):
+    """Number of path components of a normalized, absolute path."""
+    return abs_path.rstrip(os.sep).count(os.sep)
+
+
+class _TreeWalk(object):
+    """One walk of a directory tree (see: :meth:`PathMatcher.walk()`)."""
+
+    def __init__(self, matcher, top, pruned=None, prune_match=None, index=None,
+                 anchored=True, gitignore=None, follow_symlinks=False,
+                 max_depth=None, one_file_system=False, scan_limiter=None):
+        self.matcher = matcher
+        self.top = top
+        self.pruned = pruned
+        self.prune_match = prune_match
+        self.index = index
+        self.gitignore = gitignore
+        self.follow_symlinks = follow_symlinks
+        self.max_depth = max_depth
+        self.one_file_system = one_file_system
+        self.scan_limiter = scan_limiter
+        self.top_device = None
+        self.top_depth = _path_depth(os.path.abspath(top or os.curdir))
+        # -- LOOP PROTECTION: (st_dev, st_ino) of each walked directory.
+        # HINT: Symlinks (if followed) and bind mounts may cause loops.
+        self.visited = set()
+        if gitignore is not None:
+            # -- GITIGNORE: Rules are found while walking (down from top).
+            anchored = False
+        self.anchored = anchored
+        if anchored:
+            self.root_bases, self.injected = matcher._plan_walk(top)
+        else:
+            # -- UNANCHORED: Walks from top (and also enters missing bases later).
+            self.root_bases, self.injected = [()], {}
+
+    def run(self, jobs=1):
+        matches = []
+        subdirs = self.select_roots(matches)
+        for match in matches:
+            yield match
+        if jobs > 1 and subdirs:
+            for match in self._run_parallel(subdirs, jobs):
+                yield match
+            return
+
+        stack = list(reversed(subdirs))
+        while stack:
+            directory, abs_directory, node = stack.pop()
+            entries, dir_stat = self.list_directory(directory, abs_directory)
+            if entries is None:
+                continue
+            matches = []
+            subdirs = []
+            self.select_entries(directory, abs_directory, node, entries,
+                                dir_stat, matches, subdirs)
+            for match in matches:
+                yield match
+            stack.extend(reversed(subdirs))
+
+    def _run_parallel(self, subdirs, jobs):
+        """Walk with a thread pool that lists sibling directories concurrently.
+        Matching is done in the calling thread (order of matches may vary).
+        """
+        executor = ThreadPoolExecutor(max_workers=jobs)
+        try:
+            pending = {}
+            for subdir in subdirs:
+                future = executor.submit(self.list_directory, *subdir[:2])
+                pending[future] = subdir
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    directory, abs_directory, node = pending.pop(future)
+                    entries, dir_stat = future.result()
+                    if entries is None:
+                        continue
+                    matches = []
+                    subdirs = []
+                    self.select_entries(directory, abs_directory, node, entries,
+                                        dir_stat, matches, subdirs)
+                    for match in matches:
+                        yield match
+                    for subdir in subdirs:
+                        future = executor.submit(self.list_directory, *subdir[:2])
+                        pending[future] = subdir
+        finally:
+            executor.shutdown(wait=True)
+
+    def list_directory(self, directory, abs_directory):
+        """List a directory (or reuse its entries from the tree index).
+
+        :return: Tuple (entries, dir_stat) or (None, None) if not accessible.
+        """
+        if self.scan_limiter is not None:
+            self.scan_limiter.acquire()
+        if self.index is not None:
+            entries, dir_stat = self.index.list_directory(directory, abs_directory)
+            if dir_stat is not None and not self._is_top_device(dir_stat):
+                return None, None
+            return entries, dir_stat
+        try:
+            dir_stat = os.stat(directory or os.curdir)
+        except OSError:
+            return None, None
+        if not self._is_top_device(dir_stat):
+            # -- OTHER FILESYSTEM: Mount point is not entered.
+            return None, None
+        return list_directory(directory), dir_stat
+
+    def select_roots(self, matches):
+        """Select the matches at the walk roots (top and literal bases).
+
+        :return: Directories to walk (as list of (path, abs_path, node)).
+        """
+        top = self.top
+        abs_top = os.path.abspath(top or os.curdir)
+        subdirs = []
+        if self.one_file_system:
+            try:
+                self.top_device = os.stat(top or os.curdir).st_dev
+            except OSError:
+                return subdirs
+        max_depth = self.max_depth
+        for base in self.root_bases:
+            # -- ANCHORED WALK: Starts at the literal base directory.
+            if self.anchored:
+                node = self.matcher._make_node(self.matcher._seeds[base])
+            else:
+                node = self.matcher.start
+                if self.gitignore is not None:
+                    node = self.gitignore.start_node(self.matcher, abs_top, node)
+            if not base:
+                if not os.path.isdir(top or os.curdir):
+                    # -- NO DIRECTORY: Root of an absolute pattern is a file.
+                    continue
+                tags = node.accepts_dir
+                if tags and self.matcher.has_predicates:
+                    tags = resolve_predicate_tags(tags,
+                                                  lambda: os.lstat(abs_top))
+                if tags:
+                    matches.append(PathRecord((top or os.curdir), abs_top, tags,
+                                              is_dir=True, walked=True))
+                subdirs.append((top, abs_top, node))
+                continue
+
+            if max_depth is not None and len(base) > max_depth:
+                # -- TOO DEEP: Base is below the max_depth limit.
+                continue
+            path = os.path.join(top, *base)
+            abs_path = os.path.normpath(os.path.join(abs_top, *base))
+            if self.pruned and self._is_pruned_base(abs_top, base):
+                continue
+            is_dir, enters_dir = self._stat_base(top, base)
+            if is_dir is None:
+                # -- MISSING BASE: Costs one stat() call (no listing).
+                continue
+            if self.one_file_system and not self._is_top_device_path(path):
+                continue
+            tags = node.accepts_dir if is_dir else node.accepts
+            if tags and self.matcher.has_predicates:
+                tags = resolve_predicate_tags(tags, lambda: os.lstat(path))
+            if tags:
+                matches.append(PathRecord(path, abs_path, tags, is_dir=is_dir,
+                                          walked=True))
+                if is_dir and self.prune_match and self.prune_match(path, tags):
+                    continue
+            if enters_dir and node.alive and (max_depth is None or len(base) < max_depth):
+                subdirs.append((path, abs_path, node))
+        return subdirs
+
+    def select_entries(self, directory, abs_directory, node, entries, dir_stat,
+                       matches, subdirs):
+        """Select the matches of one directory listing.
+        Collects the matches and the subdirectories that need to be walked.
+        """
+        matcher = self.matcher
+        injected = self.injected
+        pruned = self.pruned
+        prune_match = self.prune_match
+        gitignore = self.gitignore
+        follow_symlinks = self.follow_symlinks
+        one_file_system = self.one_file_system
+        has_predicates = matcher.has_predicates
+        descend = (self.max_depth is None or
+                   _path_depth(abs_directory) - self.top_depth + 1 < self.max_depth)
+        relevant_entries = None
+        if dir_stat is not None:
+            directory_id = (dir_stat.st_dev, dir_stat.st_ino)
+            if directory_id in self.visited:
+                # -- LOOP DETECTED: Directory was already walked.
+                return
+            self.visited.add(directory_id)
+            if self.index is not None:
+                relevant_entries = []
+        if gitignore is not None:
+            node, entries = gitignore.enter_directory(matcher, abs_directory,
+                                                      node, entries)
+
+        for entry in entries:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if follow_symlinks and not is_dir:
+                is_dir = entry.is_dir()
+            child = matcher.step(node, entry.name, is_dir)
+            path = None
+            if injected:
+                # -- NESTED BASE: Add the patterns that are anchored here.
+                path = os.path.join(directory, entry.name) if directory else entry.name
+                more_states = injected.get(_normcase_path(path))
+                if more_states:
+                    if child is not None:
+                        more_states = more_states | child.states
+                    child = matcher._make_node(more_states)
+            if child is None:
+                continue
+            if relevant_entries is not None:
+                relevant_entries.append(entry)
+            if path is None:
+                path = os.path.join(directory, entry.name) if directory else entry.name
+            tags = child.accepts
+            if child.accepts_dir != tags and (is_dir or entry.is_dir()):
+                tags = child.accepts_dir
+            if has_predicates and tags:
+                # -- CACHED STAT: From the directory entry (no extra stat pass).
+                tags = resolve_predicate_tags(tags, lambda: _entry_stat(
+                    entry, os.path.join(abs_directory, entry.name)))
+            if gitignore is not None and tags:
+                tags = gitignore.resolve_tags(tags, is_dir)
+            abs_path = None
+            if tags:
+                abs_path = os.path.join(abs_directory, entry.name)
+                if (one_file_system and is_dir and
+                        not self._is_top_device_path(abs_path)):
+                    # -- MOUNT POINT: Is neither selected nor entered.
+                    continue
+                matches.append(PathRecord(path, abs_path, tags, entry,
+                                          walked=True))
+                if is_dir and prune_match and prune_match(path, tags):
+                    continue
+            if is_dir and descend and child.alive:
+                if abs_path is None:
+                    abs_path = os.path.join(abs_directory, entry.name)
+                if pruned and _normcase_path(abs_path) in pruned:
+                    # -- EXCLUDED SUBTREE: Is never read.
+                    continue
+                if (gitignore is not None and prune_match is not None and
+                        gitignore.is_ignored(child.accepts_dir)):
+                    # -- KEPT IGNORED DIRECTORY: Not pruned (has tracked files).
+                    child = gitignore.ignore_contents(matcher, child)
+                subdirs.append((path, abs_path, child))
+
+        if relevant_entries is not None:
+            self.index.store(abs_directory, dir_stat, relevant_entries)
+
+    def _stat_base(self, top, base):
+        """Check the file type of a literal base.
+        Symlinks in a literal base are resolved (explicitly named path).
+        Only a symlink as last component is selected like a walked entry
+        (not as directory, unless symlinks are followed).
+
+        :return: Tuple (is_dir, enters_dir) or (None, None) if base is missing.
+        """
+        path = os.path.join(top, *base)
+        try:
+            # -- MISSING BASE: Is detected with one lstat() call.
+            mode = os.lstat(path).st_mode
+        except OSError:
+            return None, None
+        if not stat.S_ISLNK(mode):
+            is_dir = stat.S_ISDIR(mode)
+            return is_dir, is_dir
+        try:
+            enters_dir = stat.S_ISDIR(os.stat(path).st_mode)
+        except OSError:
+            # -- DANGLING SYMLINK:
+            enters_dir = False
+        if self.follow_symlinks:
+            return enters_dir, enters_dir
+        return False, enters_dir
+
+    def _is_top_device(self, dir_stat):
+        return self.top_device is None or dir_stat.st_dev == self.top_device
+
+    def _is_top_device_path(self, path):
+        try:
+            if self.follow_symlinks:
+                return self._is_top_device(os.stat(path))
+            return self._is_top_device(os.lstat(path))
+        except OSError:
+            return False
+
+    def _is_pruned_base(self, abs_top, base):
+        for size in range(1, len(base)+1):
+            abs_path = os.path.normpath(os.path.join(abs_top, *base[:size]))
+            if _normcase_path(abs_path) in self.pruned:
+                return True
+        return False
+
+
+# -----------------------------------------------------------------------------
+# GITIGNORE SUPPORT: Select ignored paths (like: git clean -X)
+# -----------------------------------------------------------------------------
+GITIGNORE_FILENAME = ".gitignore"
+GIT_DIRNAME = ".git"
+GITIGNORE_SCOUT_TAG = "__gitignore__"
+_GITIGNORE_ESCAPE = re.compile(r"\\(.)")
+_GitIgnoreRule = collections.namedtuple("_GitIgnoreRule", ("priority", "negated"))
+# -- IGNORED DIRECTORY: Its contents cannot be re-included (highest priority).
+_GITIGNORE_CONTENTS_RULE = _GitIgnoreRule((sys.maxsize, 0), False)
+
+
+def parse_gitignore(lines):
+    """Parse the lines of a .gitignore file into path patterns.
+    Patterns without a slash match at any depth (like: "**/*.log").
+    Other patterns are relative to the directory of the .gitignore file.
+
+    :param lines:  Lines of a .gitignore file (as list of string).
+    :return: List of (pattern, negated) tuples.
+    """
+    patterns = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("#"):
+            continue
+        stripped = line.rstrip(" ")
+        if stripped.endswith("\\") and len(stripped) < len(line):
+            # -- ESCAPED TRAILING SPACE: "foo\ "
+            stripped += " "
+        line = stripped
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        anchored = "/" in line
+        line = _GITIGNORE_ESCAPE.sub(_escape_gitignore_char, line.lstrip("/"))
+        if line.endswith("/" + RECURSIVE_WILDCARD):
+            # -- "foo/**": Matches everything inside (but not "foo" itself).
+            line += "/*"
+        if not anchored:
+            line = RECURSIVE_WILDCARD + "/" + line
+        if dir_only:
+            line += "/"
+        patterns.append((line, negated))
+    return patterns
+
+
+def _escape_gitignore_char(match):
+    char = match.group(1)
+    if char in "*?[":
+        return "[%s]" % char
+    return char
+
+
+class GitIgnore(object):
+    """Selects the paths that git ignores while the tree is walked.
+
+    The .gitignore files (and ".git/info/exclude") are read when the walk
+    enters their directory. Their rules are added to the pattern automaton
+    (anchored at this directory). Deeper .gitignore files and later rules
+    take precedence. Negated rules ("!pattern") re-include paths.
+    A nested repository only uses its own rules. ".git" is never entered.
+    If an ignored directory is not pruned (because it contains tracked files),
+    its contents are ignored, too (like: git clean -X -d).
+
+    :param directory_tag:  Tag for ignored directories (as string).
+    :param file_tag:       Tag for ignored files (as string).
+    """
+    SCOUT_PATTERN = RECURSIVE_WILDCARD + "/" + GITIGNORE_FILENAME
+
+    def __init__(self, directory_tag="directory", file_tag="file"):
+        self.directory_tag = directory_tag
+        self.file_tag = file_tag
+
+    def prepare(self, matcher):
+        """Prepare the matcher: Enter each directory to find .gitignore files."""
+        matcher.add_pattern(self.SCOUT_PATTERN, GITIGNORE_SCOUT_TAG)
+
+    def start_node(self, matcher, abs_top, node):
+        """Node of the top directory with the rules of its parent directories.
+        Starts at the root directory of the repository (if any).
+        """
+        abs_top = os.path.normpath(abs_top)
+        if os.path.exists(os.path.join(abs_top, GIT_DIRNAME)):
+            # -- TOP IS REPOSITORY ROOT: Rules are loaded when it is listed.
+            return node
+        parents = []
+        directory = abs_top
+        while True:
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                # -- NO REPOSITORY: Rules below top are used.
+                return node
+            parents.append(os.path.basename(directory))
+            directory = parent
+            if os.path.isdir(directory) and os.path.exists(os.path.join(directory, GIT_DIRNAME)):
+                break
+
+        # -- REPOSITORY ROOT FOUND: Walk down to top (without listings).
+        outer_node = self._load_rules(matcher, directory, None, new_repository=True)
+        for name in reversed(parents):
+            outer_node = matcher.step(outer_node, name, is_dir=True) or matcher.extend_node(None, [])
+            directory = os.path.join(directory, name)
+            if self.is_ignored(outer_node.accepts_dir):
+                outer_node = self.ignore_contents(matcher, outer_node)
+            if directory != abs_top:
+                outer_node = self._load_rules(matcher, directory, outer_node)
+        rule_states = frozenset(state for state in outer_node.states
+                                if isinstance(matcher._tag_of_state(state), _GitIgnoreRule))
+        return matcher._make_node(node.states | rule_states)
+
+    def enter_directory(self, matcher, abs_directory, node, entries):
+        """Add the rules of a directory to its node (before its entries are matched).
+
+        :return: Tuple (node, entries) without the ".git" entry.
+        """
+        names = set(entry.name for entry in entries)
+        if GIT_DIRNAME in names:
+            entries = [entry for entry in entries if entry.name != GIT_DIRNAME]
+            node = self._load_rules(matcher, abs_directory, node, new_repository=True)
+        elif GITIGNORE_FILENAME in names:
+            node = self._load_rules(matcher, abs_directory, node)
+        return node, entries
+
+    def resolve_tags(self, tags, is_dir=False):
+        """Replace the rule tags by the tag for ignored paths (if ignored).
+        The rule with the highest priority wins.
+        """
+        other_tags = set(tag for tag in tags
+                         if not (isinstance(tag, _GitIgnoreRule) or
+                                 tag == GITIGNORE_SCOUT_TAG))
+        if self.is_ignored(tags):
+            other_tags.add(is_dir and self.directory_tag or self.file_tag)
+        return frozenset(other_tags)
+
+    @staticmethod
+    def is_ignored(tags):
+        """Check if the rule tags ignore a path (the highest priority wins)."""
+        rule = None
+        for tag in tags:
+            if isinstance(tag, _GitIgnoreRule):
+                if rule is None or tag.priority > rule.priority:
+                    rule = tag
+        return rule is not None and not rule.negated
+
+    @staticmethod
+    def ignore_contents(matcher, node):
+        """Node of an ignored directory that is entered anyway:
+        Everything below it is ignored, too (negated rules do not apply).
+        """
+        pattern = RECURSIVE_WILDCARD + "/*"
+        return matcher.extend_node(node, [(pattern, _GITIGNORE_CONTENTS_RULE)])
+
+    # -- IMPLEMENTATION DETAILS:
+    def _load_rules(self, matcher, abs_directory, node, new_repository=False):
+        depth = abs_directory.count(os.sep)
+        rules = []
+        if new_repository:
+            # -- LOWEST PRIORITY: Rules of the repository (not shared).
+            exclude_file = os.path.join(abs_directory, GIT_DIRNAME, "info", "exclude")
+            for index, (pattern, negated) in enumerate(self._read_rules(exclude_file)):
+                rules.append((pattern, _GitIgnoreRule((-1, index), negated)))
+        gitignore_file = os.path.join(abs_directory, GITIGNORE_FILENAME)
+        for index, (pattern, negated) in enumerate(self._read_rules(gitignore_file)):
+            rules.append((pattern, _GitIgnoreRule((depth, index), negated)))
+        if not rules and not new_repository:
+            return node
+
+        drop_tag = None
+        if new_repository:
+            drop_tag = self._is_rule_tag
+        return matcher.extend_node(node, rules, drop_tag=drop_tag)
+
+    @staticmethod
+    def _is_rule_tag(tag):
+        return isinstance(tag, _GitIgnoreRule)
+
+    @staticmethod
+    def _read_rules(filename):
+        try:
+            with io.open(filename, encoding="utf-8", errors="replace") as f:
+                return parse_gitignore(f.readlines())
+        except (IOError, OSError):
+            return []
+
+
+# -----------------------------------------------------------------------------
+# GIT INDEX: Tracked-file guard
+# -----------------------------------------------------------------------------
+GIT_INDEX_SIGNATURE = b"DIRC"
+GIT_INDEX_EXTENDED_FLAG = 0x4000
+GIT_INDEX_HEADER = struct.Struct(">4sLL")
+GIT_INDEX_EXTENSION_HEADER = struct.Struct(">4sL")
+GIT_INDEX_HASH_SIZE = 20    # -- SHA-1 (SHA-256 repositories: Invalid index).
+# -- REQUIRED EXTENSIONS: Lowercase signature (others: optional, like "TREE").
+GIT_INDEX_SPLIT_EXTENSION = b"link"
+GIT_INDEX_SPARSE_EXTENSION = b"sdir"
+
+
+def read_git_index(filename):
+    """Read the paths of a git index file (versions: 2, 3, 4).
+    A split index (extension: "link") is merged with its shared index.
+
+    :param filename:  Index file, like ".git/index" (as string).
+    :return: List of (path, mode) tuples (path: relative, with "/" as separator).
+    :raises ValueError: If the file is no supported git index
+        (or if it needs an unsupported extension).
+    """
+    with open(filename, "rb") as f:
+        data = bytearray(f.read())
+    if len(data) < GIT_INDEX_HEADER.size:
+        raise ValueError("%s: Invalid git index (too short)" % filename)
+    signature, version, count = GIT_INDEX_HEADER.unpack_from(bytes(data), 0)
+    if signature != GIT_INDEX_SIGNATURE or version not in (2, 3, 4):
+        raise ValueError("%s: Unsupported git index (version: %s)" % (filename, version))
+
+    entries = []
+    offset = GIT_INDEX_HEADER.size
+    path = bytearray()
+    for _ in range(count):
+        # -- ENTRY: stat data (40 bytes), object name (20 bytes), flags (2 bytes)
+        mode = struct.unpack_from(">L", bytes(data[offset+24:offset+28]))[0]
+        flags = struct.unpack_from(">H", bytes(data[offset+60:offset+62]))[0]
+        header_size = 62
+        if version >= 3 and flags & GIT_INDEX_EXTENDED_FLAG:
+            header_size += 2
+        name_offset = offset + header_size
+        if version == 4:
+            # -- PREFIX COMPRESSION: Strip N bytes of the previous path.
+            strip_size, name_offset = _read_git_varint(data, name_offset)
+            end = data.index(0, name_offset)
+            path = path[:len(path)-strip_size] + data[name_offset:end]
+            offset = end + 1
+        else:
+            end = data.index(0, name_offset)
+            path = data[name_offset:end]
+            # -- PADDING: 1..8 NUL bytes (entry size is a multiple of 8).
+            offset += (header_size + len(path) + 8) & ~7
+        entries.append((path.decode("utf-8", "replace"), mode))
+
+    end = len(data) - GIT_INDEX_HASH_SIZE
+    while offset < end:
+        if offset + GIT_INDEX_EXTENSION_HEADER.size > end:
+            raise ValueError("%s: Invalid git index (extensions)" % filename)
+        signature, size = GIT_INDEX_EXTENSION_HEADER.unpack_from(bytes(data), offset)
+        offset += GIT_INDEX_EXTENSION_HEADER.size
+        if offset + size > end:
+            raise ValueError("%s: Invalid git index (extensions)" % filename)
+        if signature == GIT_INDEX_SPLIT_EXTENSION:
+            entries = _merge_git_shared_index(filename, entries,
+                                              data[offset:offset+size])
+        elif (signature != GIT_INDEX_SPARSE_EXTENSION and
+              not b"A" <= signature[:1] <= b"Z"):
+            raise ValueError("%s: Unsupported git index (extension: %s)" % \
+                             (filename, signature.decode("ascii", "replace")))
+        offset += size
+    return entries
+
+
+def _merge_git_shared_index(filename, entries, link_data):
+    """Merge the entries of a split index with its shared index.
+    Replaced entries (without path) use the path of their shared entry.
+
+    :param filename:   Split index file, like ".git/index" (as string).
+    :param entries:    Entries of the split index (as list).
+    :param link_data:  Data of the "link" extension (as bytearray).
+    :return: Merged list of (path, mode) tuples.
+    """
+    if len(link_data) < GIT_INDEX_HASH_SIZE:
+        raise ValueError("%s: Invalid git index (link extension)" % filename)
+    shared_name = binascii.hexlify(bytes(link_data[:GIT_INDEX_HASH_SIZE]))
+    shared_file = os.path.join(os.path.dirname(filename),
+                               "sharedindex." + shared_name.decode("ascii"))
+    shared_entries = read_git_index(shared_file)
+    deleted, offset = _read_git_ewah_bitmap(link_data, GIT_INDEX_HASH_SIZE)
+    replaced, offset = _read_git_ewah_bitmap(link_data, offset)
+
+    merged = []
+    replacements = iter(entries)
+    for position, (path, mode) in enumerate(shared_entries):
+        if position in replaced:
+            _, mode = next(replacements, (path, mode))
+        elif position in deleted:
+            continue
+        merged.append((path, mode))
+    # -- NEW ENTRIES: Follow the replaced entries.
+    merged.extend(replacements)
+    return merged
+
+
+def _read_git_ewah_bitmap(data, offset):
+    """Read the positions of the set bits of an EWAH compressed bitmap.
+
+    :return: Tuple (positions as set, offset after the bitmap).
+    """
+    if offset >= len(data):
+        # -- OPTIONAL: Bitmaps are missing (nothing deleted or replaced).
+        return set(), offset
+    _, word_count = struct.unpack_from(">LL", bytes(data[offset:offset+8]))
+    words_offset = offset + 8
+    end = words_offset + 8*word_count + 4
+    if end > len(data):
+        raise ValueError("Invalid git index (EWAH bitmap)")
+    words = struct.unpack_from(">%dQ" % word_count,
+                               bytes(data[words_offset:end-4]))
+    positions = set()
+    bit = 0
+    index = 0
+    while index < word_count:
+        # -- RUNNING LENGTH WORD: running bit, run length, literal word count.
+        marker = words[index]
+        run_size = 64 * ((marker >> 1) & 0xffffffff)
+        if marker & 1:
+            positions.update(range(bit, bit + run_size))
+        bit += run_size
+        literal_count = marker >> 33
+        for word in words[index+1:index+1+literal_count]:
+            positions.update(bit + i for i in range(64) if word >> i & 1)
+            bit += 64
+        index += 1 + literal_count
+    return positions, end
+
+
+def _read_git_varint(data, offset):
+    byte = data[offset]
+    offset += 1
+    value = byte & 0x7f
+    while byte & 0x80:
+        byte = data[offset]
+        offset += 1
+        value = ((value + 1) << 7) | (byte & 0x7f)
+    return value, offset
+
+
+class GitTrackedFiles(object):
+    """Guard for files (and their directories) that git tracks.
+
+    The index of each repository is read once (without spawning git),
+    when the guard first checks a path in the repository.
+    Afterwards, each check is a set lookup.
+    If the index cannot be read, each path in the repository is kept.
+    """
+    UNREADABLE = (frozenset(), frozenset())
+
+    def __init__(self):
+        self._repositories = {}
+        self._repository_of_directory = {}
+
+    def is_tracked(self, path):
+        """Check if git tracks a file (or submodule).
+
+        :param path:  Path to check (as Path, string).
+        :return: True, if the path is tracked.
+        """
+        abs_path = _normcase_path(os.path.abspath(str(path)))
+        repository = self._find_repository(os.path.dirname(abs_path))
+        if repository is self.UNREADABLE:
+            return True
+        return repository is not None and abs_path in repository[0]
+
+    def contains_tracked(self, directory):
+        """Check if a directory contains files that git tracks.
+
+        :param directory:  Directory to check (as Path, string).
+        :return: True, if the directory contains tracked files.
+        """
+        abs_directory = _normcase_path(os.path.abspath(str(directory)))
+        repository = self._find_repository(abs_directory)
+        if repository is self.UNREADABLE:
+            return True
+        return repository is not None and abs_directory in repository[1]
+
+    # -- IMPLEMENTATION DETAILS:
+    def _find_repository(self, abs_directory):
+        visited = []
+        directory = abs_directory
+        while True:
+            if directory in self._repository_of_directory:
+                root = self._repository_of_directory[directory]
+                break
+            visited.append(directory)
+            if os.path.exists(os.path.join(directory, GIT_DIRNAME)):
+                root = directory
+                break
+            parent = os.path.dirname(directory)
+            if parent == directory:
+                root = None
+                break
+            directory = parent
+        for directory in visited:
+            self._repository_of_directory[directory] = root
+
+        if root is None:
+            return None
+        repository = self._repositories.get(root)
+        if repository is None:
+            repository = self._load_repository(root)
+            self._repositories[root] = repository
+        return repository
+
+    @classmethod
+    def _load_repository(cls, root):
+        """Load the tracked files and the directories that contain them.
+
+        :return: Tuple (tracked_files, tracked_directories) as sets
+            (or :attr:`UNREADABLE`, if the index cannot be read).
+        """
+        tracked_files = set()
+        tracked_directories = set()
+        index_file = os.path.join(_git_dir_of(root), "index")
+        try:
+            entries = read_git_index(index_file)
+        except (IOError, OSError, ValueError) as e:
+            if not os.path.exists(index_file):
+                # -- NEW REPOSITORY: Nothing is tracked yet.
+                return tracked_files, tracked_directories
+            # -- FAIL CLOSED: Any path could be tracked.
+            print("TRACKED-GUARD: %s (keeps every path in: %s)" % (e, root))
+            return cls.UNREADABLE
+
+        for path, _ in entries:
+            abs_path = _normcase_path(os.path.join(root, *path.split("/")))
+            tracked_files.add(abs_path)
+            directory = os.path.dirname(abs_path)
+            while directory not in tracked_directories:
+                tracked_directories.add(directory)
+                if directory == root:
+                    break
+                directory = os.path.dirname(directory)
+        # -- SUBMODULES, SPARSE INDEX: Tracked paths may be directories.
+        tracked_directories.update(tracked_files)
+        return tracked_files, tracked_directories
+
+
+def _git_dir_of(root):
+    git_dir = os.path.join(root, GIT_DIRNAME)
+    if os.path.isfile(git_dir):
+        # -- WORKTREE, SUBMODULE: ".git" file contains "gitdir: <path>".
+        with open(git_dir) as f:
+            text = f.read().strip()
+        if text.startswith("gitdir:"):
+            git_dir = os.path.join(root, text[len("gitdir:"):].strip())
+    return git_dir
+
+
+# -----------------------------------------------------------------------------
+# TREE INDEX: Incremental rescans
+# -----------------------------------------------------------------------------
+ENTRY_IS_DIR = 0x01             # -- Directory (without following symlinks).
+ENTRY_IS_DIR_FOLLOWED = 0x02    # -- Directory or symlink to a directory.
+
+
+class _IndexEntry(object):
+    """Directory entry that is restored from the tree index.
+    Provides the parts of :class:`os.DirEntry` that the tree walker uses.
+    """
+    __slots__ = ("name", "flags")
+
+    def __init__(self, name, flags):
+        self.name = name
+        self.flags = flags
+
+    def is_dir(self, follow_symlinks=True):
+        if follow_symlinks:
+            return bool(self.flags & ENTRY_IS_DIR_FOLLOWED)
+        return bool(self.flags & ENTRY_IS_DIR)
+
+
+def _entry_flags(entry):
+    if entry.is_dir(follow_symlinks=False):
+        return ENTRY_IS_DIR | ENTRY_IS_DIR_FOLLOWED
+    elif entry.is_dir():
+        return ENTRY_IS_DIR_FOLLOWED
+    return 0
+
+
+def write_json_file(filename, data):
+    """Write a JSON file atomically (readers see the old or the new file).
+
+    :param filename:  JSON file to write (as string).
+    :param data:      Data to store (as JSON serializable object).
+    """
+    directory = os.path.dirname(filename)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    temp_filename = "%s.%d.tmp" % (filename, os.getpid())
+    with open(temp_filename, "w") as f:
+        json.dump(data, f, separators=(",", ":"))
+    try:
+        os.replace(temp_filename, filename)
+    except AttributeError:
+        # -- PYTHON < 3.3: os.rename() replaces existing files on POSIX.
+        os.rename(temp_filename, filename)
+
+
+def _stat_mtime_ns(stat_result):
+    mtime_ns = getattr(stat_result, "st_mtime_ns", None)
+    if mtime_ns is None:
+        # -- PYTHON < 3.3: Only float timestamps are available.
+        mtime_ns = int(stat_result.st_mtime * 1000000000)
+    return mtime_ns
+
+
+class TreeIndex(object):
+    """Persistent index of the directories that a walk has visited.
+
+    Stores the mtime, the inode and the relevant entries of each directory
+    (entries that match a pattern or may contain matches). A directory
+    whose mtime and inode are unchanged is not listed again. Its entries
+    are restored from the index (costs one stat() call per directory).
+
+    The index is only valid for the same patterns, excluded directories
+    and top directory. Therefore, each combination has its own index file.
+    Directories that were modified within the last seconds are not stored
+    (a change within the same mtime tick would be missed otherwise).
+
+    :param filename:  Index file (as string).
+    :param key:       Fingerprint of the walk (as string).
+    """
+    VERSION = 1
+    RACY_SECONDS = 2.0
+
+    def __init__(self, filename, key=None):
+        self.filename = filename
+        self.key = key
+        self.directories = {}
+        self.visited_directories = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_index_dir(cls, index_dir, key_data):
+        """Create the tree index for a walk in an index directory.
+
+        :param index_dir:  Index directory, like ".cache/invoke-cleanup".
+        :param key_data:   Description of the walk (as string).
+        :return: Tree index with the loaded data (if any).
+        """
+        key = hashlib.sha1(key_data.encode("utf-8")).hexdigest()
+        filename = os.path.join(str(index_dir), "tree-index.%s.json" % key[:16])
+        index = cls(filename, key)
+        index.load()
+        return index
+
+    def load(self):
+        """Load the index file (an invalid or missing file is ignored)."""
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return
+        elif data.get("key") != self.key:
+            return
+        self.directories = data.get("directories") or {}
+
+    def save(self):
+        """Save the visited directories (atomically replaces the index file)."""
+        write_json_file(self.filename, {
+            "version": self.VERSION,
+            "key": self.key,
+            "directories": self.visited_directories,
+        })
+
+    def list_directory(self, directory, abs_directory):
+        """List a directory or restore its entries if it is unchanged.
+
+        :return: Tuple (entries, dir_stat) or (None, None) if not accessible.
+        """
+        try:
+            dir_stat = os.stat(directory or os.curdir)
+        except OSError:
+            return None, None
+        record = self.directories.get(abs_directory)
+        if (record and record[0] == _stat_mtime_ns(dir_stat) and
+                record[1] == dir_stat.st_ino):
+            self.hits += 1
+            return [_IndexEntry(name, flags) for name, flags in record[2]], dir_stat
+        self.misses += 1
+        return list_directory(directory), dir_stat
+
+    def store(self, abs_directory, dir_stat, entries):
+        """Store the relevant entries of a visited directory."""
+        if time.time() - dir_stat.st_mtime < self.RACY_SECONDS:
+            # -- RACY DIRECTORY: Is listed again in the next walk.
+            return
+        self.visited_directories[abs_directory] = [
+            _stat_mtime_ns(dir_stat), dir_stat.st_ino,
+            [[entry.name, _entry_flags(entry)] for entry in entries]
+        ]
+
+
+# -----------------------------------------------------------------------------
+# WATCH JOURNAL: Paths that the cleanup.watch task has collected
+# -----------------------------------------------------------------------------
+WATCH_JOURNAL_VERSION = 1
+WATCH_HEARTBEAT_SECONDS = 10
+
+
+def make_pattern_groups_key(pattern_groups):
+    """Fingerprint of pattern groups (independent of the pattern order).
+
+    :param pattern_groups:  Patterns per tag (as dict: tag -> list of patterns).
+    :return: Key (as string).
+    """
+    return repr(sorted((str(tag), sorted(str(p) for p in patterns))
+                       for tag, patterns in pattern_groups.items()))
+
+
+def load_watched_paths(watch_file, pattern_groups, workdir="."):
+    """Load the paths that a running ``cleanup.watch`` task has collected
+    for these pattern groups (instead of walking the directory tree).
+
+    The watch journal is only used if its watcher process is still alive
+    (and its heartbeat is recent) and if it tracks the same pattern groups.
+    An incomplete journal (a directory could not be watched) is not used.
+
+    :param watch_file:      Watch journal file (as string).
+    :param pattern_groups:  Patterns per tag (as dict: tag -> list of patterns).
+    :param workdir:         Current work directory (default=".")
+    :return: List of (path, tags) tuples (or None, if the journal is not usable).
+    """
+    try:
+        with open(str(watch_file)) as f:
+            data = json.load(f)
+        heartbeat_age = time.time() - os.stat(str(watch_file)).st_mtime
+    except (IOError, OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("version") != WATCH_JOURNAL_VERSION:
+        return None
+    elif data.get("workdir") != os.path.abspath(str(workdir)):
+        return None
+    elif heartbeat_age > 3 * WATCH_HEARTBEAT_SECONDS:
+        return None
+    elif not is_process_alive(data.get("pid")):
+        return None
+    elif data.get("incomplete"):
+        return None
+
+    tracked_paths = (data.get("groups") or {}).get(make_pattern_groups_key(pattern_groups))
+    if tracked_paths is None:
+        return None
+    # -- SAME PATHS AS THE WALK: Without "./" prefix (in current directory).
+    top = str(workdir)
+    if top == os.curdir:
+        top = ""
+    return [(Path(os.path.join(top, path)), frozenset(tags))
+            for path, tags in tracked_paths]
+
+
+def is_process_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError as e:
+        # -- EPERM: Process exists (but belongs to another user).
+        return e.errno == errno.EPERM
+    return True
 
 
 # -----------------------------------------------------------------------------
@@ -276,19 +3254,21 @@ def clean(ctx, workdir=".", verbose=False):
     """Cleanup temporary dirs/files to regain a clean state."""
     dry_run = ctx.config.run.dry
     config_dir = getattr(ctx.config, "config_dir", workdir)
-    directories = list(ctx.config.cleanup.directories or [])
-    directories.extend(ctx.config.cleanup.extra_directories or [])
-    files = list(ctx.config.cleanup.files or [])
-    files.extend(ctx.config.cleanup.extra_files or [])
+    pattern_groups = make_cleanup_pattern_groups(ctx.config.cleanup)
+    directories = pattern_groups["directory"]
+    files = pattern_groups["file"]
     excluded_directories = list(ctx.config.cleanup.excluded_directories or [])
     excluded_directories = make_excluded(excluded_directories,
                                          config_dir=config_dir, workdir=".")
+    options = make_cleanup_options(ctx.config.cleanup)
 
     # -- PERFORM CLEANUP:
-    execute_cleanup_tasks(ctx, cleanup_tasks)
-    cleanup_dirs(directories, workdir=workdir, excluded=excluded_directories,
-                 dry_run=dry_run, verbose=verbose)
-    cleanup_files(files, workdir=workdir, dry_run=dry_run, verbose=verbose)
+    # HINT: Each path is handled only once (by any cleanup task or pattern).
+    with cleanup_session():
+        execute_cleanup_tasks(ctx, cleanup_tasks)
+        cleanup_dirs_and_files(directories, files, workdir=workdir,
+                               excluded=excluded_directories,
+                               dry_run=dry_run, verbose=verbose, **options)
 
     # -- CONFIGURABLE EXTENSION-POINT:
     # use_cleanup_python = ctx.config.cleanup.use_cleanup_python or False
@@ -307,22 +3287,24 @@ def clean_all(ctx, workdir=".", verbose=False):
     """
     dry_run = ctx.config.run.dry
     config_dir = getattr(ctx.config, "config_dir", workdir)
-    directories = list(ctx.config.cleanup_all.directories or [])
-    directories.extend(ctx.config.cleanup_all.extra_directories or [])
-    files = list(ctx.config.cleanup_all.files or [])
-    files.extend(ctx.config.cleanup_all.extra_files or [])
+    pattern_groups = make_cleanup_pattern_groups(ctx.config.cleanup_all)
+    directories = pattern_groups["directory"]
+    files = pattern_groups["file"]
     excluded_directories = list(ctx.config.cleanup_all.excluded_directories or [])
     excluded_directories.extend(ctx.config.cleanup.excluded_directories or [])
     excluded_directories = make_excluded(excluded_directories,
                                          config_dir=config_dir, workdir=".")
+    options = make_cleanup_options(ctx.config.cleanup)
+    options.update(make_cleanup_options(ctx.config.cleanup_all))
 
     # -- PERFORM CLEANUP:
     # HINT: Remove now directories, files first before cleanup-tasks.
-    cleanup_dirs(directories, workdir=workdir, excluded=excluded_directories,
-                 dry_run=dry_run, verbose=verbose)
-    cleanup_files(files, workdir=workdir, dry_run=dry_run, verbose=verbose)
-    execute_cleanup_tasks(ctx, cleanup_all_tasks)
-    clean(ctx, workdir=workdir, verbose=verbose)
+    with cleanup_session():
+        cleanup_dirs_and_files(directories, files, workdir=workdir,
+                               excluded=excluded_directories,
+                               dry_run=dry_run, verbose=verbose, **options)
+        execute_cleanup_tasks(ctx, cleanup_all_tasks)
+        clean(ctx, workdir=workdir, verbose=verbose)
 
     # -- CONFIGURABLE EXTENSION-POINT:
     # use_cleanup_python1 = ctx.config.cleanup.use_cleanup_python or False
@@ -331,17 +3313,104 @@ def clean_all(ctx, workdir=".", verbose=False):
     #     clean_python(ctx)
 
 
+@task(help={
+    "workdir": "Directory to watch (default: $CWD).",
+    "duration": "Stop watching after N seconds (default: run until CTRL-C).",
+    "verbose": "Enable verbose mode (default: OFF).",
+})
+def watch(ctx, workdir=".", duration=None, verbose=False):
+    """Track cleanup artifacts while they are created (requires: Linux).
+    The clean tasks remove the tracked paths without walking the tree.
+    """
+    # -- DELAYED IMPORT: Watcher is only supported on Linux (inotify).
+    from invoke_cleanup_watch import ArtifactTracker
+    watch_file = ctx.config.cleanup.watch_file
+    if not watch_file:
+        raise Exit("WATCH: cleanup.watch_file is not configured.")
+
+    config_dir = getattr(ctx.config, "config_dir", workdir)
+    pattern_groups_list = [
+        make_cleanup_pattern_groups(ctx.config.cleanup),
+        make_cleanup_pattern_groups(ctx.config.cleanup_all),
+    ]
+    # -- HINT: Only directories that all cleanup tasks exclude are not watched.
+    excluded_directories = list(ctx.config.cleanup.excluded_directories or [])
+    excluded_directories = make_excluded(excluded_directories,
+                                         config_dir=config_dir, workdir=".")
+    try:
+        tracker = ArtifactTracker(pattern_groups_list, workdir=workdir,
+                                  excluded=excluded_directories,
+                                  watch_file=watch_file, verbose=verbose)
+        print("WATCH: %s (stop with CTRL-C)" % tracker.workdir)
+        tracker.run(duration=float(duration) if duration else None)
+    except OSError as e:
+        raise Exit("WATCH-FAILED: %s" % e)
+    except KeyboardInterrupt:
+        pass
+
+
+@task(help={
+    "target": "Free-space target, like: 10GB (free) or 80% (max. disk usage).",
+    "workdir": "Directory to clean(up) (default: $CWD).",
+    "verbose": "Enable verbose mode (default: OFF).",
+})
+def reclaim(ctx, target=None, workdir=".", verbose=False):
+    """Remove cleanup candidates until the free-space target is reached.
+    Removes the candidates of the clean task before those of clean-all.
+    Registered cleanup tasks are not executed.
+    """
+    dry_run = ctx.config.run.dry
+    target = target or ctx.config.cleanup.reclaim_target
+    if not target:
+        raise Exit("RECLAIM: No target (use: --target or cleanup.reclaim_target).")
+    try:
+        disk_target = DiskSpaceTarget.from_string(target, path=workdir)
+    except ValueError as e:
+        raise Exit("RECLAIM: Invalid target (%s)" % e)
+
+    config_dir = getattr(ctx.config, "config_dir", workdir)
+    options = make_cleanup_options(ctx.config.cleanup)
+    excluded_directories = list(ctx.config.cleanup.excluded_directories or [])
+    # -- PRIORITY ORDER: Cheap artifacts (clean) before warm caches (clean-all).
+    steps = [(ctx.config.cleanup, list(excluded_directories), dict(options))]
+    excluded_directories.extend(ctx.config.cleanup_all.excluded_directories or [])
+    options.update(make_cleanup_options(ctx.config.cleanup_all))
+    steps.append((ctx.config.cleanup_all, excluded_directories, options))
+
+    with cleanup_session():
+        for config, excluded_directories, options in steps:
+            if disk_target.is_reached():
+                break
+            # -- FREE SPACE NOW: Trash is removed in the background (later).
+            options.pop("trash_dir", None)
+            pattern_groups = make_cleanup_pattern_groups(config)
+            excluded_directories = make_excluded(excluded_directories,
+                                                 config_dir=config_dir,
+                                                 workdir=".")
+            cleanup_dirs_and_files(pattern_groups["directory"],
+                                   pattern_groups["file"], workdir=workdir,
+                                   excluded=excluded_directories,
+                                   dry_run=dry_run, verbose=verbose,
+                                   until=disk_target, **options)
+
+    free, usage = disk_target.usage()
+    status = disk_target.is_reached() and "REACHED" or "NOT-REACHED"
+    print("RECLAIM: %s (free: %s, usage: %.1f%%, target: %s)" % \
+          (status, format_size(free), usage, disk_target))
+
+
 @task(aliases=["python"])
 def clean_python(ctx, workdir=".", verbose=False):
     """Cleanup python related files/dirs: *.pyc, *.pyo, ..."""
     dry_run = ctx.config.run.dry or False
     # MAYBE NOT: "**/__pycache__"
-    cleanup_dirs(["build", "dist", "*.egg-info", "**/__pycache__"],
-                 workdir=workdir, dry_run=dry_run, verbose=verbose)
-    if not dry_run:
-        ctx.run("py.cleanup")
-    cleanup_files(["**/*.pyc", "**/*.pyo", "**/*$py.class"],
-                  workdir=workdir, dry_run=dry_run, verbose=verbose)
+    with cleanup_session():
+        cleanup_dirs(["build", "dist", "*.egg-info", "**/__pycache__"],
+                     workdir=workdir, dry_run=dry_run, verbose=verbose)
+        if not dry_run:
+            ctx.run("py.cleanup")
+        cleanup_files(["**/*.pyc", "**/*.pyo", "**/*$py.class"],
+                      workdir=workdir, dry_run=dry_run, verbose=verbose)
 
 
 @task(help={
@@ -386,20 +3455,117 @@ CLEANUP_EMPTY_CONFIG = {
     "excluded_directories": [],
     "excluded_files": [],
     "use_cleanup_python": False,
+    # -- OPTIONS: None means "use default" (cleanup_all falls back to cleanup).
+    "scan_jobs": None,
+    "index_dir": None,
+    "watch_file": None,
+    "gitignored": None,
+    "keep_tracked": None,
+    "follow_symlinks": None,
+    "max_depth": None,
+    "one_file_system": None,
+    "jobs": None,
+    "rmtree_jobs": None,
+    "trash_dir": None,
+    "queue_size": None,
+    "unlinks_per_second": None,
+    "scans_per_second": None,
+    "ionice": None,
+    "reclaim_target": None,
 }
+# -- CLEANUP OPTIONS: Defaults of the cleanup functions (and their order).
+CLEANUP_OPTION_DEFAULTS = collections.OrderedDict([
+    ("scan_jobs", 1),
+    ("index_dir", None),
+    ("watch_file", None),
+    ("gitignored", False),
+    ("keep_tracked", False),
+    ("follow_symlinks", False),
+    ("max_depth", None),
+    ("one_file_system", False),
+    ("jobs", 1),
+    ("rmtree_jobs", 1),
+    ("trash_dir", None),
+    ("queue_size", None),
+    ("unlinks_per_second", None),
+    ("scans_per_second", None),
+    ("ionice", False),
+])
+CLEANUP_OPTION_NAMES = tuple(CLEANUP_OPTION_DEFAULTS)
+
 def make_cleanup_config(**kwargs):
     config_data = CLEANUP_EMPTY_CONFIG.copy()
     config_data.update(kwargs)
     return config_data
 
+def make_cleanup_pattern_groups(config):
+    """Collect the directory and file patterns of a cleanup config section.
+
+    :param config:  Config section, like: ctx.config.cleanup (as dict-like).
+    :return: Patterns per tag (as dict: "directory"/"file" -> list of patterns).
+    """
+    directories = list(config.directories or [])
+    directories.extend(config.extra_directories or [])
+    files = list(config.files or [])
+    files.extend(config.extra_files or [])
+    return {"directory": directories, "file": files}
+
+def make_cleanup_options(config):
+    """Collect the options of a cleanup config section that are set.
+    The cleanup functions (:func:`cleanup_dirs()`, :func:`cleanup_files()`,
+    :func:`cleanup_dirs_and_files()`) accept them as keyword arguments.
+
+    :param config:  Config section, like: ctx.config.cleanup (as dict-like).
+    :return: Keyword arguments for the cleanup functions (as dict).
+
+    CLEANUP OPTIONS (see: :data:`CLEANUP_OPTION_DEFAULTS`):
+
+    * scan_jobs:    Number of threads that scan directories (as int).
+    * index_dir:    Directory of the tree index for incremental rescans.
+    * watch_file:   Journal of the ``cleanup.watch`` task (if it runs).
+      Its tracked paths are used instead of walking the directory tree.
+    * gitignored:   Remove the paths that git ignores, too (as bool).
+      Selects like ``git clean -X -d`` (but in-process and with exclusions).
+      Tracked files are always kept then (implies: keep_tracked).
+    * keep_tracked: Keep files that git tracks (reads: .git/index).
+    * follow_symlinks: Enter symlinked directories (as bool).
+    * max_depth:    Selects paths up to this depth (as int, 1: in workdir).
+    * one_file_system: Never cross into other filesystems (as bool).
+    * jobs:         Number of directories (or file batches) that are
+      removed concurrently.
+    * rmtree_jobs:  Number of threads that remove one directory tree.
+    * trash_dir:    Fast removal mode: Move directories into this
+      directory and remove it in the background.
+    * queue_size:   Maximum number of pending removals (as int).
+      If reached, the walk waits until a removal is done.
+    * unlinks_per_second: Maximum number of removed files (and directories)
+      per second (as number, default: unlimited).
+    * scans_per_second: Maximum number of listed directories per second
+      (as number, default: unlimited).
+    * ionice:       Lower the I/O priority of this process (as bool).
+      Stays lowered after the cleanup (see: :func:`lower_io_priority()`).
+
+    Paths (index_dir, watch_file, trash_dir) are relative to the workdir.
+    Only :func:`cleanup_dirs_and_files()` uses watch_file and gitignored.
+    """
+    options = {}
+    for name in CLEANUP_OPTION_NAMES:
+        value = config.get(name)
+        if value is not None:
+            options[name] = value
+    return options
+
 
 namespace = Collection(clean_all, clean_python)
 namespace.add_task(clean, default=True)
 namespace.add_task(git_clean)
+namespace.add_task(watch)
+namespace.add_task(reclaim)
 namespace.configure({
     "cleanup": make_cleanup_config(
         files=["**/*.bak", "**/*.log", "**/*.tmp", "**/.DS_Store"],
         excluded_directories=[".git", ".hg", ".bzr", ".svn"],
+        watch_file=".cache/invoke-cleanup/watch.json",
     ),
     "cleanup_all": make_cleanup_config(
         directories=[".venv*", ".tox", "downloads", "tmp"],
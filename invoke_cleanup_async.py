@@ -0,0 +1,143 @@
+# -*- coding: UTF-8 -*-
+"""
+Asyncio support for :mod:`invoke_cleanup` (requires: python >= 3.7).
+
+The tree walk and the removals are performed in the thread pool of the
+event loop. Therefore, a cleanup does not block the event loop and can
+overlap with other coroutines (uploads, ...).
+
+.. code-block:: python
+
+    from invoke_cleanup_async import path_glob_async, cleanup_dirs_async
+
+    async def cleanup_workspace():
+        async for path in path_glob_async("**/*.log"):
+            print("FOUND: %s" % path)
+        await cleanup_dirs_async(["build", "**/__pycache__"], jobs=4)
+"""
+
+import asyncio
+import itertools
+from invoke_cleanup import path_select, _resolve_cleanup_options, \
+    _make_path_cleaner, _make_walk_options
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS:
+# -----------------------------------------------------------------------------
+# -- jobs: Number of concurrent removals.
+# -- batch_size: Number of matches that are selected per thread-pool call.
+DEFAULT_JOBS = 4
+DEFAULT_BATCH_SIZE = 64
+
+
+# -----------------------------------------------------------------------------
+# ASYNC CLEANUP UTILITIES:
+# -----------------------------------------------------------------------------
+async def path_select_async(pattern_groups, current_dir=None,
+                            batch_size=DEFAULT_BATCH_SIZE, **kwargs):
+    """Async iterator counterpart of :func:`invoke_cleanup.path_select()`.
+
+    :param pattern_groups:  Patterns per tag (as dict: tag -> list of patterns).
+    :param current_dir:  Current working directory (as Path, pathlib.Path, str)
+    :param batch_size:   Number of matches that are selected per thread-pool call.
+    :return: Async iterator of (path, tags) tuples (as path.Path, set of tags).
+    """
+    loop = asyncio.get_running_loop()
+    matches = path_select(pattern_groups, current_dir, **kwargs)
+    def select_next_batch():
+        return list(itertools.islice(matches, batch_size))
+
+    try:
+        while True:
+            batch = await loop.run_in_executor(None, select_next_batch)
+            if not batch:
+                break
+            for match in batch:
+                yield match
+    finally:
+        await loop.run_in_executor(None, matches.close)
+
+
+async def path_glob_async(pattern, current_dir=None):
+    """Async iterator counterpart of :func:`invoke_cleanup.path_glob()`.
+
+    :param pattern:      File/directory pattern to use (as string).
+    :param current_dir:  Current working directory (as Path, pathlib.Path, str)
+    :return: Async iterator of resolved paths (as path.Path).
+    """
+    async for path, _ in path_select_async({None: [pattern]}, current_dir):
+        yield path
+
+
+async def cleanup_dirs_async(patterns, workdir=".", excluded=None,
+                             dry_run=False, verbose=False, show_skipped=False,
+                             jobs=DEFAULT_JOBS, **options):
+    """Remove directories (and their contents) recursively.
+    Async counterpart of :func:`invoke_cleanup.cleanup_dirs()`.
+
+    :param patterns:    Directory name patterns, like "**/tmp*" (as list).
+    :param workdir:     Current work directory (default=".")
+    :param dry_run:     Dry-run mode indicator (as bool).
+    :param jobs:        Number of concurrent removals (as int).
+    :param options:     Cleanup options, like: keep_tracked=True
+        (see: :func:`invoke_cleanup.make_cleanup_options()`).
+    """
+    options = _resolve_cleanup_options(options, workdir)
+    cleaner = _make_path_cleaner(options, excluded, dry_run=dry_run,
+                                 verbose=verbose, show_skipped=show_skipped)
+    def prune_selected(directory, tags):
+        # -- DIRECTORY IS REMOVED: Needs not be entered.
+        return cleaner.selects_directory(directory)
+
+    matches = path_select_async({"directory": patterns}, workdir,
+                                prune_match=prune_selected,
+                                **_make_walk_options(options, cleaner))
+    await _remove_concurrently(matches, cleaner.remove_directory, jobs)
+    cleaner.start_trash_removal()
+
+
+async def cleanup_files_async(patterns, workdir=".", dry_run=False,
+                              verbose=False, show_skipped=False,
+                              excluded=None, jobs=DEFAULT_JOBS, **options):
+    """Remove files or files selected by file patterns.
+    Async counterpart of :func:`invoke_cleanup.cleanup_files()`.
+
+    :param patterns:    File patterns, like "**/*.pyc" (as list).
+    :param workdir:     Current work directory (default=".")
+    :param dry_run:     Dry-run mode indicator (as bool).
+    :param excluded:    Excluded directories (as set of Path).
+    :param jobs:        Number of concurrent removals (as int).
+    :param options:     Cleanup options, like: keep_tracked=True
+        (see: :func:`invoke_cleanup.make_cleanup_options()`).
+    """
+    options = _resolve_cleanup_options(options, workdir)
+    cleaner = _make_path_cleaner(options, excluded, dry_run=dry_run,
+                                 verbose=verbose, show_skipped=show_skipped)
+    matches = path_select_async({"file": patterns}, workdir,
+                                **_make_walk_options(options, cleaner))
+    await _remove_concurrently(matches, cleaner.remove_file, jobs)
+
+
+# -----------------------------------------------------------------------------
+# IMPLEMENTATION DETAILS:
+# -----------------------------------------------------------------------------
+async def _remove_concurrently(matches, remove_func, jobs):
+    """Run the removals in the thread pool (while the walk continues).
+    The semaphore bounds the number of removals in flight.
+    HINT: The path cleaner guards its state with a lock (thread-safe).
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, int(jobs or 1)))
+    async def remove(path):
+        try:
+            await loop.run_in_executor(None, remove_func, path)
+        finally:
+            semaphore.release()
+
+    removals = []
+    async for path, _ in matches:
+        await semaphore.acquire()
+        removals.append(asyncio.ensure_future(remove(path)))
+    if removals:
+        await asyncio.gather(*removals)
@@ -0,0 +1,384 @@
+# -*- coding: UTF-8 -*-
+"""
+Artifact tracker for :mod:`invoke_cleanup` (requires: Linux inotify).
+
+The tracker walks the workdir once and watches each directory where a
+cleanup pattern may match. Afterwards, it follows the creation and removal
+of directory entries and keeps the set of matching paths up-to-date.
+The tracked paths are stored in a watch journal. The cleanup tasks use
+this journal instead of walking the directory tree (while the tracker runs).
+
+.. code-block:: sh
+
+    # -- TERMINAL 1: Track cleanup artifacts (until CTRL-C).
+    invoke cleanup.watch
+
+    # -- TERMINAL 2: Removes the tracked artifacts (without a tree walk).
+    invoke cleanup
+
+NOTES:
+
+* Directories that the first pattern group removes are not watched.
+  The clean task removes them (and the clean_all task runs clean, too).
+* If the kernel event queue overflows, the workdir is scanned again.
+* If a directory cannot be watched (like: inotify watch limit reached),
+  the journal is marked as incomplete. Then, the cleanup tasks walk the tree.
+* Patterns with absolute paths are not tracked (cleanup walks for them).
+"""
+
+from __future__ import absolute_import, print_function
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import time
+from path import Path
+from invoke_cleanup import (
+    PathCleaner, PathMatcher, _TreeWalk, list_directory,
+    make_pattern_groups_key, write_json_file, is_path_below, _normcase_path,
+    parse_pattern_spec, WATCH_JOURNAL_VERSION, WATCH_HEARTBEAT_SECONDS,
+)
+
+
+# -----------------------------------------------------------------------------
+# CONSTANTS: See "man 7 inotify"
+# -----------------------------------------------------------------------------
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO |
+              IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW)
+EVENT_HEADER = struct.Struct("iIII")
+EVENT_BUFFER_SIZE = 64 * 1024
+
+
+# -----------------------------------------------------------------------------
+# INOTIFY:
+# -----------------------------------------------------------------------------
+class Inotify(object):
+    """Minimal inotify wrapper (with ctypes, needs no extra package)."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6",
+                           use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not supported (Linux only)")
+        self._libc = libc
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise _make_os_error()
+
+    def add_watch(self, directory, mask=WATCH_MASK):
+        """Watch a directory.
+
+        :return: Watch descriptor (as int).
+        """
+        wd = self._libc.inotify_add_watch(self.fd, _fsencode(directory), mask)
+        if wd < 0:
+            raise _make_os_error(directory)
+        return wd
+
+    def remove_watch(self, wd):
+        # -- HINT: Watch may already be removed by the kernel (IN_IGNORED).
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read_events(self, timeout=None):
+        """Read the pending events (waits up to timeout seconds).
+
+        :return: List of (wd, mask, cookie, name) tuples.
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            data = os.read(self.fd, EVENT_BUFFER_SIZE)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return []
+            raise
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, size = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset+size].rstrip(b"\0")
+            offset += size
+            events.append((wd, mask, cookie, _fsdecode(name)))
+        return events
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+# -----------------------------------------------------------------------------
+# ARTIFACT TRACKER:
+# -----------------------------------------------------------------------------
+class ArtifactTracker(object):
+    """Tracks the paths that cleanup patterns select while they are created.
+
+    :param pattern_groups_list:  Pattern groups of each cleanup task, like
+        [clean, clean_all] (as list of dict: "directory"/"file" -> patterns).
+    :param workdir:     Directory to watch (default=".").
+    :param excluded:    Excluded directories (as set of Path).
+    :param watch_file:  Watch journal (relative to workdir, as string).
+    """
+    SAVE_DELAY_SECONDS = 0.2
+
+    def __init__(self, pattern_groups_list, workdir=".", excluded=None,
+                 watch_file=None, verbose=False):
+        self.workdir = os.path.abspath(str(workdir))
+        self.watch_file = None
+        if watch_file:
+            self.watch_file = os.path.join(self.workdir, str(watch_file))
+        self.verbose = verbose
+        self.matcher = PathMatcher()
+        self.group_keys = {}
+        for group_index, pattern_groups in enumerate(pattern_groups_list):
+            patterns = [parse_pattern_spec(p)[0]
+                        for group in pattern_groups.values() for p in group]
+            if any(Path(p).isabs() for p in patterns):
+                # -- NOT TRACKED: The cleanup task walks for these patterns.
+                print("WATCH: Skip patterns with absolute paths: %s" %
+                      ", ".join(str(p) for p in patterns if Path(p).isabs()))
+                continue
+            self.group_keys[group_index] = make_pattern_groups_key(pattern_groups)
+            for tag, patterns in pattern_groups.items():
+                for pattern in patterns:
+                    self.matcher.add_pattern(pattern, (group_index, tag))
+
+        self.cleaner = PathCleaner(excluded)
+        self.pruned = set(_normcase_path(os.path.abspath(str(directory)))
+                          for directory in self.cleaner.pruned_directories)
+        self.artifacts = {}
+        self.watches = {}
+        self.inotify = None
+        self.changed = False
+        self.incomplete = False
+        self._tree_walk = _TreeWalk(self.matcher, self.workdir,
+                                    pruned=self.pruned,
+                                    prune_match=self._prune_match,
+                                    anchored=False)
+
+    def scan(self):
+        """Scan the workdir and watch each directory where patterns may match."""
+        self.close()
+        self.inotify = Inotify()
+        self.watches = {}
+        self.artifacts = {}
+        self.changed = True
+        self.incomplete = False
+        matches = []
+        subdirs = self._tree_walk.select_roots(matches)
+        self._add_matches(matches)
+        self._watch_directories(subdirs)
+
+    def process_events(self, timeout=None):
+        """Process the inotify events (waits up to timeout seconds).
+
+        :return: Number of processed events (as int).
+        """
+        events = self.inotify.read_events(timeout)
+        for wd, mask, _, name in events:
+            if mask & IN_Q_OVERFLOW:
+                # -- EVENTS ARE LOST: Start again.
+                print("WATCH: Event queue overflow (scan again).")
+                self.scan()
+                break
+            watch = self.watches.get(wd)
+            if watch is None:
+                continue
+            elif mask & IN_IGNORED:
+                # -- WATCH IS REMOVED: Directory was deleted (or unmounted).
+                del self.watches[wd]
+                continue
+            elif not name:
+                continue
+
+            directory, abs_directory, node = watch
+            path = os.path.join(directory, name)
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._forget(path, is_dir=bool(mask & IN_ISDIR))
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                entry = _EventEntry(path, name, is_dir=bool(mask & IN_ISDIR))
+                matches = []
+                subdirs = []
+                self._tree_walk.select_entries(directory, abs_directory, node,
+                                               [entry], None, matches, subdirs)
+                self._add_matches(matches)
+                self._watch_directories(subdirs)
+        return len(events)
+
+    def run(self, duration=None):
+        """Track the artifacts (until the duration has passed, if any).
+        The watch journal is removed when the tracker stops.
+
+        :param duration:  Duration in seconds (as float, None: forever).
+        """
+        deadline = None
+        if duration is not None:
+            deadline = time.time() + duration
+        self.scan()
+        last_saved = 0
+        try:
+            while True:
+                now = time.time()
+                if self.changed and now - last_saved >= self.SAVE_DELAY_SECONDS:
+                    self.save()
+                    last_saved = now
+                elif (self.watch_file and
+                      now - last_saved >= WATCH_HEARTBEAT_SECONDS):
+                    # -- HEARTBEAT: Tells readers that the tracker is alive.
+                    os.utime(self.watch_file, None)
+                    last_saved = now
+
+                timeout = WATCH_HEARTBEAT_SECONDS
+                if self.changed:
+                    timeout = self.SAVE_DELAY_SECONDS
+                if deadline is not None:
+                    if now >= deadline:
+                        break
+                    timeout = min(timeout, deadline - now)
+                self.process_events(timeout)
+        finally:
+            self.close()
+            if self.watch_file and os.path.exists(self.watch_file):
+                os.remove(self.watch_file)
+
+    def save(self):
+        """Store the tracked paths in the watch journal."""
+        groups = dict((key, []) for key in self.group_keys.values())
+        for path, tags in sorted(self.artifacts.items()):
+            relpath = os.path.relpath(path, self.workdir)
+            tags_by_group = {}
+            for group_index, tag in tags:
+                tags_by_group.setdefault(group_index, []).append(tag)
+            for group_index, group_tags in tags_by_group.items():
+                groups[self.group_keys[group_index]].append([relpath, sorted(group_tags)])
+        if self.watch_file:
+            write_json_file(self.watch_file, {
+                "version": WATCH_JOURNAL_VERSION,
+                "pid": os.getpid(),
+                "workdir": self.workdir,
+                "groups": groups,
+                "incomplete": self.incomplete,
+            })
+        self.changed = False
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
+
+    # -- IMPLEMENTATION DETAILS:
+    def _prune_match(self, directory, tags):
+        # -- DIRECTORY IS REMOVED BY FIRST CLEANUP TASK: Needs not be watched.
+        # HINT: clean_all runs clean, too (that removes the directory anyway).
+        return ((0, "directory") in tags and
+                self.cleaner.selects_directory(directory))
+
+    def _watch_directories(self, subdirs):
+        stack = list(subdirs)
+        while stack:
+            directory, abs_directory, node = stack.pop()
+            try:
+                # -- WATCH FIRST: Entries that are created while the directory
+                #    is listed are reported as events (or by the listing).
+                wd = self.inotify.add_watch(directory)
+            except OSError as e:
+                if e.errno in (errno.ENOENT, errno.ENOTDIR):
+                    # -- RACE-CONDITION: Directory is already removed.
+                    continue
+                # -- ENOSPC (watch limit), EACCES, ...: Changes would be missed.
+                if not self.incomplete:
+                    print("WATCH: Cannot watch %s (%s): Journal is incomplete "
+                          "(cleanup walks the tree)." % (directory, e.strerror))
+                    self.incomplete = True
+                    self.changed = True
+                continue
+            self.watches[wd] = (directory, abs_directory, node)
+            entries = list_directory(directory)
+            if entries is None:
+                continue
+            matches = []
+            more_subdirs = []
+            self._tree_walk.select_entries(directory, abs_directory, node,
+                                           entries, None, matches, more_subdirs)
+            self._add_matches(matches)
+            stack.extend(more_subdirs)
+
+    def _add_matches(self, matches):
+        for path, tags in matches:
+            if self.verbose and path not in self.artifacts:
+                print("WATCH-FOUND: %s" % os.path.relpath(path, self.workdir))
+            self.artifacts.setdefault(path, set()).update(tags)
+            self.changed = True
+
+    def _forget(self, path, is_dir=False):
+        if self.artifacts.pop(path, None) is not None:
+            self.changed = True
+        if not is_dir:
+            return
+
+        # -- DIRECTORY IS GONE: Forget its contents and watches, too.
+        below = set([_normcase_path(path)])
+        for other_path in list(self.artifacts):
+            if is_path_below(other_path, below):
+                del self.artifacts[other_path]
+                self.changed = True
+        for wd, watch in list(self.watches.items()):
+            directory = watch[0]
+            if directory == path or is_path_below(directory, below):
+                del self.watches[wd]
+                self.inotify.remove_watch(wd)
+
+
+class _EventEntry(object):
+    """Directory entry of an inotify event (like :class:`os.DirEntry`)."""
+    __slots__ = ("path", "name", "_is_dir")
+
+    def __init__(self, path, name, is_dir):
+        self.path = path
+        self.name = name
+        self._is_dir = is_dir
+
+    def is_dir(self, follow_symlinks=True):
+        if self._is_dir or not follow_symlinks:
+            return self._is_dir
+        return os.path.isdir(self.path)
+
+
+# -----------------------------------------------------------------------------
+# UTILITIES:
+# -----------------------------------------------------------------------------
+def _make_os_error(filename=None):
+    error_number = ctypes.get_errno()
+    return OSError(error_number, os.strerror(error_number), filename)
+
+
+def _fsencode(path):
+    if isinstance(path, bytes):
+        return path
+    return path.encode("utf-8", "surrogateescape")
+
+
+def _fsdecode(name):
+    try:
+        return name.decode("utf-8", "surrogateescape")
+    except LookupError:
+        # -- PYTHON 2.7: Keep the byte string.
+        return name
@@ -57,7 +57,7 @@ setup(
     url="http://github.com/jenisys/invoke-cleanup",
     provides = ["invoke_cleanup"],
     # packages = find_packages_by_root_package("invoke_cleanup"),
-    py_modules = ["invoke_cleanup"],  # DISABLED: "invoke_dry_run"
+    py_modules = ["invoke_cleanup", "invoke_cleanup_async", "invoke_cleanup_watch"],  # DISABLED: "invoke_dry_run"
     # -- REQUIREMENTS:
     # SUPPORT: python2.7, python3.3 (or higher)
     python_requires=">=2.7, !=3.0.*, !=3.1.*, !=3.2.*",
@@ -69,6 +69,8 @@ setup(
         "path.py >= 11.5.0; python_version <  '3.5'",
         "path >= 13.1.0;    python_version >= '3.5'",
         "pathlib2; python_version < '3.4'",
+        "scandir; python_version < '3.5'",
+        "futures; python_version < '3.2'",
     ],
     tests_require=[
         "pytest <  5.0; python_version < '3.0'",
@@ -0,0 +1,40 @@
+# -*- coding: UTF-8 -*-
+"""
+Pytest configuration for the tests of invoke-cleanup.
+"""
+
+import subprocess
+import sys
+import invoke_cleanup
+import pytest
+
+# -- ASYNCIO SUPPORT: Requires python >= 3.7 (async syntax).
+collect_ignore = []
+if sys.version_info < (3, 7):
+    collect_ignore.append("unit/test_cleanup_async.py")
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+def has_git():
+    try:
+        subprocess.check_output(["git", "--version"])
+    except (OSError, subprocess.CalledProcessError):
+        return False
+    return True
+
+
+requires_git = pytest.mark.skipif(not has_git(), reason="REQUIRES: git")
+
+
+@pytest.fixture
+def scanned_dirs(monkeypatch):
+    """Directories that the tree walker lists (in order)."""
+    scanned = []
+    real_scandir = invoke_cleanup.scandir
+    def counting_scandir(directory):
+        scanned.append(directory)
+        return real_scandir(directory)
+    monkeypatch.setattr("invoke_cleanup.scandir", counting_scandir)
+    return scanned
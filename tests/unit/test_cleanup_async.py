@@ -0,0 +1,94 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`invoke_cleanup_async` (requires: python >= 3.7).
+"""
+
+import asyncio
+import os
+from invoke_cleanup_async import \
+    path_glob_async, cleanup_dirs_async, cleanup_files_async
+from invoke_cleanup import cleanup_session
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+from tests.workdir_util import setup_workdir
+
+
+async def collect(async_iterator):
+    return [item async for item in async_iterator]
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestPathGlobAsync(object):
+
+    def test_selects_same_paths_as_path_glob(self, tmp_path):
+        setup_workdir(tmp_path, [
+            "one.log",
+            "more/two.log",
+            "more/three.txt",
+        ])
+        selected = asyncio.run(collect(path_glob_async("**/*.log", tmp_path)))
+        selected = sorted(os.path.relpath(str(p), str(tmp_path)) for p in selected)
+        assert selected == [os.path.join("more", "two.log"), "one.log"]
+
+
+class TestCleanupAsync(object):
+
+    def test_cleanup_dirs_async(self, tmp_path):
+        setup_workdir(tmp_path, [
+            "one.xxx/.ignored",
+            "more/two.xxx/.ignored",
+            "more/other/.ignored",
+        ])
+        asyncio.run(cleanup_dirs_async(["**/*.xxx"], tmp_path, jobs=2))
+        assert not (tmp_path/"one.xxx").exists()
+        assert not (tmp_path/"more/two.xxx").exists()
+        assert (tmp_path/"more/other").exists()
+
+    def test_cleanup_files_async(self, tmp_path):
+        setup_workdir(tmp_path, ["file_%d.log" % i for i in range(20)] + [
+            "more/keep.txt",
+        ])
+        asyncio.run(cleanup_files_async(["**/*.log"], tmp_path, jobs=3))
+        assert list(tmp_path.glob("**/*.log")) == []
+        assert (tmp_path/"more/keep.txt").exists()
+
+    def test_cleanup_does_not_block_event_loop(self, tmp_path):
+        setup_workdir(tmp_path, ["file_%d.log" % i for i in range(50)])
+        ticks = []
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0)
+
+        async def main():
+            ticker_task = asyncio.ensure_future(ticker())
+            await cleanup_files_async(["**/*.log"], tmp_path, dry_run=True)
+            ticker_task.cancel()
+
+        asyncio.run(main())
+        assert len(ticks) > 1
+
+    def test_cleanup_files_async_with_options(self, tmp_path, capsys):
+        setup_workdir(tmp_path, ["one.log", "more/two.log"])
+        asyncio.run(cleanup_files_async(["**/*.log"], tmp_path, max_depth=1))
+        assert not (tmp_path/"one.log").exists()
+        assert (tmp_path/"more/two.log").exists()
+
+    def test_concurrent_removals_handle_each_path_once(self, tmp_path, capsys):
+        setup_workdir(tmp_path, ["file_%d.log" % i for i in range(100)])
+        async def main():
+            await asyncio.gather(
+                cleanup_files_async(["**/*.log"], tmp_path, dry_run=True, jobs=8),
+                cleanup_files_async(["*.log"], tmp_path, dry_run=True, jobs=8))
+
+        with cleanup_session():
+            asyncio.run(main())
+
+        captured = capsys.readouterr()
+        assert captured.out.count("REMOVE: ") == 100
@@ -4,7 +4,11 @@ Unit tests for :func:`invoke_cleanup.exexecute_cleanup_tasks()`.
 """
 
 from __future__ import absolute_import, print_function
-from invoke_cleanup import cleanup_dirs
+import os
+import time
+from invoke_cleanup import cleanup_dirs, make_excluded, is_directory_excluded, \
+    rmtree_parallel, supports_rmtree_parallel, start_background_removal
+import invoke_cleanup
 from invoke.util import cd
 from tests.fspath import fspath_normalize, fspath_normalize_output
 import pytest
@@ -45,23 +49,232 @@ class TestCleanupDirs(object):
         assert expected2 in captured_output
 
     def test_skips_rmtree_below_sys_executable_basedir(self, tmp_path, monkeypatch, capsys):
-        """SKIP-SUICIDE in context of cleanup_dirs in virtual environment."""
+        """SKIP-SUICIDE in context of cleanup_dirs in virtual environment.
+        The virtual environment is not entered by the tree walker.
+        """
         setup_workdir(tmp_path, [
             "opt/python_x.y/bin/python",
-            "opt/python_x.y/lib/foo/one.xxx/.dir"
+            "opt/python_x.y/lib/foo/one.xxx/.dir",
+            "opt/two.xxx/.dir",
         ])
         python_basedir = tmp_path/"opt/python_x.y"
         mock_sys_executable = python_basedir/"bin/python"
         mock_sys_executable = str(mock_sys_executable.absolute())
         problematic_dir = python_basedir/"lib/foo/one.xxx"
-        problematic_dir = problematic_dir.relative_to(tmp_path)
 
         with cd(str(tmp_path)):
             monkeypatch.setattr("sys.executable", mock_sys_executable)
-            cleanup_dirs(["**/*.xxx"], dry_run=True)
+            cleanup_dirs(["**/*.xxx"])
+
+            captured = capsys.readouterr()
+            print(captured.out)
+            captured_output = fspath_normalize_output(captured.out)
+            assert "opt/python_x.y/lib/foo/one.xxx" not in captured_output
+            assert "RMTREE: opt/two.xxx" in captured_output
+            assert problematic_dir.exists()
+            assert not (tmp_path/"opt/two.xxx").exists()
+
+    def test_skips_rmtree_of_sys_executable_basedir(self, tmp_path, monkeypatch, capsys):
+        """SKIP-SUICIDE in context of cleanup_dirs in virtual environment."""
+        setup_workdir(tmp_path, [
+            "opt/python_x.y/bin/python",
+        ])
+        python_basedir = tmp_path/"opt/python_x.y"
+        mock_sys_executable = python_basedir/"bin/python"
+        mock_sys_executable = str(mock_sys_executable.absolute())
+
+        with cd(str(tmp_path)):
+            monkeypatch.setattr("sys.executable", mock_sys_executable)
+            cleanup_dirs(["**/python_x.y"])
 
             captured = capsys.readouterr()
             print(captured.out)
-            expected = "SKIP-SUICIDE: 'opt/python_x.y/lib/foo/one.xxx'"
+            expected = "SKIP-SUICIDE: 'opt/python_x.y' contains current python executable"
             captured_output = fspath_normalize_output(captured.out)
             assert expected in captured_output
+            assert python_basedir.exists()
+
+
+class TestCleanupDirsWithExcluded(object):
+    def test_excluded_subtree_is_not_entered(self, tmp_path, scanned_dirs, capsys):
+        setup_workdir(tmp_path, [
+            ".git/objects/one.xxx/.dir",
+            ".git/foo.xxx/.dir",
+            "more/two.xxx/.dir",
+        ])
+        with cd(str(tmp_path)):
+            excluded = make_excluded([".git"])
+            cleanup_dirs(["**/*.xxx"], excluded=excluded)
+
+        assert (tmp_path/".git/objects/one.xxx").exists()
+        assert (tmp_path/".git/foo.xxx").exists()
+        assert not (tmp_path/"more/two.xxx").exists()
+        assert not any(d.startswith(".git") for d in scanned_dirs)
+
+    def test_directory_below_excluded_directory_is_excluded(self, tmp_path):
+        with cd(str(tmp_path)):
+            excluded = make_excluded([".git"])
+            assert is_directory_excluded(".git", excluded)
+            assert is_directory_excluded(".git/foo", excluded)
+            assert is_directory_excluded(str(tmp_path/".git/foo/bar"), excluded)
+            assert not is_directory_excluded(".gitignore.d", excluded)
+            assert not is_directory_excluded("more/.git", excluded)
+
+
+class TestCleanupDirsWithJobs(object):
+
+    @pytest.mark.parametrize("jobs", [1, 4])
+    def test_removes_directories_concurrently(self, jobs, tmp_path, capsys):
+        setup_workdir(tmp_path, [
+            "one.xxx/a/b/c.txt",
+            "two.xxx/d.txt",
+            "more/three.xxx/e.txt",
+            "more/other.txt",
+        ])
+        with cd(str(tmp_path)):
+            cleanup_dirs(["**/*.xxx"], jobs=jobs)
+
+        captured = capsys.readouterr()
+        captured_output = fspath_normalize_output(captured.out)
+        assert not (tmp_path/"one.xxx").exists()
+        assert not (tmp_path/"two.xxx").exists()
+        assert not (tmp_path/"more/three.xxx").exists()
+        assert (tmp_path/"more/other.txt").exists()
+        for directory in ["one.xxx", "two.xxx", "more/three.xxx"]:
+            assert captured_output.count("RMTREE: %s\n" % directory) == 1
+
+    def test_reports_failed_removals(self, tmp_path, monkeypatch, capsys):
+        setup_workdir(tmp_path, ["one.xxx/a.txt", "two.xxx/b.txt"])
+        def failing_rmtree_p(self):
+            if self.endswith("one.xxx"):
+                raise OSError("Permission denied")
+        monkeypatch.setattr("path.Path.rmtree_p", failing_rmtree_p)
+        with cd(str(tmp_path)):
+            cleanup_dirs(["*.xxx"], jobs=2)
+
+        captured = capsys.readouterr()
+        assert "RMTREE-FAILED: Permission denied (for: one.xxx)" in captured.out
+        assert "for: two.xxx" not in captured.out
+
+
+needs_rmtree_parallel = pytest.mark.skipif(not supports_rmtree_parallel(),
+                                           reason="Needs directory file descriptors")
+
+@needs_rmtree_parallel
+class TestRmtreeParallel(object):
+
+    def test_removes_directory_tree(self, tmp_path):
+        setup_workdir(tmp_path, ["tree/a%d/b%d/c%d.txt" % (i, j, k)
+                                 for i in range(4) for j in range(5) for k in range(3)])
+        rmtree_parallel(tmp_path/"tree", jobs=4)
+        assert not (tmp_path/"tree").exists()
+
+    def test_does_not_follow_symlinks(self, tmp_path):
+        setup_workdir(tmp_path, ["tree/a/b.txt", "other/keep.txt"])
+        os.symlink(str(tmp_path/"other"), str(tmp_path/"tree/a/link"))
+        rmtree_parallel(tmp_path/"tree", jobs=4)
+        assert not (tmp_path/"tree").exists()
+        assert (tmp_path/"other/keep.txt").exists()
+
+    def test_ignores_missing_directory(self, tmp_path):
+        rmtree_parallel(tmp_path/"MISSING", jobs=4)
+
+    def test_raises_first_error_after_removing_the_rest(self, tmp_path, monkeypatch):
+        setup_workdir(tmp_path, ["tree/a/locked.txt", "tree/b/c.txt", "tree/d.txt"])
+        real_unlink = os.unlink
+        def failing_unlink(name, *args, **kwargs):
+            if name == "locked.txt":
+                raise OSError(13, "Permission denied", name)
+            return real_unlink(name, *args, **kwargs)
+        monkeypatch.setattr("os.unlink", failing_unlink)
+
+        with pytest.raises(OSError):
+            rmtree_parallel(tmp_path/"tree", jobs=4)
+        assert (tmp_path/"tree/a/locked.txt").exists()
+        assert not (tmp_path/"tree/b").exists()
+        assert not (tmp_path/"tree/d.txt").exists()
+
+    def test_cleanup_dirs_uses_rmtree_jobs(self, tmp_path, capsys):
+        setup_workdir(tmp_path, ["one.xxx/a/b.txt", "more/two.xxx/c.txt"])
+        with cd(str(tmp_path)):
+            cleanup_dirs(["**/*.xxx"], jobs=2, rmtree_jobs=4)
+
+        captured = capsys.readouterr()
+        assert not (tmp_path/"one.xxx").exists()
+        assert not (tmp_path/"more/two.xxx").exists()
+        assert "RMTREE-FAILED" not in captured.out
+
+
+class TestCleanupDirsWithTrashDir(object):
+
+    def test_moves_directories_into_trash_dir(self, tmp_path, monkeypatch, capsys):
+        setup_workdir(tmp_path, ["one.xxx/a/b.txt", "more/two.xxx/c.txt", "more/keep.txt"])
+        started = []
+        monkeypatch.setattr("invoke_cleanup.start_background_removal",
+                            lambda trash_dir: started.append(trash_dir) or 42)
+        with cd(str(tmp_path)):
+            cleanup_dirs(["**/*.xxx"], trash_dir=".cleanup-trash")
+
+        captured = capsys.readouterr()
+        trash_dir = tmp_path/".cleanup-trash"
+        assert not (tmp_path/"one.xxx").exists()
+        assert not (tmp_path/"more/two.xxx").exists()
+        assert (tmp_path/"more/keep.txt").exists()
+        assert sorted(name.split(".")[0] for name in os.listdir(str(trash_dir))) == ["one", "two"]
+        assert started == [os.path.abspath(str(trash_dir))]
+        assert "RMTREE-BACKGROUND: %s (process: 42)" % trash_dir in captured.out
+
+    def test_trash_dir_is_never_selected(self, tmp_path, monkeypatch, capsys):
+        setup_workdir(tmp_path, [".cleanup-trash/old.xxx/a.txt", "one.xxx/b.txt"])
+        monkeypatch.setattr("invoke_cleanup.start_background_removal",
+                            lambda trash_dir: 42)
+        with cd(str(tmp_path)):
+            cleanup_dirs(["**/*.xxx"], trash_dir=".cleanup-trash")
+
+        captured = capsys.readouterr()
+        assert (tmp_path/".cleanup-trash/old.xxx").exists()
+        assert ".cleanup-trash/old.xxx" not in fspath_normalize_output(captured.out)
+
+    def test_falls_back_to_rmtree_if_rename_fails(self, tmp_path, monkeypatch):
+        setup_workdir(tmp_path, ["one.xxx/a.txt"])
+        def failing_rename(src, dst):
+            raise OSError(18, "Invalid cross-device link")
+        monkeypatch.setattr("os.rename", failing_rename)
+        monkeypatch.setattr("invoke_cleanup.start_background_removal",
+                            lambda trash_dir: pytest.fail("UNEXPECTED: Background removal"))
+        with cd(str(tmp_path)):
+            cleanup_dirs(["*.xxx"], trash_dir=".cleanup-trash")
+        assert not (tmp_path/"one.xxx").exists()
+
+    @pytest.mark.skipif(not hasattr(os, "symlink"), reason="Needs symlinks")
+    @pytest.mark.parametrize("trash_dir", [None, ".cleanup-trash"])
+    def test_selects_same_directories_as_normal_removal(self, trash_dir, tmp_path,
+                                                        monkeypatch, capsys):
+        setup_workdir(tmp_path, ["real/a.txt", "one.xxx/b.txt", "keep.xxx/c.txt"])
+        os.symlink(str(tmp_path/"real"), str(tmp_path/"link.xxx"))
+        monkeypatch.setattr("invoke_cleanup.start_background_removal",
+                            lambda trash_dir: 42)
+        with cd(str(tmp_path)):
+            cleanup_dirs(["*.xxx"], excluded=make_excluded(["keep.xxx"]),
+                         trash_dir=trash_dir, follow_symlinks=True)
+
+        captured = capsys.readouterr()
+        assert "RMTREE-FAILED: Cannot call rmtree on a symbolic link" in captured.out
+        assert os.path.islink(str(tmp_path/"link.xxx"))
+        assert (tmp_path/"real/a.txt").exists()
+        assert (tmp_path/"keep.xxx/c.txt").exists()
+        assert not (tmp_path/"one.xxx").exists()
+        if trash_dir:
+            assert os.listdir(str(tmp_path/trash_dir)) != []
+            assert not any(name.startswith(("link", "keep"))
+                           for name in os.listdir(str(tmp_path/trash_dir)))
+
+    def test_background_removal_removes_trash_dir(self, tmp_path):
+        setup_workdir(tmp_path, [".cleanup-trash/one.1.0/a/b.txt", ".cleanup-trash/two.1.1/c.txt"])
+        trash_dir = tmp_path/".cleanup-trash"
+        start_background_removal(str(trash_dir))
+        for _ in range(100):
+            if not trash_dir.exists():
+                break
+            time.sleep(0.1)
+        assert not trash_dir.exists()
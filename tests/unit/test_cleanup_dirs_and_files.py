@@ -0,0 +1,193 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :func:`invoke_cleanup.cleanup_dirs_and_files()`.
+"""
+
+from __future__ import absolute_import, print_function
+import os
+from invoke_cleanup import cleanup_dirs_and_files, cleanup_dirs, cleanup_files, \
+    cleanup_session
+from invoke.util import cd
+from tests.fspath import fspath_normalize_output
+import invoke_cleanup
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+from tests.workdir_util import setup_workdir
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestCleanupDirsAndFiles(object):
+
+    def test_removes_dirs_and_files(self, tmp_path):
+        setup_workdir(tmp_path, [
+            "build/foo.o",
+            "more/one.log",
+            "more/two.txt",
+        ])
+        cleanup_dirs_and_files(["build"], ["**/*.log"], workdir=tmp_path)
+        assert not (tmp_path/"build").exists()
+        assert not (tmp_path/"more/one.log").exists()
+        assert (tmp_path/"more/two.txt").exists()
+
+    @pytest.mark.parametrize("dry_run", [False, True])
+    def test_does_not_enter_removed_directories(self, dry_run, tmp_path, scanned_dirs, capsys):
+        setup_workdir(tmp_path, [
+            ".tox/py39/lib/foo.pyc",
+            ".tox/py39/__pycache__/bar.pyc",
+            "more/__pycache__/baz.pyc",
+        ])
+        with cd(str(tmp_path)):
+            cleanup_dirs_and_files([".tox", "**/__pycache__"], ["**/*.pyc"],
+                                   dry_run=dry_run)
+
+        captured = capsys.readouterr()
+        captured_output = fspath_normalize_output(captured.out)
+        assert not any(d.startswith(".tox") for d in scanned_dirs)
+        assert "RMTREE: .tox" in captured_output
+        assert "RMTREE: more/__pycache__" in captured_output
+        assert ".tox/py39" not in captured_output
+        assert "more/__pycache__/baz.pyc" not in captured_output
+
+    def test_enters_directory_that_contains_sys_executable(self, tmp_path, monkeypatch, capsys):
+        setup_workdir(tmp_path, [
+            "one.xxx/python_x.y/bin/python",
+            "one.xxx/other.log",
+        ])
+        mock_sys_executable = str(tmp_path/"one.xxx/python_x.y/bin/python")
+        with cd(str(tmp_path)):
+            monkeypatch.setattr("sys.executable", mock_sys_executable)
+            cleanup_dirs_and_files(["*.xxx"], ["**/*.log"])
+
+        captured = capsys.readouterr()
+        captured_output = fspath_normalize_output(captured.out)
+        assert "SKIP-SUICIDE: 'one.xxx' contains current python executable" in captured_output
+        assert not (tmp_path/"one.xxx/other.log").exists()
+        assert (tmp_path/"one.xxx/python_x.y/bin/python").exists()
+
+
+class TestCleanupSession(object):
+
+    @pytest.mark.parametrize("dry_run", [False, True])
+    def test_handles_each_path_only_once(self, dry_run, tmp_path, capsys):
+        setup_workdir(tmp_path, [
+            "more/__pycache__/baz.pyc",
+            "logs/one.log",
+        ])
+        with cd(str(tmp_path)):
+            with cleanup_session():
+                cleanup_dirs(["**/__pycache__", "more/__pycache__"], dry_run=dry_run)
+                cleanup_files(["**/*.pyc", "**/*.log"], dry_run=dry_run)
+                cleanup_files(["logs/*.log"], dry_run=dry_run)
+
+        captured = capsys.readouterr()
+        captured_output = fspath_normalize_output(captured.out)
+        assert captured_output.count("RMTREE: more/__pycache__") == 1
+        assert captured_output.count("REMOVE: logs/one.log") == 1
+        assert "baz.pyc" not in captured_output
+
+    def test_walk_prunes_handled_directories(self, tmp_path, monkeypatch, capsys):
+        setup_workdir(tmp_path, [
+            "more/__pycache__/baz.pyc",
+            "logs/one.log", "logs/two.log",
+        ])
+        checked_paths = []
+        real_is_path_below = invoke_cleanup.is_path_below
+        def counting_is_path_below(path, directories):
+            checked_paths.append(str(path))
+            return real_is_path_below(path, directories)
+        monkeypatch.setattr("invoke_cleanup.is_path_below", counting_is_path_below)
+        with cd(str(tmp_path)):
+            with cleanup_session():
+                cleanup_dirs(["**/__pycache__"], dry_run=True)
+                cleanup_files(["**/*.pyc", "logs/*.log"], dry_run=True)
+
+        captured = capsys.readouterr()
+        assert "baz.pyc" not in captured.out
+        assert captured.out.count("REMOVE: logs/one.log (dry-run)") == 1
+        assert checked_paths == []
+
+    def test_excluded_directory_is_cleaned_by_later_cleanup(self, tmp_path, capsys):
+        setup_workdir(tmp_path, [
+            "build/one.log",
+            "more/two.log",
+        ])
+        with cd(str(tmp_path)):
+            with cleanup_session():
+                cleanup_dirs_and_files(["build"], ["**/*.log"],
+                                       excluded=["build"])
+                cleanup_files(["**/*.log"])
+
+        captured = capsys.readouterr()
+        captured_output = fspath_normalize_output(captured.out)
+        assert "SKIP-DIR: build (excluded)" in captured_output
+        assert captured_output.count("SKIP-DIR:") == 1
+        assert captured_output.count("REMOVE: more/two.log") == 1
+        assert (tmp_path/"build").is_dir()
+        assert not (tmp_path/"build/one.log").exists()
+
+    def test_nested_session_shares_handled_paths(self):
+        with cleanup_session() as handled_paths:
+            with cleanup_session() as nested_handled_paths:
+                assert nested_handled_paths is handled_paths
+                handled_paths.add_directory(os.path.abspath("build"))
+            assert handled_paths.contains(os.path.abspath("build/foo.o"))
+            assert not handled_paths.contains(os.path.abspath("build2"))
+
+    def test_without_session_each_cleanup_starts_anew(self, tmp_path, capsys):
+        setup_workdir(tmp_path, ["one.log"])
+        with cd(str(tmp_path)):
+            cleanup_files(["*.log"], dry_run=True)
+            cleanup_files(["*.log"], dry_run=True)
+
+        captured = capsys.readouterr()
+        assert captured.out.count("REMOVE: one.log (dry-run)") == 2
+
+
+class TestCleanupDirsAndFilesWithPipeline(object):
+
+    def test_removes_while_walking(self, tmp_path, scanned_dirs, monkeypatch):
+        setup_workdir(tmp_path, [
+            "a/one.xxx/b.txt",
+            "a/c.log",
+            "z/two.xxx/d.txt",
+            "z/e.log",
+        ])
+        scanned_when_removed = []
+        real_rmtree = invoke_cleanup.PathCleaner._rmtree
+        def recording_rmtree(self, directory):
+            scanned_when_removed.append(len(scanned_dirs))
+            real_rmtree(self, directory)
+        monkeypatch.setattr(invoke_cleanup.PathCleaner, "_rmtree",
+                            recording_rmtree)
+        with cd(str(tmp_path)):
+            cleanup_dirs_and_files(["**/*.xxx"], ["**/*.log"],
+                                   jobs=2, queue_size=1)
+
+        assert not (tmp_path/"a/one.xxx").exists()
+        assert not (tmp_path/"z/two.xxx").exists()
+        assert not (tmp_path/"a/c.log").exists()
+        assert not (tmp_path/"z/e.log").exists()
+        # -- STREAMING: First removal starts before the walk is finished.
+        assert min(scanned_when_removed) < len(scanned_dirs)
+
+    def test_queue_size_bounds_pending_removals(self, tmp_path, monkeypatch):
+        setup_workdir(tmp_path, ["d%d.xxx/a.txt" % i for i in range(12)])
+        pending_sizes = []
+        real_submit = invoke_cleanup.RemovalPipeline._submit
+        def recording_submit(self, report, func, *args):
+            real_submit(self, report, func, *args)
+            pending_sizes.append(len(self.pending))
+        monkeypatch.setattr(invoke_cleanup.RemovalPipeline, "_submit",
+                            recording_submit)
+        with cd(str(tmp_path)):
+            cleanup_dirs_and_files(["*.xxx"], [], jobs=2, queue_size=3)
+
+        assert len(pending_sizes) == 12
+        assert max(pending_sizes) <= 3
+        assert not list(tmp_path.glob("*.xxx"))
@@ -4,7 +4,10 @@ Unit tests for :func:`invoke_cleanup.exexecute_cleanup_tasks()`.
 """
 
 from __future__ import absolute_import, print_function
-from invoke_cleanup import cleanup_files
+import os
+from invoke_cleanup import cleanup_files, remove_file_batch, path_select_records, \
+    PathCleaner
+import invoke_cleanup
 from invoke.util import cd
 from tests.fspath import fspath_normalize, fspath_normalize_output
 import pytest
@@ -69,3 +72,61 @@ class TestCleanupFiles(object):
             assert expected2 in captured_output
             expected2 = fspath_normalize("OSError: MOCK_REMOVE: %s" % problematic_file2)
             assert expected2 in captured_output
+
+    def test_rejects_unknown_option(self, tmp_path):
+        setup_workdir(tmp_path, ["one.xxx"])
+        with cd(str(tmp_path)):
+            with pytest.raises(TypeError):
+                cleanup_files(["*.xxx"], scan_job=4)
+        assert (tmp_path/"one.xxx").exists()
+
+
+class TestCleanupFilesWithJobs(object):
+
+    def test_removes_files_in_batches(self, tmp_path, monkeypatch, capsys):
+        files = ["one/f%d.xxx" % i for i in range(10)]
+        files.extend(["two/g%d.xxx" % i for i in range(3)])
+        setup_workdir(tmp_path, files + ["two/keep.txt"])
+        batches = []
+        real_remove_file_batch = invoke_cleanup.remove_file_batch
+        def recording_remove_file_batch(directory, names, limiter=None):
+            batches.append((os.path.basename(directory), len(names)))
+            return real_remove_file_batch(directory, names, limiter)
+        monkeypatch.setattr("invoke_cleanup.remove_file_batch", recording_remove_file_batch)
+
+        with cd(str(tmp_path)):
+            cleaner = PathCleaner()
+            cleaner.remove_files(path_select_records({"file": ["**/*.xxx"]}),
+                                 jobs=4, batch_size=4)
+
+        captured = capsys.readouterr()
+        captured_output = fspath_normalize_output(captured.out)
+        assert not any((tmp_path/f).exists() for f in files)
+        assert (tmp_path/"two/keep.txt").exists()
+        assert cleaner.removed_count == len(files)
+        assert sorted(batches) == [("one", 2), ("one", 4), ("one", 4), ("two", 3)]
+        assert captured_output.count("REMOVE: ") == len(files)
+
+    def test_reports_errors_of_each_batch(self, tmp_path, monkeypatch, capsys):
+        setup_workdir(tmp_path, ["foo/one.xxx", "foo/two.xxx"])
+        real_unlink = os.unlink
+        def failing_unlink(name, *args, **kwargs):
+            if os.path.basename(name) == "one.xxx":
+                raise OSError(13, "Permission denied", name)
+            return real_unlink(name, *args, **kwargs)
+        monkeypatch.setattr("os.unlink", failing_unlink)
+
+        with cd(str(tmp_path)):
+            cleanup_files(["**/*.xxx"], jobs=2)
+
+        captured = capsys.readouterr()
+        assert "[Errno 13] Permission denied: '%s'" % \
+            (tmp_path/"foo/one.xxx") in captured.out
+        assert (tmp_path/"foo/one.xxx").exists()
+        assert not (tmp_path/"foo/two.xxx").exists()
+
+    def test_ignores_files_that_are_already_removed(self, tmp_path):
+        setup_workdir(tmp_path, ["foo/one.xxx"])
+        removed_count, errors = remove_file_batch(str(tmp_path/"foo"),
+                                                  ["one.xxx", "MISSING.xxx"])
+        assert (removed_count, errors) == (1, [])
@@ -0,0 +1,165 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for the throttled cleanup mode (see: :class:`invoke_cleanup.RateLimiter`).
+"""
+
+from __future__ import absolute_import, print_function
+import os
+from invoke_cleanup import RateLimiter, cleanup_dirs, cleanup_files, \
+    cleanup_dirs_and_files, rmtree_parallel, supports_rmtree_parallel
+from invoke.util import cd
+import invoke_cleanup
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+from tests.workdir_util import setup_workdir
+
+
+class FakeClock(object):
+    """Clock that only advances when sleep() is called."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def acquired(monkeypatch):
+    """Counts the acquired operations per rate (of all rate limiters)."""
+    counts = {}
+    def counting_acquire(self, count=1):
+        counts[self.rate] = counts.get(self.rate, 0) + count
+    monkeypatch.setattr(RateLimiter, "acquire", counting_acquire)
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestRateLimiter(object):
+
+    def test_burst_passes_without_delay(self):
+        clock = FakeClock()
+        limiter = RateLimiter(100, burst=10, clock=clock, sleep=clock.sleep)
+        for _ in range(10):
+            limiter.acquire()
+        assert clock.sleeps == []
+
+    def test_limits_the_rate_after_the_burst(self):
+        clock = FakeClock()
+        limiter = RateLimiter(100, burst=10, clock=clock, sleep=clock.sleep)
+        for _ in range(110):
+            limiter.acquire()
+        assert clock.now == pytest.approx(1.0)
+        assert all(seconds == pytest.approx(0.01) for seconds in clock.sleeps)
+
+    def test_refills_while_idle(self):
+        clock = FakeClock()
+        limiter = RateLimiter(100, burst=10, clock=clock, sleep=clock.sleep)
+        for _ in range(10):
+            limiter.acquire()
+        clock.now += 1.0
+        limiter.acquire(10)
+        assert clock.sleeps == []
+
+    @pytest.mark.parametrize("rate", [0, -1])
+    def test_rejects_invalid_rate(self, rate):
+        with pytest.raises(ValueError):
+            RateLimiter(rate)
+
+
+class TestCleanupWithThrottling(object):
+
+    def test_limits_unlinks_of_files(self, tmp_path, acquired):
+        setup_workdir(tmp_path, ["one.xxx", "two.xxx", "foo/three.xxx", "keep.txt"])
+        with cd(str(tmp_path)):
+            cleanup_files(["**/*.xxx"], unlinks_per_second=1000)
+        assert acquired == {1000.0: 3}
+        assert not list(tmp_path.glob("**/*.xxx"))
+        assert (tmp_path/"keep.txt").exists()
+
+    def test_limits_unlinks_of_file_batches(self, tmp_path, acquired):
+        setup_workdir(tmp_path, ["foo/f%d.xxx" % i for i in range(5)])
+        with cd(str(tmp_path)):
+            cleanup_files(["**/*.xxx"], jobs=2, unlinks_per_second=1000)
+        assert acquired == {1000.0: 5}
+        assert not list(tmp_path.glob("**/*.xxx"))
+
+    def test_limits_unlinks_of_directory_trees(self, tmp_path, acquired):
+        setup_workdir(tmp_path, ["one.xxx/a/b.txt", "one.xxx/c.txt", "keep.txt"])
+        with cd(str(tmp_path)):
+            cleanup_dirs(["*.xxx"], unlinks_per_second=1000)
+        # -- UNLINKS: b.txt, c.txt -- RMDIRS: one.xxx/a, one.xxx
+        assert acquired == {1000.0: 4}
+        assert not (tmp_path/"one.xxx").exists()
+        assert (tmp_path/"keep.txt").exists()
+
+    def test_limits_listed_directories(self, tmp_path, acquired):
+        setup_workdir(tmp_path, ["a/b/one.log", "c/two.log", "three.log"])
+        with cd(str(tmp_path)):
+            cleanup_dirs_and_files([], ["**/*.log"], scans_per_second=500)
+        # -- LISTED: ., a, a/b, c
+        assert acquired == {500.0: 4}
+        assert not list(tmp_path.glob("**/*.log"))
+
+    @pytest.mark.parametrize("lowered", [True, False])
+    def test_ionice_lowers_io_priority(self, lowered, tmp_path, monkeypatch, capsys):
+        calls = []
+        def fake_lower_io_priority():
+            calls.append(True)
+            return lowered
+        monkeypatch.setattr("invoke_cleanup.lower_io_priority", fake_lower_io_priority)
+        with cd(str(tmp_path)):
+            cleanup_dirs_and_files(["*.xxx"], ["*.log"], ionice=True)
+
+        captured = capsys.readouterr()
+        assert calls == [True]
+        assert ("IONICE: Cannot lower" in captured.out) == (not lowered)
+
+    @pytest.mark.parametrize("returncode", [0, 1])
+    def test_lower_io_priority_runs_ionice_only_once(self, returncode, monkeypatch):
+        commands = []
+        def fake_call(command, **kwargs):
+            commands.append(command)
+            return returncode
+        monkeypatch.setattr("subprocess.call", fake_call)
+        monkeypatch.setattr("sys.platform", "linux")
+        monkeypatch.setattr("invoke_cleanup._IO_PRIORITY_LOWERED", {})
+        results = [invoke_cleanup.lower_io_priority() for _ in range(3)]
+
+        assert results == [returncode == 0] * 3
+        assert commands == [["ionice", "-c", "3", "-p", str(os.getpid())]]
+
+
+class TestRmtreeThrottled(object):
+
+    @pytest.mark.parametrize("parallel", [True, False])
+    def test_removes_directory_tree(self, parallel, tmp_path, monkeypatch):
+        if parallel and not supports_rmtree_parallel():
+            pytest.skip("Needs directory file descriptors")
+        monkeypatch.setattr("invoke_cleanup.supports_rmtree_parallel",
+                            lambda: parallel)
+        setup_workdir(tmp_path, ["tree/a/b/c.txt", "tree/d.txt", "other/keep.txt"])
+        os.symlink(str(tmp_path/"other"), str(tmp_path/"tree/a/link"))
+        clock = FakeClock()
+        limiter = RateLimiter(1000, burst=1, clock=clock, sleep=clock.sleep)
+        rmtree_parallel(tmp_path/"tree", jobs=1, limiter=limiter)
+
+        # -- UNLINKS: c.txt, d.txt, link -- RMDIRS: b, a, tree
+        assert clock.now == pytest.approx(0.005)
+        assert not (tmp_path/"tree").exists()
+        assert (tmp_path/"other/keep.txt").exists()
+
+    def test_ignores_missing_directory(self, tmp_path, monkeypatch):
+        monkeypatch.setattr("invoke_cleanup.supports_rmtree_parallel", lambda: False)
+        rmtree_parallel(tmp_path/"MISSING", limiter=RateLimiter(1000))
@@ -0,0 +1,197 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :mod:`invoke_cleanup_watch` and the watch journal.
+"""
+
+from __future__ import absolute_import, print_function
+import errno
+import os
+import sys
+from invoke_cleanup import cleanup_dirs_and_files, load_watched_paths
+from invoke.util import cd
+from tests.fspath import fspath_normalize_output
+import pytest
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"),
+                                reason="REQUIRES: Linux (inotify)")
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+from tests.workdir_util import setup_workdir
+
+CLEANUP_PATTERN_GROUPS = {"directory": ["build"], "file": ["**/*.log"]}
+CLEANUP_ALL_PATTERN_GROUPS = {"directory": [".tox"], "file": []}
+WATCH_FILE = ".cache/watch.json"
+
+
+@pytest.fixture
+def tracker(tmp_path):
+    from invoke_cleanup_watch import ArtifactTracker
+    the_tracker = ArtifactTracker([CLEANUP_PATTERN_GROUPS, CLEANUP_ALL_PATTERN_GROUPS],
+                                  workdir=tmp_path, watch_file=WATCH_FILE)
+    yield the_tracker
+    the_tracker.close()
+
+
+def tracked_paths_of(tracker):
+    return sorted(os.path.relpath(path, tracker.workdir) for path in tracker.artifacts)
+
+
+def process_all_events(tracker):
+    while tracker.process_events(timeout=0.1):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestArtifactTracker(object):
+
+    def test_scan_tracks_existing_artifacts(self, tmp_path, tracker):
+        setup_workdir(tmp_path, ["build/foo.o", "more/one.log", "more/two.txt"])
+        tracker.scan()
+        assert tracked_paths_of(tracker) == ["build", os.path.join("more", "one.log")]
+
+    def test_tracks_created_artifacts(self, tmp_path, tracker):
+        setup_workdir(tmp_path, ["more/two.txt"])
+        tracker.scan()
+        setup_workdir(tmp_path, ["build/foo.o", "more/one.log", "new/deeper/three.log"])
+        process_all_events(tracker)
+        assert tracked_paths_of(tracker) == [
+            "build",
+            os.path.join("more", "one.log"),
+            os.path.join("new", "deeper", "three.log"),
+        ]
+
+    def test_forgets_removed_artifacts(self, tmp_path, tracker):
+        setup_workdir(tmp_path, ["more/one.log", "more/deeper/two.log", "other.log"])
+        tracker.scan()
+        (tmp_path/"other.log").unlink()
+        (tmp_path/"more").rename(tmp_path/"renamed")
+        process_all_events(tracker)
+        assert tracked_paths_of(tracker) == [
+            os.path.join("renamed", "deeper", "two.log"),
+            os.path.join("renamed", "one.log"),
+        ]
+
+    def test_does_not_watch_directories_that_clean_removes(self, tmp_path, tracker):
+        setup_workdir(tmp_path, ["build/lib/foo.log", ".tox/py39/bar.log"])
+        tracker.scan()
+        watched_dirs = sorted(watch[0] for watch in tracker.watches.values())
+        assert str(tmp_path/"build") not in watched_dirs
+        assert str(tmp_path/".tox/py39") in watched_dirs
+        assert tracked_paths_of(tracker) == [
+            ".tox", os.path.join(".tox", "py39", "bar.log"), "build",
+        ]
+
+
+class TestWatchJournal(object):
+
+    def test_load_watched_paths_per_pattern_group(self, tmp_path, tracker):
+        setup_workdir(tmp_path, ["build/foo.o", "more/one.log", ".tox/py39/x.py"])
+        tracker.scan()
+        tracker.save()
+
+        watch_file = tmp_path/WATCH_FILE
+        cleanup_paths = load_watched_paths(watch_file, CLEANUP_PATTERN_GROUPS, tmp_path)
+        cleanup_all_paths = load_watched_paths(watch_file, CLEANUP_ALL_PATTERN_GROUPS, tmp_path)
+        assert sorted((str(p), tags) for p, tags in cleanup_paths) == [
+            (str(tmp_path/"build"), frozenset(["directory"])),
+            (str(tmp_path/"more/one.log"), frozenset(["file"])),
+        ]
+        assert [str(p) for p, _ in cleanup_all_paths] == [str(tmp_path/".tox")]
+
+    def test_load_watched_paths_ignores_other_patterns(self, tmp_path, tracker):
+        tracker.scan()
+        tracker.save()
+        other_pattern_groups = {"directory": ["dist"], "file": []}
+        assert load_watched_paths(tmp_path/WATCH_FILE, other_pattern_groups, tmp_path) is None
+
+    def test_load_watched_paths_ignores_journal_of_dead_process(self, tmp_path, tracker, monkeypatch):
+        tracker.scan()
+        tracker.save()
+        monkeypatch.setattr("invoke_cleanup.is_process_alive", lambda pid: False)
+        assert load_watched_paths(tmp_path/WATCH_FILE, CLEANUP_PATTERN_GROUPS, tmp_path) is None
+
+    def test_cleanup_uses_watch_journal_instead_of_walk(self, tmp_path, tracker, scanned_dirs):
+        setup_workdir(tmp_path, ["build/foo.o", "more/one.log", "more/two.txt"])
+        tracker.scan()
+        tracker.save()
+
+        del scanned_dirs[:]
+        cleanup_dirs_and_files(["build"], ["**/*.log"], workdir=tmp_path,
+                               watch_file=WATCH_FILE)
+        assert scanned_dirs == []
+        assert not (tmp_path/"build").exists()
+        assert not (tmp_path/"more/one.log").exists()
+        assert (tmp_path/"more/two.txt").exists()
+
+    def test_cleanup_with_follow_symlinks_walks_the_tree(self, tmp_path, tracker, scanned_dirs):
+        setup_workdir(tmp_path, ["more/one.log", "other/two.log"])
+        tracker.scan()
+        tracker.save()
+        os.symlink(str(tmp_path/"other"), str(tmp_path/"more/link"))
+
+        del scanned_dirs[:]
+        cleanup_dirs_and_files([], ["**/*.log"], workdir=tmp_path,
+                               watch_file=WATCH_FILE, follow_symlinks=True)
+        assert scanned_dirs != []
+        assert not (tmp_path/"more/one.log").exists()
+        assert not (tmp_path/"other/two.log").exists()
+
+    def test_cleanup_with_keep_tracked_walks_the_tree(self, tmp_path, tracker, scanned_dirs):
+        setup_workdir(tmp_path, ["more/one.log"])
+        tracker.scan()
+        tracker.save()
+
+        del scanned_dirs[:]
+        cleanup_dirs_and_files([], ["**/*.log"], workdir=tmp_path,
+                               watch_file=WATCH_FILE, keep_tracked=True)
+        assert scanned_dirs != []
+        assert not (tmp_path/"more/one.log").exists()
+
+    def test_unwatched_directory_makes_journal_incomplete(self, tmp_path, tracker,
+                                                          scanned_dirs, monkeypatch, capsys):
+        from invoke_cleanup_watch import Inotify
+        real_add_watch = Inotify.add_watch
+        def failing_add_watch(self, directory, *args):
+            if os.path.basename(directory) == "more":
+                raise OSError(errno.ENOSPC, os.strerror(errno.ENOSPC), directory)
+            return real_add_watch(self, directory, *args)
+        monkeypatch.setattr(Inotify, "add_watch", failing_add_watch)
+        setup_workdir(tmp_path, ["more/one.log", "other/two.log"])
+        tracker.scan()
+        tracker.save()
+
+        captured = capsys.readouterr()
+        assert "WATCH: Cannot watch %s" % (tmp_path/"more") in captured.out
+        assert load_watched_paths(tmp_path/WATCH_FILE, CLEANUP_PATTERN_GROUPS, tmp_path) is None
+
+        del scanned_dirs[:]
+        cleanup_dirs_and_files(["build"], ["**/*.log"], workdir=tmp_path,
+                               watch_file=WATCH_FILE)
+        assert scanned_dirs != []
+        assert not (tmp_path/"more/one.log").exists()
+
+    def test_cleanup_prints_same_paths_as_walk(self, tmp_path, tracker, scanned_dirs, capsys):
+        setup_workdir(tmp_path, ["build/foo.o", "more/one.log"])
+        tracker.scan()
+        tracker.save()
+
+        del scanned_dirs[:]
+        with cd(str(tmp_path)):
+            cleanup_dirs_and_files(["build"], ["**/*.log"], watch_file=WATCH_FILE)
+
+        captured = capsys.readouterr()
+        captured_output = fspath_normalize_output(captured.out)
+        assert scanned_dirs == []
+        assert "RMTREE: build\n" in captured_output
+        assert "REMOVE: more/one.log\n" in captured_output
+
+    def test_journal_is_removed_when_tracker_stops(self, tmp_path, tracker):
+        setup_workdir(tmp_path, ["more/one.log"])
+        tracker.run(duration=0.3)
+        assert not (tmp_path/WATCH_FILE).exists()
+        assert tracker.inotify is None
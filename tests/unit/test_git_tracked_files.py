@@ -0,0 +1,157 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :class:`invoke_cleanup.GitTrackedFiles` (tracked-file guard).
+"""
+
+from __future__ import absolute_import, print_function
+import os
+import subprocess
+from invoke_cleanup import GitTrackedFiles, read_git_index, \
+    cleanup_dirs_and_files, cleanup_files
+from tests.fspath import fspath_normalize_output
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+from tests.conftest import requires_git
+from tests.workdir_util import setup_workdir
+
+TRACKED_PATHS = [
+    "tests/fixtures/golden.log",
+    "tests/fixtures/deeper/other.log",
+    "src/main.py",
+]
+UNTRACKED_PATHS = [
+    "tests/run.log",
+    "build/foo.o",
+    "tests/fixtures/new.log",
+]
+
+
+def git(directory, *args):
+    subprocess.check_call(("git",) + args, cwd=str(directory))
+
+
+@pytest.fixture(params=[2, 3, 4])
+def repository(request, tmp_path):
+    setup_workdir(tmp_path, TRACKED_PATHS)
+    git(tmp_path, "init", "-q")
+    git(tmp_path, "add", *TRACKED_PATHS)
+    if request.param == 3:
+        # -- EXTENDED FLAGS: Needed for intent-to-add entries.
+        setup_workdir(tmp_path, ["src/intent.py"])
+        git(tmp_path, "add", "--intent-to-add", "src/intent.py")
+    git(tmp_path, "update-index", "--index-version", str(request.param))
+    setup_workdir(tmp_path, UNTRACKED_PATHS)
+    return tmp_path
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestReadGitIndex(object):
+
+    @requires_git
+    def test_reads_tracked_paths(self, repository):
+        paths = sorted(path for path, _ in read_git_index(str(repository/".git/index")))
+        expected = sorted(TRACKED_PATHS)
+        if (repository/"src/intent.py").exists():
+            expected = sorted(expected + ["src/intent.py"])
+        assert paths == expected
+
+    @requires_git
+    def test_reads_split_index(self, repository):
+        git(repository, "update-index", "--split-index")
+        # -- SPLIT INDEX: Replaced, deleted and new entries.
+        (repository/"src/main.py").write_text(u"# CHANGED")
+        git(repository, "add", "src/main.py")
+        git(repository, "rm", "-q", "--cached", "tests/fixtures/deeper/other.log")
+        git(repository, "add", "-f", "tests/run.log")
+        assert list(repository.glob(".git/sharedindex.*"))
+
+        paths = sorted(path for path, _ in read_git_index(str(repository/".git/index")))
+        expected = subprocess.check_output(["git", "ls-files"], cwd=str(repository))
+        assert paths == sorted(expected.decode("utf-8").splitlines())
+        assert "src/main.py" in paths
+        assert "tests/run.log" in paths
+        assert "tests/fixtures/deeper/other.log" not in paths
+
+    def test_rejects_unsupported_extension(self, tmp_path):
+        setup_workdir(tmp_path, ["index"])
+        (tmp_path/"index").write_bytes(b"DIRC\x00\x00\x00\x02\x00\x00\x00\x00" +
+                                       b"xxxx\x00\x00\x00\x00" + b"\x00" * 20)
+        with pytest.raises(ValueError):
+            read_git_index(str(tmp_path/"index"))
+
+    def test_rejects_other_files(self, tmp_path):
+        setup_workdir(tmp_path, ["index"])
+        (tmp_path/"index").write_bytes(b"NOT-AN-INDEX")
+        with pytest.raises(ValueError):
+            read_git_index(str(tmp_path/"index"))
+
+
+class TestGitTrackedFiles(object):
+
+    @requires_git
+    def test_is_tracked(self, repository):
+        guard = GitTrackedFiles()
+        assert guard.is_tracked(repository/"tests/fixtures/golden.log")
+        assert not guard.is_tracked(repository/"tests/run.log")
+        assert not guard.is_tracked(repository/"outside.log")
+
+    @requires_git
+    def test_contains_tracked(self, repository):
+        guard = GitTrackedFiles()
+        assert guard.contains_tracked(repository/"tests")
+        assert guard.contains_tracked(repository/"tests/fixtures/deeper")
+        assert guard.contains_tracked(repository)
+        assert not guard.contains_tracked(repository/"build")
+
+    @requires_git
+    def test_keeps_every_path_if_index_is_unreadable(self, repository, capsys):
+        (repository/".git/index").write_bytes(b"NOT-AN-INDEX")
+        guard = GitTrackedFiles()
+        assert guard.is_tracked(repository/"tests/run.log")
+        assert guard.contains_tracked(repository/"build")
+        captured = capsys.readouterr()
+        assert "TRACKED-GUARD:" in captured.out
+        assert "keeps every path in: %s" % repository in captured.out
+
+    def test_without_repository(self, tmp_path):
+        setup_workdir(tmp_path, ["one.log"])
+        guard = GitTrackedFiles()
+        assert not guard.is_tracked(tmp_path/"one.log")
+        assert not guard.contains_tracked(tmp_path)
+
+
+class TestCleanupWithKeepTracked(object):
+
+    @requires_git
+    def test_cleanup_files_keeps_tracked_files(self, repository, capsys):
+        cleanup_files(["**/*.log"], workdir=repository, keep_tracked=True)
+        captured = fspath_normalize_output(capsys.readouterr().out)
+        assert (repository/"tests/fixtures/golden.log").exists()
+        assert (repository/"tests/fixtures/deeper/other.log").exists()
+        assert not (repository/"tests/run.log").exists()
+        assert not (repository/"tests/fixtures/new.log").exists()
+        assert "SKIP-TRACKED: %s" % (repository/"tests/fixtures/golden.log") in captured
+
+    @requires_git
+    def test_cleanup_removes_nothing_if_index_is_unreadable(self, repository, capsys):
+        (repository/".git/index").write_bytes(b"NOT-AN-INDEX")
+        cleanup_dirs_and_files(["build"], ["**/*.log"],
+                               workdir=repository, keep_tracked=True)
+        captured = fspath_normalize_output(capsys.readouterr().out)
+        assert (repository/"build/foo.o").exists()
+        assert (repository/"tests/run.log").exists()
+        assert "SKIP-TRACKED: %s" % (repository/"build") in captured
+
+    @requires_git
+    def test_cleanup_keeps_directories_with_tracked_files(self, repository):
+        cleanup_dirs_and_files(["build", "tests/fixtures"], ["**/*.log"],
+                               workdir=repository, keep_tracked=True)
+        assert not (repository/"build").exists()
+        assert (repository/"tests/fixtures/golden.log").exists()
+        assert not (repository/"tests/fixtures/new.log").exists()
@@ -0,0 +1,149 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :class:`invoke_cleanup.GitIgnore` (without spawning git).
+"""
+
+from __future__ import absolute_import, print_function
+import os
+import re
+import shutil
+import subprocess
+from invoke_cleanup import GitIgnore, cleanup_dirs_and_files, parse_gitignore, path_select
+from invoke.util import cd
+from tests.fspath import fspath_normalize_output
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+from tests.conftest import requires_git
+from tests.workdir_util import setup_workdir
+
+WORKDIR_PATHS = [
+    ".git/info/exclude",
+    ".git/HEAD",
+    "src/main.py",
+    "src/main.pyc",
+    "src/data/keep.log",
+    "src/data/other.log",
+    "src/.gitignore",
+    "build/lib/foo.o",
+    "docs/_build/index.html",
+    "docs/conf.py",
+    "local.txt",
+    ".gitignore",
+    "nested/.git/HEAD",
+    "nested/.gitignore",
+    "nested/main.pyc",
+    "nested/other.log",
+]
+GITIGNORE_FILES = {
+    ".gitignore": u"*.log\n/build/\n*.pyc\ndocs/_build\n",
+    "src/.gitignore": u"!keep.log\n",
+    ".git/info/exclude": u"local.txt\n",
+    "nested/.gitignore": u"*.pyc\n",
+}
+
+
+def setup_repository(directory):
+    setup_workdir(directory, WORKDIR_PATHS)
+    for filename, text in GITIGNORE_FILES.items():
+        (directory/filename).write_text(text)
+
+
+def select_ignored(top):
+    return sorted(os.path.relpath(str(path), str(top))
+                  for path, _ in path_select({}, top, gitignore=GitIgnore()))
+
+
+def cleanup_ignored(top, capsys):
+    """Paths that the cleanup removes in gitignored mode (dry-run)."""
+    capsys.readouterr()
+    with cd(str(top)):
+        cleanup_dirs_and_files([], [], gitignored=True, dry_run=True)
+    captured_output = fspath_normalize_output(capsys.readouterr().out)
+    return sorted(os.path.normpath(path) for path in
+                  re.findall(r"^(?:RMTREE|REMOVE): (.*) \(dry-run\)$",
+                             captured_output, re.MULTILINE))
+
+
+def git_ignored(top):
+    output = subprocess.check_output(
+        ["git", "ls-files", "--others", "--ignored", "--exclude-standard",
+         "--directory"], cwd=str(top))
+    return sorted(p.rstrip("/") for p in output.decode("utf-8").splitlines())
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestParseGitIgnore(object):
+
+    @pytest.mark.parametrize("line, expected", [
+        (u"*.log", ("**/*.log", False)),
+        (u"/build/", ("build/", False)),
+        (u"docs/_build", ("docs/_build", False)),
+        (u"!keep.log", ("**/keep.log", True)),
+        (u"doc/**", ("doc/**/*", False)),
+        (u"\\#hash", ("**/#hash", False)),
+        (u"x\\*y", ("**/x[*]y", False)),
+        (u"trailing   ", ("**/trailing", False)),
+    ])
+    def test_parse_gitignore(self, line, expected):
+        assert parse_gitignore([line]) == [expected]
+
+    def test_parse_gitignore_skips_comments_and_blank_lines(self):
+        assert parse_gitignore([u"# comment", u"", u"   "]) == []
+
+
+class TestGitIgnore(object):
+
+    def test_selects_ignored_paths(self, tmp_path):
+        setup_repository(tmp_path)
+        assert select_ignored(tmp_path) == [
+            "build",
+            os.path.join("docs", "_build"),
+            "local.txt",
+            os.path.join("nested", "main.pyc"),
+            os.path.join("src", "data", "other.log"),
+            os.path.join("src", "main.pyc"),
+        ]
+
+    @requires_git
+    def test_selects_same_paths_as_git(self, tmp_path, capsys):
+        setup_repository(tmp_path)
+        # -- TRACKED: Ignored file and file in an ignored directory.
+        setup_workdir(tmp_path, ["fixtures/golden.log", "build/keep.txt",
+                                 "build/tmp.o", "build/other.log"])
+        shutil.rmtree(str(tmp_path/".git"))
+        shutil.rmtree(str(tmp_path/"nested/.git"))
+        subprocess.check_call(["git", "init", "-q"], cwd=str(tmp_path))
+        subprocess.check_call(["git", "init", "-q"], cwd=str(tmp_path/"nested"))
+        subprocess.check_call(["git", "add", "-f", "fixtures/golden.log",
+                               "build/keep.txt"], cwd=str(tmp_path))
+        (tmp_path/".git/info").mkdir(exist_ok=True)
+        (tmp_path/".git/info/exclude").write_text(GITIGNORE_FILES[".git/info/exclude"])
+        expected = [p for p in git_ignored(tmp_path) if not p.startswith("nested")]
+        expected += [os.path.join("nested", p) for p in git_ignored(tmp_path/"nested")]
+        selected = cleanup_ignored(tmp_path, capsys)
+        assert selected == sorted(os.path.normpath(p) for p in expected)
+        assert os.path.join("build", "tmp.o") in selected
+        assert os.path.join("build", "other.log") in selected
+        assert os.path.join("fixtures", "golden.log") not in selected
+
+    def test_uses_rules_of_parent_directories(self, tmp_path):
+        setup_repository(tmp_path)
+        assert select_ignored(tmp_path/"src") == [
+            os.path.join("data", "other.log"), "main.pyc",
+        ]
+
+    def test_cleanup_removes_ignored_paths(self, tmp_path):
+        setup_repository(tmp_path)
+        cleanup_dirs_and_files([], [], workdir=tmp_path, gitignored=True,
+                               excluded=[tmp_path/"docs"])
+        assert not (tmp_path/"build").exists()
+        assert not (tmp_path/"src/data/other.log").exists()
+        assert (tmp_path/"src/data/keep.log").exists()
+        assert (tmp_path/"docs/_build/index.html").exists()
+        assert (tmp_path/".git/HEAD").exists()
@@ -0,0 +1,550 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :func:`invoke_cleanup.path_select()` and its tree walker.
+"""
+
+from __future__ import absolute_import, print_function
+import fnmatch
+import os
+import pathlib
+from invoke_cleanup import path_glob, path_select, path_select_records, \
+    split_pattern, cleanup_files, PathRecord, \
+    split_absolute_pattern, group_absolute_patterns, expand_braces, PathMatcher, \
+    parse_pattern_spec, PathPredicate
+import time
+import invoke_cleanup
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+from tests.workdir_util import setup_workdir
+
+WORKDIR_PATHS = [
+    "one.xxx/.ignored",
+    "one.xxx/inner.xxx",
+    "more/two.xxx/.ignored",
+    "more/deeper/three.xxx",
+    "more/other.zzz",
+    "build/lib/foo.o",
+    "build/foo.o",
+    ".hidden/four.xxx",
+]
+
+
+def pathlib_glob(pattern, current_dir):
+    return sorted(os.path.relpath(str(p), str(current_dir))
+                  for p in current_dir.glob(pattern))
+
+
+def relpaths_of(paths, current_dir):
+    return sorted(os.path.relpath(str(p), str(current_dir)) for p in paths)
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestSplitPattern(object):
+
+    @pytest.mark.parametrize("pattern, expected", [
+        ("**/*.pyc", (["**", "*.pyc"], False)),
+        ("build/", (["build"], True)),
+        ("./build/**", (["build", "**"], True)),
+        ("**/**/foo", (["**", "foo"], False)),
+    ])
+    def test_split_pattern(self, pattern, expected):
+        assert split_pattern(pattern) == expected
+
+
+class TestPathSelect(object):
+
+    @pytest.mark.parametrize("pattern", [
+        "*.xxx", "**/*.xxx", "more/*.xxx", "more/**/*.xxx", "**/*.xxx/",
+        "build/**", "build/**/*.o", "**/deeper", "more/two.xxx", "MISSING/**",
+    ])
+    def test_path_glob__selects_same_paths_as_pathlib(self, pattern, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        expected = pathlib_glob(pattern, tmp_path)
+        selected = relpaths_of(path_glob(pattern, current_dir=tmp_path), tmp_path)
+        assert selected == expected
+
+    def test_path_select__reports_tags_of_matching_patterns(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        pattern_groups = {
+            "directory": ["**/*.xxx", "build"],
+            "file": ["**/*.xxx", "**/*.o"],
+        }
+        selected = dict((os.path.relpath(str(p), str(tmp_path)), tags)
+                        for p, tags in path_select(pattern_groups, tmp_path))
+        assert selected["one.xxx"] == frozenset(["directory", "file"])
+        assert selected["build"] == frozenset(["directory"])
+        assert selected[os.path.join("build", "foo.o")] == frozenset(["file"])
+        assert "more" not in selected
+
+    def test_path_select__walks_each_directory_only_once(self, tmp_path, scanned_dirs):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        pattern_groups = {
+            "directory": ["**/*.xxx", "**/deeper", "build"],
+            "file": ["**/*.o", "**/*.zzz", "**/.ignored"],
+        }
+        list(path_select(pattern_groups, tmp_path))
+        assert len(scanned_dirs) == len(set(scanned_dirs))
+
+    def test_path_select__does_not_enter_dirs_without_possible_matches(self, tmp_path, scanned_dirs):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        list(path_select({"file": ["*/deeper/*.xxx"]}, tmp_path))
+        assert str(tmp_path/"more/two.xxx") not in scanned_dirs
+        assert str(tmp_path/"more/deeper") in scanned_dirs
+
+
+class TestPathSelectWithAnchoredPatterns(object):
+
+    def test_walk_starts_at_literal_base(self, tmp_path, scanned_dirs):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        selected = relpaths_of(path_glob("more/*.xxx", tmp_path), tmp_path)
+        assert selected == [os.path.join("more", "two.xxx")]
+        assert scanned_dirs == [str(tmp_path/"more")]
+
+    def test_missing_base_is_not_walked(self, tmp_path, scanned_dirs):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        selected = list(path_glob("MISSING/**/*.o", tmp_path))
+        assert selected == []
+        assert scanned_dirs == []
+
+    def test_missing_deep_base_costs_one_stat(self, tmp_path, monkeypatch):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        stat_calls = []
+        real_stat, real_lstat = os.stat, os.lstat
+        def counting_stat(path, *args, **kwargs):
+            stat_calls.append(str(path))
+            return real_stat(path, *args, **kwargs)
+        def counting_lstat(path, *args, **kwargs):
+            stat_calls.append(str(path))
+            return real_lstat(path, *args, **kwargs)
+        monkeypatch.setattr("os.stat", counting_stat)
+        monkeypatch.setattr("os.lstat", counting_lstat)
+        selected = list(path_glob("more/deeper/MISSING/**/*.o", tmp_path))
+        monkeypatch.undo()
+
+        assert selected == []
+        assert stat_calls == [str(tmp_path/"more/deeper/MISSING")]
+
+    def test_literal_pattern_needs_no_walk(self, tmp_path, scanned_dirs):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        pattern_groups = {"directory": ["build", "more/two.xxx/", "dist"]}
+        selected = relpaths_of((p for p, _ in path_select(pattern_groups, tmp_path)),
+                               tmp_path)
+        assert selected == ["build", os.path.join("more", "two.xxx")]
+        assert scanned_dirs == []
+
+    def test_patterns_with_same_base_share_one_walk(self, tmp_path, scanned_dirs):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        pattern_groups = {"file": ["build/**/*.o", "build/lib/*"]}
+        selected = relpaths_of((p for p, _ in path_select(pattern_groups, tmp_path)),
+                               tmp_path)
+        assert selected == [os.path.join("build", "foo.o"),
+                            os.path.join("build", "lib", "foo.o")]
+        assert sorted(scanned_dirs) == [str(tmp_path/"build"), str(tmp_path/"build/lib")]
+
+    def test_nested_base_is_reached_by_outer_walk(self, tmp_path, scanned_dirs):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        pattern_groups = {"file": ["**/*.zzz", "build/lib/*.o"]}
+        selected = relpaths_of((p for p, _ in path_select(pattern_groups, tmp_path)),
+                               tmp_path)
+        assert selected == [os.path.join("build", "lib", "foo.o"),
+                            os.path.join("more", "other.zzz")]
+        assert len(scanned_dirs) == len(set(scanned_dirs))
+
+    def test_literal_file_pattern_is_reached_by_outer_walk(self, tmp_path):
+        setup_workdir(tmp_path, ["a.log", "coverage.xml", "more/.coverage",
+                                 ".coverage", "other.xml"])
+        pattern_groups = {"file": ["**/*.log", "coverage.xml", ".coverage"]}
+        selected = relpaths_of((p for p, _ in path_select(pattern_groups, tmp_path)),
+                               tmp_path)
+        assert selected == [".coverage", "a.log", "coverage.xml"]
+
+
+class TestPathSelectWithAbsolutePatterns(object):
+
+    @pytest.mark.parametrize("pattern, expected", [
+        ("/tmp/pytest-of-*/**", ("/tmp", "pytest-of-*/**")),
+        ("/tmp/foo.log", ("/tmp", "foo.log")),
+        ("/tmp/build/", ("/tmp", "build/")),
+        ("/**/*.pyc", ("/", "**/*.pyc")),
+    ])
+    def test_split_absolute_pattern(self, pattern, expected):
+        root, relative_pattern = split_absolute_pattern(pattern)
+        assert (root, relative_pattern) == (os.path.normpath(expected[0]), expected[1])
+
+    @pytest.mark.skipif(os.sep != "/", reason="Needs POSIX paths")
+    def test_group_absolute_patterns_by_common_root(self):
+        groups = group_absolute_patterns([
+            ("/tmp/pytest-of-*/**", "directory"),
+            ("/tmp/tox/*.log", "file"),
+            ("/tmp/tox/py*/", "directory"),
+            ("/var/cache/foo/*", "file"),
+        ])
+        assert groups == [
+            ("/tmp", [("pytest-of-*/**", "directory"),
+                      ("tox/*.log", "file"), ("tox/py*/", "directory")]),
+            ("/var/cache/foo", [("*", "file")]),
+        ]
+
+    @pytest.mark.parametrize("pattern", [
+        "**/*.xxx", "more/*.xxx", "build/**/*.o", "build/foo.o", "*.zzz",
+    ])
+    def test_absolute_pattern_selects_like_relative_pattern(self, pattern, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        expected = pathlib_glob(pattern, tmp_path)
+        abs_pattern = os.path.join(str(tmp_path), pattern)
+        selected = list(path_glob(abs_pattern))
+        assert all(p.isabs() for p in selected)
+        assert relpaths_of(selected, tmp_path) == expected
+
+    def test_absolute_patterns_with_common_root_share_one_walk(self, tmp_path, scanned_dirs):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        pattern_groups = {
+            "directory": [os.path.join(str(tmp_path), "**", "*.xxx")],
+            "file": [os.path.join(str(tmp_path), "more", "**", "*.zzz"),
+                     os.path.join(str(tmp_path), "build", "*.o")],
+        }
+        selected = relpaths_of((p for p, _ in path_select(pattern_groups)), tmp_path)
+        assert os.path.join("more", "other.zzz") in selected
+        assert os.path.join("build", "foo.o") in selected
+        assert "one.xxx" in selected
+        assert len(scanned_dirs) == len(set(scanned_dirs))
+
+    @pytest.mark.parametrize("pattern", ["build/foo.o/**", "build/foo.o/*"])
+    def test_absolute_pattern_with_file_as_root_selects_nothing(self, pattern, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        abs_pattern = os.path.join(str(tmp_path), pattern)
+        assert list(path_glob(abs_pattern)) == []
+        assert list(path_glob(pattern, tmp_path)) == []
+
+
+class TestPathSelectWithScanJobs(object):
+
+    @pytest.mark.parametrize("scan_jobs", [2, 8])
+    def test_parallel_walk_selects_same_paths(self, scan_jobs, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        pattern_groups = {
+            "directory": ["**/*.xxx", "build"],
+            "file": ["**/*.xxx", "**/*.o", "**/.ignored"],
+        }
+        expected = sorted((str(p), tags)
+                          for p, tags in path_select(pattern_groups, tmp_path))
+        selected = sorted((str(p), tags)
+                          for p, tags in path_select(pattern_groups, tmp_path,
+                                                     scan_jobs=scan_jobs))
+        assert selected == expected
+
+    def test_parallel_walk_prunes_selected_directories(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        def prune_match(directory, tags):
+            return True
+
+        selected = relpaths_of((p for p, _ in path_select({None: ["**/*.xxx"]}, tmp_path,
+                                                          prune_match=prune_match,
+                                                          scan_jobs=4)),
+                               tmp_path)
+        assert os.path.join("one.xxx", "inner.xxx") not in selected
+        assert "one.xxx" in selected
+
+
+class TestPathSelectRecords(object):
+
+    def test_records_carry_file_type(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        records = dict((os.path.relpath(record.path, str(tmp_path)), record)
+                       for record in path_select_records({None: ["**/*.xxx"]}, tmp_path))
+        assert records["one.xxx"].is_dir()
+        assert records["one.xxx"].abs_path == str(tmp_path/"one.xxx")
+        assert records[os.path.join("more", "deeper", "three.xxx")].is_file()
+        assert not records[os.path.join("more", "deeper", "three.xxx")].is_dir()
+
+    def test_record_unpacks_like_tuple(self):
+        record = PathRecord("foo.o", "/tmp/foo.o", frozenset(["file"]))
+        path, tags = record
+        assert (path, tags) == ("foo.o", frozenset(["file"]))
+        assert str(record) == "foo.o"
+
+    def test_cleanup_files_needs_no_stat_calls(self, tmp_path, monkeypatch):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        stat_calls = []
+        real_stat = os.stat
+        def counting_stat(path, *args, **kwargs):
+            stat_calls.append(path)
+            return real_stat(path, *args, **kwargs)
+        monkeypatch.setattr("os.stat", counting_stat)
+
+        cleanup_files(["**/*.o", "**/*.zzz"], workdir=tmp_path)
+        monkeypatch.undo()
+        assert not (tmp_path/"build/foo.o").exists()
+        assert not (tmp_path/"more/other.zzz").exists()
+        # -- ONLY DIRECTORIES: Are stat-ed once (for loop protection).
+        assert not any(str(p).endswith((".o", ".zzz")) for p in stat_calls)
+
+
+@pytest.mark.skipif(not hasattr(os, "symlink"), reason="Needs symlinks")
+class TestPathSelectWithSymlinks(object):
+
+    def test_symlinked_dirs_are_not_entered_by_default(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        os.symlink(str(tmp_path/"build"), str(tmp_path/"more/linked_build"))
+        selected = relpaths_of(path_glob("**/*.o", tmp_path), tmp_path)
+        assert selected == [os.path.join("build", "foo.o"),
+                            os.path.join("build", "lib", "foo.o")]
+
+    @pytest.mark.parametrize("follow_symlinks", [False, True])
+    def test_literal_base_below_symlink_is_walked(self, follow_symlinks, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        os.symlink(str(tmp_path/"build"), str(tmp_path/"linked_build"))
+        selected = relpaths_of(path_glob("linked_build/lib/*.o", tmp_path,
+                                         follow_symlinks=follow_symlinks), tmp_path)
+        assert selected == [os.path.join("linked_build", "lib", "foo.o")]
+
+    def test_literal_path_through_symlinked_base_is_selected(self, tmp_path):
+        setup_workdir(tmp_path, ["real/docs/index.html", "work/other.txt"])
+        os.symlink(os.path.join(os.pardir, "real"), str(tmp_path/"work/build"))
+        selected = relpaths_of(path_glob("build/docs", tmp_path/"work"),
+                               tmp_path/"work")
+        assert selected == [os.path.join("build", "docs")]
+
+    def test_symlinked_base_is_walked_without_following_inner_symlinks(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        os.symlink(str(tmp_path/"build"), str(tmp_path/"linked_build"))
+        os.symlink(str(tmp_path/"more"), str(tmp_path/"build/linked_more"))
+        selected = relpaths_of(path_glob("linked_build/**/*.o", tmp_path), tmp_path)
+        assert selected == [os.path.join("linked_build", "foo.o"),
+                            os.path.join("linked_build", "lib", "foo.o")]
+
+    def test_symlink_as_literal_pattern_is_not_selected_as_directory(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        os.symlink(str(tmp_path/"build"), str(tmp_path/"linked_build"))
+        pattern_groups = {"directory": ["linked_build/"], "file": ["linked_build"]}
+        selected = dict((relpath, tags) for relpath, tags in
+                        ((os.path.relpath(str(p), str(tmp_path)), tags)
+                         for p, tags in path_select(pattern_groups, tmp_path)))
+        assert selected == {"linked_build": frozenset(["file"])}
+
+    def test_symlink_loop_terminates_when_symlinks_are_followed(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        os.symlink(os.pardir, str(tmp_path/"more/deeper/loop"))
+        os.symlink(str(tmp_path/"build"), str(tmp_path/"more/linked_build"))
+        selected = relpaths_of(path_glob("**/*.o", tmp_path, follow_symlinks=True),
+                               tmp_path)
+        # -- EACH DIRECTORY: Is walked only once (via the first path seen).
+        assert len(selected) == 2
+        assert len(set(os.path.basename(os.path.dirname(p)) for p in selected)) == 2
+
+
+class _OtherDeviceStat(object):
+    """Stat result of a path on another filesystem (mount point)."""
+
+    def __init__(self, stat_result):
+        self._stat_result = stat_result
+        self.st_dev = stat_result.st_dev + 1
+
+    def __getattr__(self, name):
+        return getattr(self._stat_result, name)
+
+
+class TestPathSelectWithWalkLimits(object):
+
+    @pytest.mark.parametrize("max_depth, expected", [
+        (1, []),
+        (2, [os.path.join("build", "foo.o")]),
+        (3, [os.path.join("build", "foo.o"), os.path.join("build", "lib", "foo.o")]),
+    ])
+    def test_max_depth_limits_selected_paths(self, max_depth, expected, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        selected = relpaths_of(path_glob("**/*.o", tmp_path, max_depth=max_depth),
+                               tmp_path)
+        assert selected == expected
+
+    def test_max_depth_skips_deeper_literal_base(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        assert list(path_glob("build/lib/*.o", tmp_path, max_depth=2)) == []
+
+    def test_one_file_system_does_not_cross_mount_points(self, tmp_path, monkeypatch):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        mount_point = str(tmp_path/"build")
+        real_stat = os.stat
+        real_lstat = os.lstat
+        def mounted_stat(path, *args, **kwargs):
+            stat_result = real_stat(path, *args, **kwargs)
+            if os.path.abspath(str(path)) == mount_point:
+                return _OtherDeviceStat(stat_result)
+            return stat_result
+        def mounted_lstat(path, *args, **kwargs):
+            stat_result = real_lstat(path, *args, **kwargs)
+            if os.path.abspath(str(path)) == mount_point:
+                return _OtherDeviceStat(stat_result)
+            return stat_result
+        monkeypatch.setattr("os.stat", mounted_stat)
+        monkeypatch.setattr("os.lstat", mounted_lstat)
+
+        pattern_groups = {"directory": ["build", "**/*.xxx"], "file": ["**/*.o"]}
+        selected = relpaths_of((p for p, _ in path_select(pattern_groups, tmp_path,
+                                                          one_file_system=True)),
+                               tmp_path)
+        assert "build" not in selected
+        assert os.path.join("build", "foo.o") not in selected
+        assert "one.xxx" in selected
+
+
+class TestPathSelectWithBracesAndNegation(object):
+
+    @pytest.mark.parametrize("pattern, expected", [
+        ("*.{pyc,pyo}", ["*.pyc", "*.pyo"]),
+        ("{build,dist}/**/*.{o,so}", ["build/**/*.o", "build/**/*.so",
+                                      "dist/**/*.o", "dist/**/*.so"]),
+        ("{a,b{c,d}}/x", ["a/x", "bc/x", "bd/x"]),
+        ("{a}/{b,b}", ["{a}/b"]),
+        ("{a,b", ["{a,b"]),
+    ])
+    def test_expand_braces(self, pattern, expected):
+        assert expand_braces(pattern) == expected
+
+    def test_alternatives_select_like_many_patterns(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        selected = relpaths_of(path_glob("{build/**/*.o,more/*.{zzz,xxx}}", tmp_path),
+                               tmp_path)
+        expected = sorted(set(pathlib_glob("build/**/*.o", tmp_path) +
+                              pathlib_glob("more/*.zzz", tmp_path) +
+                              pathlib_glob("more/*.xxx", tmp_path)))
+        assert selected == expected
+
+    def test_negated_pattern_drops_matches_of_its_tag(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        pattern_groups = {
+            "directory": ["**/*.xxx"],
+            "file": ["**/*.xxx", "**/*.o", "!build/lib/*", "!**/*.xxx/"],
+        }
+        selected = dict((os.path.relpath(str(p), str(tmp_path)), tags)
+                        for p, tags in path_select(pattern_groups, tmp_path))
+        assert os.path.join("build", "lib", "foo.o") not in selected
+        assert selected[os.path.join("build", "foo.o")] == frozenset(["file"])
+        assert selected["one.xxx"] == frozenset(["directory"])
+        assert selected[os.path.join("one.xxx", "inner.xxx")] == frozenset(["directory", "file"])
+
+    def test_negated_pattern_applies_to_every_walk_root(self, tmp_path):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        selected = relpaths_of((p for p, _ in path_select(
+                                    {"file": ["build/**/*.o", "!**/lib/*.o"]}, tmp_path)),
+                               tmp_path)
+        assert selected == [os.path.join("build", "foo.o")]
+
+    def test_negated_pattern_does_not_enter_directories(self, tmp_path, scanned_dirs):
+        setup_workdir(tmp_path, WORKDIR_PATHS)
+        list(path_select({"file": ["build/*.o", "!**/*.zzz"]}, tmp_path))
+        assert scanned_dirs == [str(tmp_path/"build")]
+
+
+class TestPathSelectWithPredicates(object):
+
+    @staticmethod
+    def setup_logs(tmp_path):
+        setup_workdir(tmp_path, ["old.log", "new.log", "foo/old.log", "foo/new.log"])
+        ten_days_ago = time.time() - 10 * 86400
+        for name in ["old.log", "foo/old.log"]:
+            os.utime(str(tmp_path/name), (ten_days_ago, ten_days_ago))
+
+    def test_selects_by_age(self, tmp_path):
+        self.setup_logs(tmp_path)
+        pattern = {"pattern": "**/*.log", "older_than": "7d"}
+        selected = relpaths_of(path_glob(pattern, tmp_path), tmp_path)
+        assert selected == sorted(["old.log", os.path.join("foo", "old.log")])
+
+    def test_selects_by_size(self, tmp_path):
+        setup_workdir(tmp_path, ["small.bin", "big.bin"])
+        (tmp_path/"big.bin").write_bytes(b"x" * 2048)
+        pattern = {"pattern": "*.bin", "min_size": "2K"}
+        selected = relpaths_of(path_glob(pattern, tmp_path), tmp_path)
+        assert selected == ["big.bin"]
+
+    @pytest.mark.skipif(not hasattr(os, "getuid"), reason="Needs POSIX")
+    def test_selects_by_owner(self, tmp_path):
+        setup_workdir(tmp_path, ["one.log"])
+        mine = {"pattern": "*.log", "owner": os.getuid()}
+        other = {"pattern": "*.log", "owner": os.getuid() + 1}
+        assert relpaths_of(path_glob(mine, tmp_path), tmp_path) == ["one.log"]
+        assert relpaths_of(path_glob(other, tmp_path), tmp_path) == []
+
+    def test_negated_pattern_drops_matches_of_predicates(self, tmp_path):
+        self.setup_logs(tmp_path)
+        pattern_groups = {"file": [{"pattern": "**/*.log", "older_than": "7d"},
+                                   "!foo/*.log"]}
+        selected = relpaths_of((p for p, _ in path_select(pattern_groups, tmp_path)),
+                               tmp_path)
+        assert selected == ["old.log"]
+
+    def test_needs_no_stat_if_other_pattern_selects_tag(self, tmp_path, monkeypatch):
+        self.setup_logs(tmp_path)
+        stat_calls = []
+        def counting_entry_stat(entry, path):
+            stat_calls.append(entry.name)
+            return os.lstat(path)
+        monkeypatch.setattr("invoke_cleanup._entry_stat", counting_entry_stat)
+        pattern_groups = {"file": [{"pattern": "**/*.log", "older_than": "7d"},
+                                   "foo/*.log"]}
+        selected = relpaths_of((p for p, _ in path_select(pattern_groups, tmp_path)),
+                               tmp_path)
+        assert selected == sorted(["old.log", os.path.join("foo", "new.log"),
+                                   os.path.join("foo", "old.log")])
+        assert sorted(stat_calls) == ["new.log", "old.log"]
+
+    def test_cleanup_files_keeps_fresh_files(self, tmp_path):
+        self.setup_logs(tmp_path)
+        cleanup_files([{"pattern": "**/*.log", "older_than": "1w"}],
+                      workdir=str(tmp_path))
+        assert not (tmp_path/"old.log").exists()
+        assert not (tmp_path/"foo/old.log").exists()
+        assert (tmp_path/"new.log").exists()
+        assert (tmp_path/"foo/new.log").exists()
+
+    def test_parse_pattern_spec(self):
+        assert parse_pattern_spec("**/*.log", "file") == ("**/*.log", "file")
+        assert parse_pattern_spec({"pattern": "*.log"}, "file") == ("*.log", "file")
+        pattern, tag = parse_pattern_spec({"pattern": "*.log", "min_size": "1MB"},
+                                          "file")
+        assert pattern == "*.log"
+        assert isinstance(tag, PathPredicate)
+        assert (tag.tag, tag.min_size) == ("file", 1024**2)
+        assert repr(tag) == "<PathPredicate: file min_size=1MB>"
+
+    @pytest.mark.parametrize("spec", [
+        {"older_than": "7d"},
+        {"pattern": "*.log", "newer_than": "7d"},
+        {"pattern": "!*.log", "older_than": "7d"},
+        {"pattern": "*.log", "older_than": "seven days"},
+    ])
+    def test_parse_pattern_spec_with_invalid_spec(self, spec):
+        with pytest.raises(ValueError):
+            parse_pattern_spec(spec, "file")
+
+
+class TestPathMatcherSuffixFastPath(object):
+
+    @pytest.mark.parametrize("pattern", ["*.pyc", "*~", "*.tar.gz", "*_test.log"])
+    @pytest.mark.parametrize("name", [
+        "foo.pyc", ".pyc", "pyc", "foo.pyc.bak", "foo~", "a.tar.gz", "x.gz",
+        "my_test.log", "_test.log", "test.log",
+    ])
+    def test_suffix_pattern_matches_like_fnmatch(self, pattern, name):
+        matcher = PathMatcher()
+        matcher.add_pattern(pattern, "file")
+        node = matcher.step(matcher.start, name)
+        selected = bool(node and node.accepts)
+        assert selected == fnmatch.fnmatch(name, pattern)
+
+    def test_suffix_patterns_need_no_regular_expression(self):
+        matcher = PathMatcher()
+        for pattern in ["**/*.pyc", "**/*.log", "**/*.o", "**/.DS_Store", "**/foo?.txt"]:
+            matcher.add_pattern(pattern, "file")
+        start = matcher.start
+        assert sorted(start.suffixes) == [".log", ".o", ".pyc"]
+        assert start.suffix_lengths == (2, 4)
+        assert list(start.literals) == [invoke_cleanup._normcase_name(".DS_Store")]
+        assert len(start.wildcards) == 1
@@ -8,7 +8,7 @@ from invoke import Config, Collection, Result
 from invoke import Failure, Exit, UnexpectedExit
 from invoke_cleanup import clean, cleanup_tasks
 from invoke_cleanup import execute_cleanup_tasks, \
-    cleanup_dirs, cleanup_files, make_cleanup_config
+    cleanup_dirs_and_files, make_cleanup_config
 from tests.invoke_testutil import EchoMockContext
 import pytest
 from mock import create_autospec
@@ -29,8 +29,7 @@ DEFAULT_CONFIG = Config(defaults={
     ),
 })
 
-DEFAULT_KWARGS = dict(workdir=".", verbose=False)
-DEFAULT_CLEANUP_DIR_KWARGS = dict(workdir=".", excluded=set(), verbose=False)
+DEFAULT_CLEANUP_KWARGS = dict(workdir=".", excluded=set(), verbose=False)
 
 # ---------------------------------------------------------------------------
 # TEST SUITE
@@ -51,12 +50,10 @@ class TestCleanTask(object):
         ctx.config.cleanup.files = ["**/*.bak"]
         ctx.config.cleanup.extra_files = ["**/*.log"]
 
-        mock_cleanup_dirs = create_autospec(cleanup_dirs)
-        mock_cleanup_files = create_autospec(cleanup_files)
+        mock_cleanup_dirs_and_files = create_autospec(cleanup_dirs_and_files)
         mock_execute_cleanup_tasks = create_autospec(execute_cleanup_tasks,
                                                      side_effect=execute_cleanup_tasks)
-        monkeypatch.setattr("invoke_cleanup.cleanup_dirs", mock_cleanup_dirs)
-        monkeypatch.setattr("invoke_cleanup.cleanup_files", mock_cleanup_files)
+        monkeypatch.setattr("invoke_cleanup.cleanup_dirs_and_files", mock_cleanup_dirs_and_files)
         monkeypatch.setattr("invoke_cleanup.execute_cleanup_tasks",
                             mock_execute_cleanup_tasks)
 
@@ -71,10 +68,22 @@ class TestCleanTask(object):
         expected_cleanup_dirs = ["build", "dist"]
         expected_cleanup_files = ["**/*.bak", "**/*.log"]
         mock_execute_cleanup_tasks.assert_called_once_with(ctx, the_cleanup_tasks)
-        mock_cleanup_dirs.assert_called_once_with(expected_cleanup_dirs, dry_run=dry_run, **DEFAULT_CLEANUP_DIR_KWARGS)
-        mock_cleanup_files.assert_called_once_with(expected_cleanup_files, dry_run=dry_run, **DEFAULT_KWARGS)
+        mock_cleanup_dirs_and_files.assert_called_once_with(expected_cleanup_dirs, expected_cleanup_files, dry_run=dry_run, **DEFAULT_CLEANUP_KWARGS)
         # mock_other_cleanup_task.assert_called_once_with(ctx)
 
+    def test_passes_configured_options(self, monkeypatch):
+        ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
+        ctx.config.cleanup.scan_jobs = 4
+        ctx.config.cleanup.jobs = 2
+        ctx.config.cleanup.keep_tracked = True
+        mock_cleanup_dirs_and_files = create_autospec(cleanup_dirs_and_files)
+        monkeypatch.setattr("invoke_cleanup.cleanup_dirs_and_files", mock_cleanup_dirs_and_files)
+        monkeypatch.setattr("invoke_cleanup.cleanup_tasks", Collection())
+
+        clean(ctx)
+        expected_cleanup_files = ["*.bak", "*.log", "*.tmp"]
+        mock_cleanup_dirs_and_files.assert_called_once_with([], expected_cleanup_files, dry_run=False, scan_jobs=4, jobs=2, keep_tracked=True, **DEFAULT_CLEANUP_KWARGS)
+
     def test_calls_cleanup_tasks(self, monkeypatch):
         mock_other_cleanup_task1 = create_autospec(clean)
         mock_other_cleanup_task2 = create_autospec(clean)
@@ -115,8 +124,8 @@ class TestCleanTaskExtensionPoint(object):
         ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
         ctx.config.cleanup.directories = ["build"]
         ctx.config.cleanup.extra_directories = [ "extra_build"]
-        mock_cleanup_dirs = create_autospec(cleanup_dirs)
-        monkeypatch.setattr("invoke_cleanup.cleanup_dirs", mock_cleanup_dirs)
+        mock_cleanup_dirs_and_files = create_autospec(cleanup_dirs_and_files)
+        monkeypatch.setattr("invoke_cleanup.cleanup_dirs_and_files", mock_cleanup_dirs_and_files)
         monkeypatch.setattr("invoke_cleanup.namespace._configuration", ctx.config)
 
         # -- EXTENSION-POINT:
@@ -127,14 +136,15 @@ class TestCleanTaskExtensionPoint(object):
         # pylint: disable=line-too-long
         clean(ctx)
         expected_cleanup_dirs = ["build", "other", "extra_build"]
-        mock_cleanup_dirs.assert_called_once_with(expected_cleanup_dirs, dry_run=False, **DEFAULT_CLEANUP_DIR_KWARGS)
+        expected_cleanup_files = ["*.bak", "*.log", "*.tmp"]
+        mock_cleanup_dirs_and_files.assert_called_once_with(expected_cleanup_dirs, expected_cleanup_files, dry_run=False, **DEFAULT_CLEANUP_KWARGS)
 
     def test_can_add_own_cleanup_files(self, monkeypatch):
         ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
         ctx.config.cleanup.files = ["*.file"]
         ctx.config.cleanup.extra_files = [ "*.extra_file"]
-        mock_cleanup_files = create_autospec(cleanup_files)
-        monkeypatch.setattr("invoke_cleanup.cleanup_files", mock_cleanup_files)
+        mock_cleanup_dirs_and_files = create_autospec(cleanup_dirs_and_files)
+        monkeypatch.setattr("invoke_cleanup.cleanup_dirs_and_files", mock_cleanup_dirs_and_files)
         monkeypatch.setattr("invoke_cleanup.namespace._configuration", ctx.config)
 
         # -- EXTENSION-POINT:
@@ -145,4 +155,4 @@ class TestCleanTaskExtensionPoint(object):
         # pylint: disable=line-too-long
         clean(ctx)
         expected_cleanup_files = ["*.file", "other_file", "*.extra_file"]
-        mock_cleanup_files.assert_called_once_with(expected_cleanup_files, dry_run=False, **DEFAULT_KWARGS)
+        mock_cleanup_dirs_and_files.assert_called_once_with([], expected_cleanup_files, dry_run=False, **DEFAULT_CLEANUP_KWARGS)
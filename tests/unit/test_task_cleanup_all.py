@@ -7,7 +7,7 @@ from __future__ import absolute_import, print_function
 from invoke import Config, Collection, Result
 from invoke_cleanup import clean_all
 from invoke_cleanup import execute_cleanup_tasks, \
-    cleanup_dirs, cleanup_files, make_cleanup_config
+    cleanup_dirs_and_files, make_cleanup_config
 from tests.invoke_testutil import EchoMockContext
 import pytest
 from mock import create_autospec
@@ -29,8 +29,7 @@ DEFAULT_CONFIG = Config(defaults={
     ),
 })
 
-DEFAULT_KWARGS = dict(workdir=".", verbose=False)
-DEFAULT_CLEANUP_DIR_KWARGS = dict(workdir=".", excluded=set(), verbose=False)
+DEFAULT_CLEANUP_KWARGS = dict(workdir=".", excluded=set(), verbose=False)
 
 
 # ---------------------------------------------------------------------------
@@ -52,15 +51,13 @@ class TestCleanAllTask(object):
         ctx.config.cleanup_all.files = ["**/*.BAK"]
         ctx.config.cleanup_all.extra_files = ["**/*.LOG"]
 
-        mock_cleanup_dirs = create_autospec(cleanup_dirs)
-        mock_cleanup_files = create_autospec(cleanup_files)
+        mock_cleanup_dirs_and_files = create_autospec(cleanup_dirs_and_files)
         mock_execute_cleanup_tasks = create_autospec(execute_cleanup_tasks,
                                                      side_effect=execute_cleanup_tasks)
         mock_clean_task = create_autospec(clean_all)
         the_cleanup_tasks = Collection(mock_clean_task)
         monkeypatch.setattr("invoke_cleanup.clean", mock_clean_task)
-        monkeypatch.setattr("invoke_cleanup.cleanup_dirs", mock_cleanup_dirs)
-        monkeypatch.setattr("invoke_cleanup.cleanup_files", mock_cleanup_files)
+        monkeypatch.setattr("invoke_cleanup.cleanup_dirs_and_files", mock_cleanup_dirs_and_files)
         monkeypatch.setattr("invoke_cleanup.execute_cleanup_tasks", mock_execute_cleanup_tasks)
         monkeypatch.setattr("invoke_cleanup.cleanup_tasks", the_cleanup_tasks)
 
@@ -75,14 +72,28 @@ class TestCleanAllTask(object):
         expected_cleanup_dirs = ["BUILD", "DIST"]
         expected_cleanup_files = ["**/*.BAK", "**/*.LOG"]
         mock_execute_cleanup_tasks.assert_called_once_with(ctx, the_cleanup_all_tasks)
-        mock_cleanup_dirs.assert_called_once_with(expected_cleanup_dirs, dry_run=dry_run, **DEFAULT_CLEANUP_DIR_KWARGS)
-        mock_cleanup_files.assert_called_once_with(expected_cleanup_files, dry_run=dry_run, **DEFAULT_KWARGS)
+        mock_cleanup_dirs_and_files.assert_called_once_with(expected_cleanup_dirs, expected_cleanup_files, dry_run=dry_run, **DEFAULT_CLEANUP_KWARGS)
         mock_clean_task.assert_called_once()
         mock_other_cleanup_task.assert_called_once()
         # DISABLED: mock_clean_task.assert_called_once_with(ctx)
         # DISABLED: mock_other_cleanup_task.assert_called_once_with(ctx)
 
 
+    def test_passes_configured_options(self, monkeypatch):
+        ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
+        ctx.config.cleanup.scan_jobs = 4
+        ctx.config.cleanup.jobs = 2
+        ctx.config.cleanup_all.jobs = 8
+        mock_cleanup_dirs_and_files = create_autospec(cleanup_dirs_and_files)
+        monkeypatch.setattr("invoke_cleanup.cleanup_dirs_and_files", mock_cleanup_dirs_and_files)
+        monkeypatch.setattr("invoke_cleanup.clean", create_autospec(clean_all))
+        monkeypatch.setattr("invoke_cleanup.cleanup_all_tasks", Collection())
+
+        # -- EXECUTE and VERIFY: cleanup_all options override cleanup options.
+        # pylint: disable=line-too-long
+        clean_all(ctx)
+        mock_cleanup_dirs_and_files.assert_called_once_with([], ["*.tmp"], dry_run=False, scan_jobs=4, jobs=8, **DEFAULT_CLEANUP_KWARGS)
+
     def test_calls_cleanup_all_tasks(self, monkeypatch):
         mock_other_cleanup_task1 = create_autospec(clean_all)
         mock_other_cleanup_task2 = create_autospec(clean_all)
@@ -125,9 +136,9 @@ class TestCleanAllTaskExtensionPoint(object):
         ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
         ctx.config.cleanup_all.directories = ["build"]
         ctx.config.cleanup_all.extra_directories = [ "extra_build"]
-        mock_cleanup_dirs = create_autospec(cleanup_dirs)
+        mock_cleanup_dirs_and_files = create_autospec(cleanup_dirs_and_files)
         mock_clean_task = create_autospec(clean)
-        monkeypatch.setattr("invoke_cleanup.cleanup_dirs", mock_cleanup_dirs)
+        monkeypatch.setattr("invoke_cleanup.cleanup_dirs_and_files", mock_cleanup_dirs_and_files)
         monkeypatch.setattr("invoke_cleanup.clean", mock_clean_task)
         monkeypatch.setattr("invoke_cleanup.namespace._configuration", ctx.config)
 
@@ -139,7 +150,8 @@ class TestCleanAllTaskExtensionPoint(object):
         # pylint: disable=line-too-long
         clean_all(ctx)
         expected_cleanup_dirs = ["build", "other", "extra_build"]
-        mock_cleanup_dirs.assert_called_once_with(expected_cleanup_dirs, dry_run=False, **DEFAULT_CLEANUP_DIR_KWARGS)
+        expected_cleanup_files = ["*.tmp"]
+        mock_cleanup_dirs_and_files.assert_called_once_with(expected_cleanup_dirs, expected_cleanup_files, dry_run=False, **DEFAULT_CLEANUP_KWARGS)
         mock_clean_task.assert_called_once_with(ctx, workdir=".", verbose=False)
 
     def test_can_add_own_cleanup_files(self, monkeypatch):
@@ -147,9 +159,9 @@ class TestCleanAllTaskExtensionPoint(object):
         ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
         ctx.config.cleanup_all.files = ["*.file"]
         ctx.config.cleanup_all.extra_files = [ "*.extra_file"]
-        mock_cleanup_files = create_autospec(cleanup_files)
+        mock_cleanup_dirs_and_files = create_autospec(cleanup_dirs_and_files)
         mock_clean_task = create_autospec(clean)
-        monkeypatch.setattr("invoke_cleanup.cleanup_files", mock_cleanup_files)
+        monkeypatch.setattr("invoke_cleanup.cleanup_dirs_and_files", mock_cleanup_dirs_and_files)
         monkeypatch.setattr("invoke_cleanup.clean", mock_clean_task)
         monkeypatch.setattr("invoke_cleanup.namespace._configuration", ctx.config)
 
@@ -161,5 +173,5 @@ class TestCleanAllTaskExtensionPoint(object):
         # pylint: disable=line-too-long
         clean_all(ctx)
         expected_cleanup_files = ["*.file", "other_file", "*.extra_file"]
-        mock_cleanup_files.assert_called_once_with(expected_cleanup_files, dry_run=False, **DEFAULT_KWARGS)
+        mock_cleanup_dirs_and_files.assert_called_once_with([], expected_cleanup_files, dry_run=False, **DEFAULT_CLEANUP_KWARGS)
         mock_clean_task.assert_called_once_with(ctx, workdir=".", verbose=False)
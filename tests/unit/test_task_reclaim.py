@@ -0,0 +1,146 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :func:`invoke_cleanup.reclaim()` task.
+"""
+
+from __future__ import absolute_import, print_function
+from invoke import Config, Result, Exit
+from invoke.util import cd
+from invoke_cleanup import reclaim, make_cleanup_config, \
+    DiskSpaceTarget, parse_size, format_size
+from tests.invoke_testutil import EchoMockContext
+import pytest
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+from tests.workdir_util import setup_workdir
+
+DEFAULT_CONFIG = Config(defaults={
+    "run": {
+        "echo": True,
+        "pty": False,
+        "dry": False,
+    },
+    "cleanup": make_cleanup_config(files=["**/*.tmp"]),
+    "cleanup_all": make_cleanup_config(directories=["cache"]),
+})
+
+
+@pytest.fixture
+def fake_disk(tmp_path, monkeypatch):
+    """Disk with 1000 bytes where each file in tmp_path uses 100 bytes."""
+    def fake_disk_usage(path):
+        used = 100 * len([p for p in tmp_path.rglob("*") if p.is_file()])
+        return 1000, used, 1000 - used
+    monkeypatch.setattr("invoke_cleanup.disk_usage", fake_disk_usage)
+    setup_workdir(tmp_path, [
+        "one.tmp", "foo/two.tmp",
+        "cache/a.bin", "cache/b.bin", "cache/c.bin",
+        "keep.txt",
+    ])
+    return tmp_path
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestReclaimTask(object):
+
+    def test_stops_when_target_is_reached(self, fake_disk, capsys):
+        ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
+        with cd(str(fake_disk)):
+            reclaim(ctx, target="600B")
+
+        captured = capsys.readouterr()
+        assert not (fake_disk/"one.tmp").exists()
+        assert not (fake_disk/"foo/two.tmp").exists()
+        assert (fake_disk/"cache/a.bin").exists()
+        assert "RECLAIM: REACHED (free: 600 B, usage: 40.0%" in captured.out
+
+    def test_removes_clean_all_candidates_afterwards(self, fake_disk, capsys):
+        ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
+        with cd(str(fake_disk)):
+            reclaim(ctx, target="15%")
+
+        captured = capsys.readouterr()
+        assert not (fake_disk/"one.tmp").exists()
+        assert not (fake_disk/"cache").exists()
+        assert (fake_disk/"keep.txt").exists()
+        assert "RECLAIM: REACHED (free: 900 B, usage: 10.0%" in captured.out
+
+    def test_stops_within_the_candidates(self, fake_disk):
+        ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
+        with cd(str(fake_disk)):
+            reclaim(ctx, target="500")
+
+        remaining = [p for p in ["one.tmp", "foo/two.tmp"] if (fake_disk/p).exists()]
+        assert len(remaining) == 1
+        assert (fake_disk/"cache").exists()
+
+    def test_stops_within_the_candidates_with_jobs(self, fake_disk):
+        ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
+        ctx.config.cleanup.jobs = 4
+        ctx.config.cleanup_all.jobs = 4
+        with cd(str(fake_disk)):
+            reclaim(ctx, target="500")
+
+        remaining = [p for p in ["one.tmp", "foo/two.tmp"] if (fake_disk/p).exists()]
+        assert len(remaining) == 1
+        assert (fake_disk/"cache").exists()
+
+    def test_removes_nothing_if_target_is_reached(self, fake_disk, capsys):
+        ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
+        ctx.config.cleanup.reclaim_target = "400"
+        with cd(str(fake_disk)):
+            reclaim(ctx)
+
+        captured = capsys.readouterr()
+        assert (fake_disk/"one.tmp").exists()
+        assert "REMOVE:" not in captured.out
+        assert "RECLAIM: REACHED" in captured.out
+
+    def test_reports_unreached_target(self, fake_disk, capsys):
+        ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
+        with cd(str(fake_disk)):
+            reclaim(ctx, target="1000")
+
+        captured = capsys.readouterr()
+        assert (fake_disk/"keep.txt").exists()
+        assert "RECLAIM: NOT-REACHED (free: 900 B" in captured.out
+
+    @pytest.mark.parametrize("target", [None, "", "many", "120%"])
+    def test_fails_without_valid_target(self, target, fake_disk):
+        ctx = EchoMockContext(run=Result(), config=Config(DEFAULT_CONFIG))
+        with cd(str(fake_disk)):
+            with pytest.raises(Exit):
+                reclaim(ctx, target=target)
+        assert (fake_disk/"one.tmp").exists()
+
+
+class TestDiskSpaceTarget(object):
+
+    @pytest.mark.parametrize("text, expected", [
+        ("512", 512), ("2K", 2048), ("1.5MB", 1536 * 1024),
+        ("10 GiB", 10 * 1024**3), ("1t", 1024**4),
+    ])
+    def test_parse_size(self, text, expected):
+        assert parse_size(text) == expected
+
+    @pytest.mark.parametrize("size, expected", [
+        (512, "512 B"), (1536, "1.5 KB"), (10 * 1024**3, "10.0 GB"),
+        (2 * 1024**5, "2048.0 TB"),
+    ])
+    def test_format_size(self, size, expected):
+        assert format_size(size) == expected
+
+    def test_from_string_with_free_bytes(self):
+        target = DiskSpaceTarget.from_string("10GB")
+        assert (target.free_bytes, target.max_usage) == (10 * 1024**3, None)
+        assert str(target) == "free >= 10.0 GB"
+
+    def test_from_string_with_max_usage(self):
+        target = DiskSpaceTarget.from_string("80%")
+        assert (target.free_bytes, target.max_usage) == (None, 80.0)
+        assert str(target) == "usage <= 80%"
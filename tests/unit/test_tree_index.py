@@ -0,0 +1,112 @@
+# -*- coding: UTF-8 -*-
+"""
+Unit tests for :class:`invoke_cleanup.TreeIndex` (incremental rescans).
+"""
+
+from __future__ import absolute_import, print_function
+import os
+from invoke_cleanup import path_select, cleanup_files
+from invoke.util import cd
+
+
+# ---------------------------------------------------------------------------
+# TEST SUPPORT
+# ---------------------------------------------------------------------------
+from tests.workdir_util import setup_workdir
+
+WORKDIR_PATHS = [
+    "one.xxx/.ignored",
+    "more/two.xxx/.ignored",
+    "more/deeper/three.xxx",
+    "more/other.zzz",
+    "build/lib/foo.o",
+]
+PATTERN_GROUPS = {
+    "directory": ["**/*.xxx", "build"],
+    "file": ["**/*.zzz", "**/*.o"],
+}
+
+
+def make_tree_old(top, seconds=60):
+    # -- AVOID RACY DIRECTORIES: Recently modified directories are not stored.
+    for directory, dirnames, _ in os.walk(str(top)):
+        timestamp = os.stat(directory).st_mtime - seconds
+        os.utime(directory, (timestamp, timestamp))
+
+
+def select_paths(top, index_dir, pattern_groups=None):
+    pattern_groups = pattern_groups or PATTERN_GROUPS
+    return sorted((os.path.relpath(str(p), str(top)), tags)
+                  for p, tags in path_select(pattern_groups, top,
+                                             index_dir=index_dir))
+
+
+# ---------------------------------------------------------------------------
+# TEST SUITE
+# ---------------------------------------------------------------------------
+class TestTreeIndex(object):
+
+    def test_rescan_of_unchanged_tree_lists_no_directory(self, tmp_path, scanned_dirs):
+        top, index_dir = tmp_path/"top", tmp_path/"index"
+        top.mkdir()
+        setup_workdir(top, WORKDIR_PATHS)
+        make_tree_old(top)
+
+        expected = select_paths(top, index_dir)
+        assert scanned_dirs
+        assert list(index_dir.iterdir())
+        del scanned_dirs[:]
+        selected = select_paths(top, index_dir)
+        assert selected == expected
+        assert scanned_dirs == []
+
+    def test_rescan_detects_new_entry(self, tmp_path, scanned_dirs):
+        top, index_dir = tmp_path/"top", tmp_path/"index"
+        top.mkdir()
+        setup_workdir(top, WORKDIR_PATHS)
+        make_tree_old(top)
+        select_paths(top, index_dir)
+
+        del scanned_dirs[:]
+        setup_workdir(top, ["more/deeper/new.zzz"])
+        selected = select_paths(top, index_dir)
+        assert (os.path.join("more", "deeper", "new.zzz"), frozenset(["file"])) in selected
+        assert scanned_dirs == [str(top/"more/deeper")]
+
+    def test_index_is_not_used_for_other_patterns(self, tmp_path, scanned_dirs):
+        top, index_dir = tmp_path/"top", tmp_path/"index"
+        top.mkdir()
+        setup_workdir(top, WORKDIR_PATHS)
+        make_tree_old(top)
+        select_paths(top, index_dir)
+
+        del scanned_dirs[:]
+        other_pattern_groups = {"file": ["**/.ignored"]}
+        selected = select_paths(top, index_dir, other_pattern_groups)
+        assert [path for path, _ in selected] == [
+            os.path.join("more", "two.xxx", ".ignored"),
+            os.path.join("one.xxx", ".ignored"),
+        ]
+        assert scanned_dirs
+
+    def test_invalid_index_file_is_ignored(self, tmp_path):
+        top, index_dir = tmp_path/"top", tmp_path/"index"
+        top.mkdir()
+        setup_workdir(top, WORKDIR_PATHS)
+        make_tree_old(top)
+        expected = select_paths(top, index_dir)
+        for index_file in index_dir.iterdir():
+            index_file.write_text(u"{ BROKEN")
+
+        selected = select_paths(top, index_dir)
+        assert selected == expected
+
+    def test_cleanup_stores_index_below_workdir(self, tmp_path):
+        top, other = tmp_path/"top", tmp_path/"other"
+        setup_workdir(tmp_path, ["top/one.zzz", "other/.ignored"])
+        make_tree_old(top)
+        with cd(str(other)):
+            cleanup_files(["**/*.zzz"], workdir=top, dry_run=True,
+                          index_dir=".cache/index")
+        assert list((top/".cache/index").iterdir())
+        assert not (other/".cache").exists()